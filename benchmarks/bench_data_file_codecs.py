@@ -0,0 +1,95 @@
+"""
+Benchmark of the codecs for persisted data files.
+
+Reports write throughput, read throughput and compression ratio of the feather (Arrow IPC) and Parquet writers
+in treemotion/utils/data_file_io.py for a real data file, so the codec can be chosen per deployment
+('data_file_compression', 'data_parquet_compression' and 'data_parquet_pre_filters' in config). Run it on the
+storage the working directory lives on, e.g. the NAS:
+
+    python benchmarks/bench_data_file_codecs.py path/to/data_tms.feather --directory //nas/working_directory
+
+Throughputs are based on the in-memory size of the DataFrame. A CSV file of the TMS logger is read like
+DataTMS.read_data_csv.
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from treemotion.tms.tms_file_extraction import read_tms_csv
+from treemotion.utils.data_file_io import write_feather_chunks, read_feather_file, write_parquet_file
+
+TMS_COLUMNS = ['East-West-Inclination', 'North-South-Inclination', 'Absolute-Inclination',
+               'Inclination direction of the tree', 'Temperature']
+
+# (name, format, compression, level, pre_filters)
+SETTINGS = [
+    ("feather", "feather", None, None, False),
+    ("feather lz4", "feather", "lz4", None, False),
+    ("feather zstd 1", "feather", "zstd", 1, False),
+    ("feather zstd 3", "feather", "zstd", 3, False),
+    ("feather zstd 9", "feather", "zstd", 9, False),
+    ("parquet", "parquet", None, None, False),
+    ("parquet lz4", "parquet", "lz4", None, False),
+    ("parquet zstd 3", "parquet", "zstd", 3, False),
+    ("parquet zstd 3 + pre-filters", "parquet", "zstd", 3, True),
+    ("parquet zstd 9 + pre-filters", "parquet", "zstd", 9, True),
+]
+
+
+def load(filepath: Path, dtype: str) -> pd.DataFrame:
+    if filepath.suffix == ".csv":
+        return read_tms_csv(filepath, "Time", {col: dtype for col in TMS_COLUMNS})
+    return read_feather_file(filepath)
+
+
+def best_of(func, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run(df: pd.DataFrame, directory: Path, repeat: int) -> pd.DataFrame:
+    size_mb = df.memory_usage(index=True).sum() / 1e6
+    results = []
+    for name, file_format, compression, level, pre_filters in SETTINGS:
+        filepath = directory / f"bench.{file_format}"
+        if file_format == "feather":
+            write_time = best_of(lambda: write_feather_chunks([df], filepath, compression, level), repeat)
+            read_time = best_of(lambda: read_feather_file(filepath), repeat)
+        else:
+            write_time = best_of(lambda: write_parquet_file(df, filepath, 20 * 60 * 60, compression, level,
+                                                            pre_filters), repeat)
+            read_time = best_of(lambda: pd.read_parquet(filepath), repeat)
+        file_mb = filepath.stat().st_size / 1e6
+        results.append({'setting': name, 'file_mb': file_mb, 'ratio': size_mb / file_mb,
+                        'write_mb_s': size_mb / write_time, 'read_mb_s': size_mb / read_time})
+        filepath.unlink()
+    return pd.DataFrame(results).set_index('setting')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("filepath", type=Path, help="Feather data file or TMS CSV file with 20 Hz data")
+    parser.add_argument("--directory", type=Path, default=None,
+                        help="Directory to write the benchmark files to, defaults to a temporary directory")
+    parser.add_argument("--dtype", default="float64", help="dtype of the TMS columns read from CSV")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = load(args.filepath, args.dtype)
+    print(f"{len(df)} rows, {len(df.columns)} columns, "
+          f"{df.memory_usage(index=True).sum() / 1e6:.1f} MB in memory")
+
+    with tempfile.TemporaryDirectory(dir=args.directory) as directory:
+        results = run(df, Path(directory), args.repeat)
+    print(results.round(2).to_string())
+
+
+if __name__ == "__main__":
+    main()
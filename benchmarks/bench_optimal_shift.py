@@ -0,0 +1,64 @@
+"""
+Benchmark of the shift search of MeasurementVersion.calc_optimal_shift.
+
+Compares the search over all lags at full resolution with the coarse to fine search of calc_optimal_shift in
+treemotion/tms/df_merge_by_time.py and checks that both find the same shift (within one sample) and correlations.
+For every seed, 20 Hz TMS data reacting with a random delay to generated 10 minute wind data is generated and
+both are reduced to their 30 minute rolling maximum like in calc_optimal_shift:
+
+    python benchmarks/bench_optimal_shift.py --hours 24 --seeds 5
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from treemotion.tms.df_merge_by_time import calc_optimal_shift
+from treemotion.tms.rolling_extrema import rolling_max, piecewise_rolling_max
+
+
+def generate(hours: float, seed: int, sample_rate: int = 20):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2024-06-01", periods=int(hours * 3600 * sample_rate), freq=f"{1000 // sample_rate}ms")
+    wind_index = pd.date_range(index[0] - pd.Timedelta("3h"), index[-1] + pd.Timedelta("3h"), freq="10min")
+    wind = pd.Series(rng.gamma(2, 2, len(wind_index)), index=wind_index)
+    delay = pd.Timedelta(seconds=rng.uniform(-80 * 60, 80 * 60))
+    response = wind.reindex(index - delay, method='nearest').to_numpy()
+    tms = pd.Series(0.3 * response + rng.normal(size=len(index)) * 2, index=index)
+    return (rolling_max(tms, '30min'), piecewise_rolling_max(wind.reindex(index, method='nearest'), '30min'),
+            delay.total_seconds())
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=float, default=24, help="Hours of generated 20 Hz data")
+    parser.add_argument("--seeds", type=int, default=5)
+    parser.add_argument("--max-shift-sec", type=float, default=90 * 60)
+    parser.add_argument("--coarse-sec", type=float, default=10)
+    args = parser.parse_args()
+
+    max_shift = round(20 * args.max_shift_sec)
+    coarse_factor = round(20 * args.coarse_sec)
+    full_total = coarse_total = 0
+    for seed in range(args.seeds):
+        tms, wind, delay = generate(args.hours, seed)
+        full, full_time = timed(lambda: calc_optimal_shift(tms, wind, max_shift))
+        coarse, coarse_time = timed(lambda: calc_optimal_shift(tms, wind, max_shift, coarse_factor=coarse_factor))
+        full_total += full_time
+        coarse_total += coarse_time
+        equal = abs(full[0] - coarse[0]) <= 1 and np.allclose(full[1:], coarse[1:], rtol=1e-9)
+        print(f"seed {seed}: delay {delay:.0f} s, full {full[0] / 20:.2f} s ({full_time:.3f} s), "
+              f"coarse to fine {coarse[0] / 20:.2f} s ({coarse_time:.3f} s), {'equal' if equal else 'DIFFERENT'}")
+    print(f"total: full {full_total:.3f} s, coarse to fine {coarse_total:.3f} s, "
+          f"speedup {full_total / coarse_total:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
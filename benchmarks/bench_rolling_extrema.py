@@ -0,0 +1,62 @@
+"""
+Benchmark of the rolling maximum of MeasurementVersion.calc_optimal_shift and sync_wind_tms_data.
+
+Compares pandas `rolling(window, closed='right').max()` with rolling_max (TMS data on a regular grid) and
+piecewise_rolling_max (10 minute wind data joined onto the TMS index) in treemotion/tms/rolling_extrema.py and
+checks that the results are bit-identical. 20 Hz data is generated for the given number of days:
+
+    python benchmarks/bench_rolling_extrema.py --days 7 --window 30min
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from treemotion.tms.rolling_extrema import rolling_max, piecewise_rolling_max
+from treemotion.tms.time_join import nearest_indexer
+
+
+def generate(days: float, dtype: str, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    n = int(days * 24 * 60 * 60 * 20)
+    index = pd.date_range("2024-06-01", periods=n, freq="50ms", name='datetime')
+    tms = pd.Series(np.abs(rng.normal(size=n)).astype(dtype), index=index)
+    wind_index = pd.date_range(index[0], index[-1], freq="10min")
+    wind_values = rng.gamma(2, 2, len(wind_index)).astype('float32')
+    wind = pd.Series(wind_values[nearest_indexer(wind_index.asi8, index.asi8)], index=index)
+    return tms, wind
+
+
+def best_of(func, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=float, default=7, help="Days of generated 20 Hz data")
+    parser.add_argument("--window", default="30min")
+    parser.add_argument("--dtype", default="float64", help="Dtype of the TMS data")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tms, wind = generate(args.days, args.dtype)
+    for name, series, func in [("tms", tms, rolling_max), ("wind", wind, piecewise_rolling_max)]:
+        expected = series.rolling(args.window, closed='right').max()
+        result = func(series, args.window)
+        if not np.array_equal(result.to_numpy().view('int64'), expected.to_numpy().view('int64')):
+            raise AssertionError(f"Rolling max of {name} differs from pandas.")
+
+        pandas_time = best_of(lambda: series.rolling(args.window, closed='right').max(), args.repeat)
+        current_time = best_of(lambda: func(series, args.window), args.repeat)
+        print(f"{name}: {len(series)} rows, bit-identical, pandas: {pandas_time:.3f} s, "
+              f"{func.__name__}: {current_time:.3f} s, speedup {pandas_time / current_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark of the join of wind data onto TMS data in MeasurementVersion.sync_wind_tms_data.
+
+Compares the previous merge (reindex(method='nearest') and outer merge, once unshifted and once with the wind
+columns shifted) with one TimeJoin used twice, with and without row offset, and checks that both return the same
+data. TMS data at 20 Hz and wind data at 10 minutes are generated for the given number of days:
+
+    python benchmarks/bench_time_join.py --days 7
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from treemotion.tms.time_join import TimeJoin
+
+
+def merge_previous(df_high_freq: pd.DataFrame, df_low_freq: pd.DataFrame) -> pd.DataFrame:
+    df_low_freq_reindexed = df_low_freq.reindex(df_high_freq.index, method='nearest')
+    return pd.merge(df_high_freq, df_low_freq_reindexed, left_index=True, right_index=True, how='outer')
+
+
+def sync_previous(tms_df: pd.DataFrame, wind_df: pd.DataFrame, index_shift: int):
+    merged_df = merge_previous(tms_df, wind_df)
+    shifted_wind_df = wind_df.copy()
+    for column in wind_df.columns:
+        shifted_wind_df[column] = shifted_wind_df[column].shift(index_shift)
+    return merged_df, merge_previous(tms_df, shifted_wind_df)
+
+
+def sync_current(tms_df: pd.DataFrame, wind_df: pd.DataFrame, index_shift: int):
+    time_join = TimeJoin(tms_df.index, wind_df.index)
+    return time_join.join(tms_df, wind_df), time_join.join(tms_df, wind_df, offset=index_shift)
+
+
+def generate(days: float, tms_columns: int, wind_columns: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    n = int(days * 24 * 60 * 60 * 20)
+    tms_index = pd.date_range("2024-06-01", periods=n, freq="50ms", name='datetime')
+    tms_df = pd.DataFrame({f"tms_{i}": rng.normal(size=n) for i in range(tms_columns)}, index=tms_index)
+    wind_index = pd.date_range(tms_index[0] - pd.Timedelta("10min"), tms_index[-1] + pd.Timedelta("10min"),
+                               freq="10min", name='datetime')
+    wind_df = pd.DataFrame({f"wind_{i}": rng.gamma(2, 2, len(wind_index)).astype('float32')
+                            for i in range(wind_columns)}, index=wind_index)
+    return tms_df, wind_df
+
+
+def measure(func, repeat: int):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(times), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=float, default=2, help="Days of generated 20 Hz TMS data")
+    parser.add_argument("--tms-columns", type=int, default=3)
+    parser.add_argument("--wind-columns", type=int, default=6)
+    parser.add_argument("--shift", type=int, default=2, help="Shift of the wind data in rows")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tms_df, wind_df = generate(args.days, args.tms_columns, args.wind_columns)
+    for previous, current in zip(sync_previous(tms_df, wind_df, args.shift), sync_current(tms_df, wind_df, args.shift)):
+        pd.testing.assert_frame_equal(current, previous, check_freq=False)
+
+    previous_time, previous_peak = measure(lambda: sync_previous(tms_df, wind_df, args.shift), args.repeat)
+    current_time, current_peak = measure(lambda: sync_current(tms_df, wind_df, args.shift), args.repeat)
+
+    print(f"{len(tms_df)} TMS rows, {len(wind_df)} wind rows, results equal")
+    print(f"previous: {previous_time:.3f} s, peak {previous_peak / 2 ** 20:.0f} MiB")
+    print(f"current:  {current_time:.3f} s, peak {current_peak / 2 ** 20:.0f} MiB, "
+          f"speedup {previous_time / current_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
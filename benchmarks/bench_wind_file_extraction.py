@@ -0,0 +1,99 @@
+"""
+Benchmark of the DWD wind file parser.
+
+Compares extract_wind_df in treemotion/wind/wind_file_extraction.py with the previous implementation (inferred
+dtypes, format string timestamps, merge and per column -999 replacement) and checks that both return the same
+data. Without files, a wind and an extreme wind file of a station are generated for the given number of years:
+
+    python benchmarks/bench_wind_file_extraction.py --years 10
+    python benchmarks/bench_wind_file_extraction.py produkt_zehn_min_ff_00298.txt produkt_zehn_min_fx_00298.txt
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from treemotion.wind.wind_file_extraction import extract_wind_df, RENAME_DICT
+
+
+def extract_wind_df_previous(filepath_wind: Path, filepath_wind_extreme: Path, float_dtype: str = "float32",
+                             int_dtype: str = "int32") -> pd.DataFrame:
+    df1 = pd.read_csv(filepath_wind, sep=';', index_col=False, skipinitialspace=True)
+    df2 = pd.read_csv(filepath_wind_extreme, sep=';', index_col=False, skipinitialspace=True)
+    df1['MESS_DATUM'] = pd.to_datetime(df1['MESS_DATUM'], format='%Y%m%d%H%M')
+    df2['MESS_DATUM'] = pd.to_datetime(df2['MESS_DATUM'], format='%Y%m%d%H%M')
+    merged_df = pd.merge(df1, df2, on=['STATIONS_ID', 'MESS_DATUM'], suffixes=('_file1', '_file2'))
+    merged_df = merged_df.drop(['eor_file1', 'eor_file2'], axis=1)
+    merged_df.rename(columns=RENAME_DICT, inplace=True)
+    merged_df.set_index('datetime', inplace=True)
+    for col in merged_df.columns:
+        if merged_df[col].dtype == 'float64':
+            merged_df[col] = merged_df[col].replace(-999, np.nan).astype(float_dtype)
+        elif merged_df[col].dtype == 'int64':
+            temp_col = merged_df[col].astype('float64')
+            temp_col.replace(-999, np.nan, inplace=True)
+            temp_col.ffill(inplace=True)
+            merged_df[col] = temp_col.astype(int_dtype)
+    return merged_df
+
+
+def write_station_files(directory: Path, years: float, seed: int = 0):
+    """
+    Writes a wind and an extreme wind file in the DWD format with 10 minute rows and a few -999 values.
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2010-01-01", periods=int(years * 365 * 24 * 6), freq="10min")
+    n = len(index)
+    mess_datum = index.strftime('%Y%m%d%H%M')
+
+    def values(scale):
+        v = np.round(rng.gamma(2, scale, n), 1)
+        v[rng.random(n) < 0.001] = -999
+        return v
+
+    direction = rng.integers(0, 360, n)
+    direction[rng.random(n) < 0.001] = -999
+    wind = pd.DataFrame({'STATIONS_ID': 298, 'MESS_DATUM': mess_datum, 'QN': 3, 'FF_10': values(2),
+                         'DD_10': direction, 'eor': 'eor'})
+    extreme = pd.DataFrame({'STATIONS_ID': 298, 'MESS_DATUM': mess_datum, 'QN': 3, 'FX_10': values(4),
+                            'FNX_10': values(1), 'FMX_10': values(3), 'DX_10': np.roll(direction, 1),
+                            'eor': 'eor'}).iloc[1:]  # Rows missing in one file are dropped
+    wind.to_csv(directory / "produkt_zehn_min_ff.txt", sep=';', index=False)
+    extreme.to_csv(directory / "produkt_zehn_min_fx.txt", sep=';', index=False)
+    return directory / "produkt_zehn_min_ff.txt", directory / "produkt_zehn_min_fx.txt"
+
+
+def best_of(func, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("filepaths", type=Path, nargs="*", help="Wind and extreme wind file of a station")
+    parser.add_argument("--years", type=float, default=5, help="Years of generated data without files")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        filepaths = args.filepaths or write_station_files(Path(directory), args.years)
+        previous = extract_wind_df_previous(*filepaths)
+        current = extract_wind_df(*filepaths)
+        pd.testing.assert_frame_equal(current, previous, check_freq=False)
+
+        previous_time = best_of(lambda: extract_wind_df_previous(*filepaths), args.repeat)
+        current_time = best_of(lambda: extract_wind_df(*filepaths), args.repeat)
+
+    print(f"{len(current)} rows, results equal")
+    print(f"previous: {previous_time:.3f} s, current: {current_time:.3f} s, speedup {previous_time / current_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
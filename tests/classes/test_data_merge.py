@@ -0,0 +1,147 @@
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import treemotion
+from treemotion import Series, Measurement, MeasurementVersion, DataTMS, DataMerge, DataWindStation
+from treemotion.classes.base_class import BaseClass
+
+SHIFT_SEC = 600
+
+
+def _tms_data(config) -> pd.DataFrame:
+    index = pd.date_range("2022-01-29 12:00", "2022-01-29 14:00", freq="50ms", inclusive='left', name="Time")
+    rng = np.random.default_rng(1)
+    data = {col: np.cumsum(rng.normal(scale=0.01, size=len(index))) for col in config.data_tms_columns}
+    data['Temperature'] = np.linspace(5, 8, len(index))
+    return pd.DataFrame(data, index=index)
+
+
+def _wind_data(config) -> pd.DataFrame:
+    index = pd.date_range("2022-01-29 09:00", "2022-01-29 17:00", freq=config.wind_dwd_freq, name="datetime")
+    rng = np.random.default_rng(2)
+    data = {col: rng.uniform(0, 20, len(index)).round(1).astype('float32') for col in config.data_wind_columns}
+    data['station_id'] = np.full(len(index), 298)
+    return pd.DataFrame(data, index=index)
+
+
+class TestVirtualDataMerge(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        treemotion.setup(working_directory=cls.tmp_dir.name, log_level="warning", safe_logs_to_file=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        MeasurementVersion.metadata.create_all(engine)
+        self.session = Session(engine)
+        self.addCleanup(self.session.close)
+        # Eigene Session statt der Datenbank im Arbeitsverzeichnis
+        database_manager = SimpleNamespace(session=self.session, commit=self.session.commit)
+        patcher = mock.patch.object(BaseClass, 'get_database_manager', return_value=database_manager)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        config = treemotion.CONFIG.Data
+        series = Series(series_id=1, optimal_shift_sec_median=SHIFT_SEC)
+        measurement = Measurement(measurement_id=1, series_id=1)
+        series.measurement.append(measurement)
+        self.mv = MeasurementVersion(measurement_version_id=1, measurement_version_name="test", measurement_id=1)
+        measurement.measurement_version.append(self.mv)
+        data_directory = treemotion.CONFIG.data_directory
+        self.mv.data_tms = DataTMS(data=_tms_data(config), measurement_version_id=1,
+                                   data_filepath=str(data_directory / config.data_tms_directory / "tms_1.feather"))
+        series.data_wind_station = DataWindStation(data=_wind_data(config), station_id="00298",
+                                                   data_filepath=str(data_directory / "wind_00298.feather"))
+        self.session.add(series)
+        self.session.commit()
+
+    def test_materialize(self):
+        data_merge = self.mv.add_data_merge(virtual=True)
+        self.assertTrue(data_merge.virtual)
+        self.assertIsNone(data_merge.data_filepath)
+        self.assertEqual((data_merge.shift_sec, data_merge.time_rolling_max), (SHIFT_SEC, '30min'))
+
+        data = data_merge.materialize()
+        _, shifted = self.mv.sync_wind_tms_data(shift_sec=SHIFT_SEC)
+        pd.testing.assert_index_equal(data.index, self.mv.data_tms.data.index)
+        np.testing.assert_array_equal(data[treemotion.CONFIG.Data.merge_wind_value],
+                                      shifted[treemotion.CONFIG.Data.merge_wind_value])
+        pd.testing.assert_frame_equal(data_merge.get_stored_data(), data)
+
+    def test_chunked_materialize(self):
+        """Stückweise berechnete Daten sind gleich den am Stück berechneten, auch das rollende Maximum."""
+        data_merge = self.mv.add_data_merge(virtual=True)
+        data = data_merge.materialize()
+
+        edges = pd.date_range("2022-01-29 12:00", "2022-01-29 14:00", freq="25min")
+        chunks = [data_merge.materialize(start, end - pd.Timedelta("50ms"))
+                  for start, end in zip(edges[:-1], edges[1:])]
+        chunks.append(data_merge.materialize(edges[-1], None))
+        pd.testing.assert_frame_equal(pd.concat(chunks), data, check_freq=False)
+
+    def test_switch_stored_virtual(self):
+        stored = self.mv.add_data_merge(virtual=False)
+        self.assertFalse(stored.virtual)
+        stored_data = stored.get_stored_data().copy()
+
+        virtual = self.mv.add_data_merge(virtual=True)
+        self.assertTrue(virtual.virtual)
+        self.assertIs(self.mv.data_merge, virtual)
+        self.assertEqual(self.session.query(DataMerge).count(), 1)
+        pd.testing.assert_frame_equal(virtual.get_stored_data(), stored_data, check_freq=False)
+
+        stored = self.mv.add_data_merge(virtual=False)
+        self.assertFalse(stored.virtual)
+        self.assertEqual(self.session.query(DataMerge).count(), 1)
+        pd.testing.assert_frame_equal(stored.get_stored_data(), stored_data, check_freq=False)
+
+    def test_invalidated_by_data_tms(self):
+        data_merge = self.mv.add_data_merge(virtual=True)
+        self.assertEqual(len(data_merge.get_stored_data()), len(self.mv.data_tms.data))
+
+        self.mv.data_tms.cut_by_time("2022-01-29 12:30:00", "2022-01-29 13:00:00", inplace=True)
+        data = data_merge.get_stored_data()
+        self.assertEqual(data.index.min(), pd.Timestamp("2022-01-29 12:30"))
+        self.assertEqual(data.index.max(), pd.Timestamp("2022-01-29 13:00"))
+
+    def test_invalidated_by_sources(self):
+        """Geänderte Wind- oder TMS-Daten werden neu zusammengeführt, ohne update_virtual."""
+        data_merge = self.mv.add_data_merge(virtual=True)
+        before = data_merge.get_stored_data()
+        self.assertIs(data_merge.get_stored_data(), before)
+
+        wind_station = self.mv.data_wind_station
+        wind = wind_station.data.copy()
+        float_columns = wind.select_dtypes('floating').columns
+        wind[float_columns] = wind[float_columns] + 1
+        wind_station.data = wind
+        column = treemotion.CONFIG.Data.merge_wind_value
+        np.testing.assert_allclose(data_merge.get_stored_data()[column], before[column] + 1, rtol=1e-6)
+
+        self.mv.data_tms.data = self.mv.data_tms.data.iloc[:1000]
+        self.assertEqual(len(data_merge.get_stored_data()), 1000)
+
+    def test_modified_in_place_is_stored(self):
+        data_merge = self.mv.add_data_merge(virtual=True)
+        float_columns = data_merge.get_stored_data().select_dtypes('floating').columns
+        self.assertEqual(list(data_merge.check_precision().index), list(float_columns))
+
+        sample = data_merge.random_sample(100, inplace=True)
+        self.assertFalse(data_merge.virtual)
+        self.assertIsNotNone(data_merge.data_filepath)
+        pd.testing.assert_frame_equal(data_merge.get_stored_data(), sample)
+
+
+if __name__ == '__main__':
+    unittest.main()
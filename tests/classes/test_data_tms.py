@@ -0,0 +1,49 @@
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+import treemotion
+from treemotion import DataTMS
+from treemotion.classes.base_class_data_tms import BaseClassDataTMS
+
+
+class TestDerivedColumns(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        treemotion.setup(working_directory=cls.tmp_dir.name, log_level="warning", safe_logs_to_file=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+
+    def setUp(self):
+        index = pd.date_range("2022-01-29 12:00", periods=1000, freq="50ms", name="Time")
+        rng = np.random.default_rng(1)
+        data = pd.DataFrame(rng.normal(size=(len(index), 2)), index=index,
+                            columns=['East-West-Inclination', 'North-South-Inclination'])
+        self.data_tms = DataTMS(data=data)
+
+    def test_cached_until_modified(self):
+        """Abgeleitete Spalten werden nach einer Änderung der Daten an Ort und Stelle neu berechnet."""
+        func = mock.Mock(side_effect=BaseClassDataTMS.derived_columns['Absolute-Inclination'][0])
+        derived_columns = {**BaseClassDataTMS.derived_columns,
+                           'Absolute-Inclination': (func, 'East-West-Inclination', 'North-South-Inclination')}
+        with mock.patch.object(BaseClassDataTMS, 'derived_columns', derived_columns):
+            first = self.data_tms.get_column('Absolute-Inclination')
+            self.data_tms.get_column('Absolute-Inclination')
+            self.assertEqual(func.call_count, 1)
+
+            # Gleicher Speicher, gleiche Form: nur die Version der Daten zeigt die Änderung
+            self.data_tms.data.iloc[:, 0] += 1.0
+            self.data_tms._data_modified()
+            changed = self.data_tms.get_column('Absolute-Inclination')
+        self.assertEqual(func.call_count, 2)
+        self.assertFalse(np.allclose(changed.to_numpy(), first.to_numpy()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import treemotion
+from treemotion import DataWindStation, MeasurementVersion
+from treemotion.classes.base_class import BaseClass
+
+MODULE = 'treemotion.classes.data_wind_station'
+
+
+class TestCreateFromStations(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        treemotion.setup(working_directory=cls.tmp_dir.name, log_level="warning", safe_logs_to_file=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        MeasurementVersion.metadata.create_all(engine)
+        self.session = Session(engine)
+        self.addCleanup(self.session.close)
+        # Eigene Session statt der Datenbank im Arbeitsverzeichnis
+        database_manager = SimpleNamespace(session=self.session, commit=self.session.commit)
+        for patcher in (mock.patch.object(BaseClass, 'get_database_manager', return_value=database_manager),
+                        mock.patch.object(DataWindStation, 'get_dwd_mirror', return_value=None),
+                        # Kein Download: die aktuellen Archive fehlen, die Stationen bleiben ohne Daten
+                        mock.patch(f'{MODULE}.open_station_zip_member', side_effect=OSError("offline"))):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _historical_calls(self, historical: bool) -> int:
+        with mock.patch.object(treemotion.CONFIG.Data, 'wind_dwd_stream', True), \
+                mock.patch.object(treemotion.CONFIG.Data, 'wind_dwd_historical', historical), \
+                mock.patch(f'{MODULE}.find_historical_zip_urls', return_value=[]) as find_urls:
+            self.assertEqual(DataWindStation.create_from_stations(["00298", "01503"]), {})
+        return find_urls.call_count
+
+    def test_historical_archives_as_configured(self):
+        """Neue Stationen laden die historischen Archive nur, wenn 'wind_dwd_historical' gesetzt ist."""
+        self.assertEqual(self._historical_calls(False), 0)
+        # Wind und Extremwind je Station
+        self.assertEqual(self._historical_calls(True), 4)
+
+
+
+class TestAcquireData(unittest.TestCase):
+    def test_loaded_data_read_only(self):
+        """Daten im Speicher werden als schreibgeschützte Sicht ohne Kopie geliefert."""
+        data = pd.DataFrame({'wind_speed_10min_avg': np.arange(144, dtype='float32')},
+                            index=pd.date_range("2024-06-01", periods=144, freq="10min", name='datetime'))
+        station = DataWindStation(data=data, station_id="00298")
+        with station.acquire_data("2024-06-01 01:00", "2024-06-01 02:00") as wind_df:
+            pd.testing.assert_frame_equal(wind_df, data.loc["2024-06-01 01:00":"2024-06-01 02:00"])
+            with self.assertRaises(ValueError):
+                wind_df.iloc[0, 0] = -1.0
+        station.data.iloc[0, 0] = -1.0
+
+    def test_no_data(self):
+        with self.assertRaises(ValueError):
+            DataWindStation(station_id="00298").acquire_data()
+
+
+if __name__ == '__main__':
+    unittest.main()
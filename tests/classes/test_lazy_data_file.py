@@ -0,0 +1,134 @@
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Boolean, Column, Integer, String, create_engine
+from sqlalchemy.orm import Session, declarative_base
+
+from treemotion.classes.lazy_data_file import LazyDataFile, register_data_file_listeners
+from treemotion.utils.data_file_io import read_feather_file, write_feather_chunks
+
+Base = declarative_base()
+
+CONFIG = SimpleNamespace(Data=SimpleNamespace(data_file_compression=None, data_file_compression_level=None,
+                                              data_file_memory_map=False))
+
+
+class DataFileStandIn(LazyDataFile, Base):
+    """Minimale Datenklasse mit Datendatei."""
+    __tablename__ = 'DataFileStandIn'
+    data_id = Column(Integer, primary_key=True)
+    data_filepath = Column(String)
+    data_changed = Column(Boolean)
+
+    def __init__(self, data_filepath: str, data: pd.DataFrame = None):
+        self.data_filepath = data_filepath
+        self.data_changed = False
+        self.data = data
+
+    @classmethod
+    def get_config(cls):
+        return CONFIG
+
+
+register_data_file_listeners([DataFileStandIn])
+
+
+def _data(rows: int = 100) -> pd.DataFrame:
+    index = pd.date_range("2022-01-29 12:00", periods=rows, freq="50ms", name="Time")
+    return pd.DataFrame({'value': np.arange(rows, dtype='float32')}, index=index)
+
+
+class TestLazyDataFile(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.filepath = Path(tmp_dir.name) / "data_1.feather"
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        self.session = Session(engine)
+        self.addCleanup(self.session.close)
+
+    def test_written_on_flush_and_read_on_access(self):
+        obj = DataFileStandIn(str(self.filepath), data=_data())
+        self.assertTrue(obj.data_changed)
+        self.session.add(obj)
+        self.session.commit()
+        self.assertTrue(self.filepath.exists())
+        self.assertFalse(obj.data_changed)
+
+        self.session.expunge_all()
+        loaded = self.session.get(DataFileStandIn, obj.data_id)
+        with mock.patch('treemotion.classes.lazy_data_file.read_feather_file',
+                        wraps=read_feather_file) as read:
+            self.assertFalse(loaded.is_data_loaded())
+            pd.testing.assert_frame_equal(loaded.data, _data(), check_freq=False)
+            self.assertIs(loaded.data, loaded.data)
+            self.assertEqual(read.call_count, 1)
+
+    def test_memory_map(self):
+        obj = DataFileStandIn(str(self.filepath), data=_data())
+        self.session.add(obj)
+        self.session.commit()
+        obj.unload_data()
+
+        with mock.patch.object(CONFIG.Data, 'data_file_memory_map', True):
+            values = obj.data['value'].to_numpy()
+        self.assertFalse(values.flags.writeable)
+        np.testing.assert_array_equal(values, _data()['value'].to_numpy())
+
+    def test_changed_data_written_once(self):
+        obj = DataFileStandIn(str(self.filepath), data=_data())
+        self.session.add(obj)
+        self.session.commit()
+
+        obj.data = _data(10)
+        with mock.patch.object(DataFileStandIn, 'write_data_file', autospec=True,
+                               side_effect=LazyDataFile.write_data_file) as write:
+            self.session.commit()
+            self.session.commit()
+        self.assertEqual(write.call_count, 1)
+        self.assertEqual(len(pd.read_feather(self.filepath)), 10)
+
+        # Nicht geladene Daten werden nicht geschrieben
+        obj.unload_data()
+        self.session.commit()
+        self.assertEqual(len(obj.data), 10)
+
+    def test_written_with_codec(self):
+        obj = DataFileStandIn(str(self.filepath), data=_data())
+        self.session.add(obj)
+        with mock.patch.multiple(CONFIG.Data, data_file_compression='zstd', data_file_compression_level=3), \
+                mock.patch('treemotion.classes.lazy_data_file.write_feather_chunks',
+                           wraps=write_feather_chunks) as write:
+            self.session.commit()
+        self.assertEqual(write.call_args.args[2:], ('zstd', 3))
+        pd.testing.assert_frame_equal(pd.read_feather(self.filepath), _data(), check_freq=False)
+
+    def test_dataset_updated_with_data_file(self):
+        obj = DataFileStandIn(str(self.filepath), data=_data())
+        self.session.add(obj)
+        with mock.patch.object(DataFileStandIn, 'update_time_partitioned_dataset', create=True) as update:
+            self.session.commit()
+            obj.data = _data(10)
+            self.session.commit()
+        self.assertEqual(update.call_count, 2)
+
+    def test_deleted_with_instance(self):
+        obj = DataFileStandIn(str(self.filepath), data=_data())
+        self.session.add(obj)
+        self.session.commit()
+        dataset_directory = self.filepath.with_suffix('.parquet')
+        dataset_directory.mkdir()
+        self.session.delete(obj)
+        self.session.commit()
+        self.assertFalse(self.filepath.exists())
+        self.assertFalse(dataset_directory.exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import treemotion
+from treemotion import Project, Series, Measurement, MeasurementVersion
+from treemotion.classes.base_class import BaseClass
+
+
+def _write_tms_csv(filepath: Path, config, seed: int):
+    index = pd.date_range("2022-01-29 12:00", periods=1_000, freq="50ms", name=config.data_tms_time_column)
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame(rng.normal(size=(len(index), len(config.data_tms_columns))).round(3),
+                        columns=config.data_tms_columns, index=index)
+    data.to_csv(filepath, sep=";", decimal=",", date_format="%Y-%m-%d %H:%M:%S.%f")
+
+
+class TestLoadAllFromCsv(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        treemotion.setup(working_directory=cls.tmp_dir.name, log_level="warning", safe_logs_to_file=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        MeasurementVersion.metadata.create_all(engine)
+        self.session = Session(engine)
+        self.addCleanup(self.session.close)
+        # Eigene Session statt der Datenbank im Arbeitsverzeichnis
+        self.commit = mock.Mock(side_effect=self.session.commit)
+        database_manager = SimpleNamespace(session=self.session, commit=self.commit)
+        patcher = mock.patch.object(BaseClass, 'get_database_manager', return_value=database_manager)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.project = Project(project_id=1)
+        for series_id in (1, 2):
+            series = Series(series_id=series_id)
+            for m_id in (2 * series_id - 1, 2 * series_id):
+                filepath = Path(self.tmp_dir.name) / f"tms_{m_id}.csv"
+                _write_tms_csv(filepath, treemotion.CONFIG.Data, seed=m_id)
+                series.measurement.append(Measurement(measurement_id=m_id, series_id=series_id,
+                                                      filepath_tms=str(filepath)))
+            self.project.series.append(series)
+        self.session.add(self.project)
+        self.session.commit()
+        self.commit.reset_mock()
+
+    def test_one_pool_and_commit(self):
+        """Alle Messungen des Projekts werden in einem Prozesspool importiert und einmal committet."""
+        with mock.patch('treemotion.classes.series.ProcessPoolExecutor', wraps=ProcessPoolExecutor) as pool, \
+                mock.patch.object(treemotion.CONFIG.Data, 'data_file_backend', 'parquet'), \
+                mock.patch('treemotion.classes.data_tms.DataTMS.update_time_partitioned_dataset') as update:
+            report = self.project.load_all_from_csv(max_workers=2)
+        self.assertEqual(pool.call_count, 1)
+        self.assertEqual(self.commit.call_count, 1)
+        # Der Datensatz wird in den Workern geschrieben
+        update.assert_not_called()
+        self.assertEqual(report.set_index('measurement_id')['series_id'].to_dict(), {1: 1, 2: 1, 3: 2, 4: 2})
+        self.assertEqual(set(report['status']), {'created'})
+
+
+if __name__ == '__main__':
+    unittest.main()
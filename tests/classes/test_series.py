@@ -0,0 +1,90 @@
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import treemotion
+from treemotion import Series, Measurement, MeasurementVersion, DataTMS
+from treemotion.classes.base_class import BaseClass
+
+
+def _write_tms_csv(filepath: Path, config, seed: int):
+    index = pd.date_range("2022-01-29 12:00", periods=5_000, freq="50ms", name=config.data_tms_time_column)
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame(rng.normal(size=(len(index), len(config.data_tms_columns))).round(3),
+                        columns=config.data_tms_columns, index=index)
+    data.to_csv(filepath, sep=";", decimal=",", date_format="%Y-%m-%d %H:%M:%S.%f")
+
+
+class TestLoadAllFromCsv(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        treemotion.setup(working_directory=cls.tmp_dir.name, log_level="warning", safe_logs_to_file=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        MeasurementVersion.metadata.create_all(engine)
+        self.session = Session(engine)
+        self.addCleanup(self.session.close)
+        # Eigene Session statt der Datenbank im Arbeitsverzeichnis
+        database_manager = SimpleNamespace(session=self.session, commit=self.session.commit)
+        patcher = mock.patch.object(BaseClass, 'get_database_manager', return_value=database_manager)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        config = treemotion.CONFIG.Data
+        self.series = Series(series_id=1)
+        self.csv_filepaths = {}
+        for m_id in (1, 2):
+            filepath = Path(self.tmp_dir.name) / f"tms_{m_id}.csv"
+            _write_tms_csv(filepath, config, seed=m_id)
+            self.csv_filepaths[m_id] = filepath
+            self.series.measurement.append(Measurement(measurement_id=m_id, series_id=1, filepath_tms=str(filepath)))
+        # Ohne CSV-Datei
+        self.series.measurement.append(Measurement(measurement_id=3, series_id=1))
+        self.session.add(self.series)
+        self.session.commit()
+
+    def _statuses(self, report: pd.DataFrame) -> dict:
+        return report.set_index('measurement_id')['status'].to_dict()
+
+    def test_load_all_from_csv(self):
+        """Die Datendateien werden in den Workern geschrieben und danach nicht noch einmal gelesen."""
+        with mock.patch('treemotion.classes.lazy_data_file.read_feather_file') as read:
+            report = self.series.load_all_from_csv(max_workers=2, chunksize=1000)
+            read.assert_not_called()
+        self.assertEqual(self._statuses(report), {1: 'created', 2: 'created', 3: 'failed'})
+        self.assertEqual(report.set_index('measurement_id').loc[1, 'rows'], 5_000)
+
+        for m_id, csv_filepath in self.csv_filepaths.items():
+            measurement = self.session.get(Measurement, m_id)
+            data_tms = measurement.measurement_version[0].data_tms
+            self.assertFalse(data_tms.is_data_loaded())
+            self.assertEqual(data_tms.csv_import_offset, csv_filepath.stat().st_size)
+            pd.testing.assert_frame_equal(data_tms.data, DataTMS.read_data_csv(str(csv_filepath)))
+
+    def test_unchanged_and_updated(self):
+        self.series.load_all_from_csv(max_workers=2)
+        report = self.series.load_all_from_csv(max_workers=2)
+        self.assertEqual(self._statuses(report), {1: 'unchanged', 2: 'unchanged', 3: 'failed'})
+
+        _write_tms_csv(self.csv_filepaths[1], treemotion.CONFIG.Data, seed=3)
+        report = self.series.load_all_from_csv(max_workers=2)
+        self.assertEqual(self._statuses(report), {1: 'updated', 2: 'unchanged', 3: 'failed'})
+        data_tms = self.session.get(Measurement, 1).measurement_version[0].data_tms
+        pd.testing.assert_frame_equal(data_tms.data, DataTMS.read_data_csv(str(self.csv_filepaths[1])))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from treemotion.tms.df_merge_by_time import merge_dfs_by_time, merge_dfs_by_shifted_time, calc_optimal_shift
+from treemotion.tms.rolling_extrema import rolling_max, piecewise_rolling_max
+
+
+class TestMergeByShiftedTime(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.tms_df = pd.DataFrame({'tms': rng.normal(size=20 * 60 * 60)},
+                                   index=pd.date_range("2024-06-01 10:00", periods=20 * 60 * 60, freq="50ms"))
+        self.wind_df = pd.DataFrame({'wind': rng.gamma(2, 2, 12).astype('float32')},
+                                    index=pd.date_range("2024-06-01 09:30", periods=12, freq="10min"))
+
+    def test_constant_shift_equals_index_shift(self):
+        """Konstante Verschiebung entspricht dem bisherigen Verschieben um ganze Indexwerte."""
+        shifted_wind = self.wind_df.shift(2)
+        expected = merge_dfs_by_time(self.tms_df, shifted_wind)
+        result = merge_dfs_by_shifted_time(self.tms_df, self.wind_df, 20 * 60)
+        pd.testing.assert_frame_equal(result, expected, check_freq=False)
+
+    def test_per_record_shift(self):
+        # Der dritte Datensatz überholt den zweiten
+        shift = np.zeros(len(self.wind_df))
+        shift[2] = -11 * 60
+        result = merge_dfs_by_shifted_time(self.tms_df, self.wind_df, shift)
+
+        times = self.wind_df.index + pd.to_timedelta(shift, unit='s')
+        order = np.argsort(times.asi8, kind='stable')
+        nearest = pd.Series(self.wind_df['wind'].to_numpy()[order], index=times[order])
+        expected = nearest.reindex(self.tms_df.index, method='nearest')
+        np.testing.assert_array_equal(result['wind'].to_numpy(), expected.to_numpy())
+
+
+class TestCalcOptimalShiftCoarseToFine(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(4)
+        n = 3 * 60 * 60 * 20
+        index = pd.date_range("2024-06-01 10:00", periods=n, freq="50ms")
+        wind = pd.Series(rng.gamma(2, 2, 40), index=pd.date_range("2024-06-01 07:00", periods=40, freq="10min"))
+        # Baum reagiert 17 Minuten nach der Windstation, mit Rauschen
+        response = wind.reindex(index - pd.Timedelta("17min"), method='nearest').to_numpy()
+        tms = pd.Series(0.3 * response + rng.normal(size=n), index=index)
+        self.tms = rolling_max(tms, '30min')
+        self.wind = piecewise_rolling_max(wind.reindex(index, method='nearest'), '30min')
+
+    def test_equals_full_search(self):
+        max_shift = 90 * 60 * 20
+        full = calc_optimal_shift(self.tms, self.wind, max_shift)
+        coarse = calc_optimal_shift(self.tms, self.wind, max_shift, coarse_factor=200)
+        self.assertLessEqual(abs(coarse[0] - full[0]), 1)
+        np.testing.assert_allclose(coarse[1:], full[1:], rtol=1e-9)
+        self.assertAlmostEqual(full[0] / 20 / 60, 17, delta=1)
+
+    def test_max_shift_limits_search(self):
+        coarse = calc_optimal_shift(self.tms, self.wind, 5 * 60 * 20, coarse_factor=200)
+        full = calc_optimal_shift(self.tms, self.wind, 5 * 60 * 20)
+        self.assertLessEqual(abs(coarse[0]), 5 * 60 * 20)
+        self.assertLessEqual(abs(coarse[0] - full[0]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from treemotion.tms.rolling_extrema import rolling_max, piecewise_rolling_max, sliding_max
+
+
+def assert_bit_identical(result: pd.Series, expected: pd.Series):
+    pd.testing.assert_index_equal(result.index, expected.index)
+    np.testing.assert_array_equal(result.to_numpy().view('int64'), expected.to_numpy().view('int64'))
+
+
+class TestRollingExtrema(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        n = 20 * 60 * 20
+        values = rng.normal(size=n).astype('float32')
+        values[rng.integers(0, n, 200)] = np.nan
+        values[:300] = np.nan
+        self.tms = pd.Series(values, index=pd.date_range("2024-06-01 10:00", periods=n, freq="50ms"), name='tms')
+
+        wind = rng.gamma(2, 2, 8)
+        wind[2] = np.nan
+        wind[5] = wind[4]
+        # 10 Minuten Wind auf 20 Hz verteilt, also stückweise konstant
+        self.wind = pd.Series(np.repeat(wind, n // 8), index=self.tms.index, name='wind')
+
+    def test_rolling_max_equals_pandas(self):
+        for window in ('30min', '1min', '7s', '75ms', '50ms', '1ms'):
+            assert_bit_identical(rolling_max(self.tms, window), self.tms.rolling(window, closed='right').max())
+
+    def test_irregular_index_falls_back_to_pandas(self):
+        tms = self.tms.drop(self.tms.index[1000:1500])
+        assert_bit_identical(rolling_max(tms, '1min'), tms.rolling('1min', closed='right').max())
+
+    def test_piecewise_rolling_max_equals_pandas(self):
+        for window in ('30min', '10min', '3min', '1s'):
+            assert_bit_identical(piecewise_rolling_max(self.wind, window),
+                                 self.wind.rolling(window, closed='right').max())
+        # Auch mit Lücken im Index
+        wind = self.wind.drop(self.wind.index[5000:9000])
+        assert_bit_identical(piecewise_rolling_max(wind, '5min'), wind.rolling('5min', closed='right').max())
+
+    def test_sliding_max_short_input(self):
+        np.testing.assert_array_equal(sliding_max(np.array([1.0, np.nan, 3.0, 2.0]), 10), [1.0, 1.0, 3.0, 3.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
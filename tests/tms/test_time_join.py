@@ -0,0 +1,55 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from treemotion.tms.time_join import TimeJoin, nearest_indexer
+
+
+class TestTimeJoin(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        self.tms_df = pd.DataFrame({'tms': rng.normal(size=6000)},
+                                   index=pd.date_range("2024-06-01 10:00", periods=6000, freq="1s"))
+        self.wind_df = pd.DataFrame({'wind': rng.gamma(2, 2, 14).astype('float32'),
+                                     'station_id': np.int32(298)},
+                                    index=pd.date_range("2024-06-01 09:40", periods=14, freq="10min"))
+
+    def test_nearest_indexer_equals_get_indexer(self):
+        # Zielzeiten genau zwischen zwei Quellzeiten: pandas nimmt die spätere
+        source = pd.date_range("2024-06-01", periods=5, freq="10min")
+        target = pd.date_range("2024-05-31 23:50", "2024-06-01 01:00", freq="1min")
+        expected = source.get_indexer(target, method='nearest')
+        np.testing.assert_array_equal(nearest_indexer(source.asi8, target.asi8), expected)
+
+    def test_join_equals_reindex_and_merge(self):
+        expected = pd.merge(self.tms_df, self.wind_df.reindex(self.tms_df.index, method='nearest'),
+                            left_index=True, right_index=True, how='outer')
+        result = TimeJoin(self.tms_df.index, self.wind_df.index).join(self.tms_df, self.wind_df)
+        pd.testing.assert_frame_equal(result, expected, check_freq=False)
+
+    def test_offset_equals_shift(self):
+        join = TimeJoin(self.tms_df.index, self.wind_df.index)
+        for offset in (-3, 2):
+            shifted = self.wind_df.shift(offset)
+            expected = pd.merge(self.tms_df, shifted.reindex(self.tms_df.index, method='nearest'),
+                                left_index=True, right_index=True, how='outer')
+            result = join.join(self.tms_df, self.wind_df, offset=offset)
+            # Integer-Spalten werden wie bei shift zu float64
+            pd.testing.assert_frame_equal(result, expected, check_freq=False)
+
+    def test_offset_columns(self):
+        join = TimeJoin(self.tms_df.index, self.wind_df.index)
+        result = join.join(self.tms_df, self.wind_df, offset=1, offset_columns=['wind'])
+        self.assertEqual(list(result.columns), ['tms', 'wind', 'station_id'])
+        self.assertEqual(result['station_id'].dtype, np.int32)
+        expected = self.wind_df['wind'].shift(1).reindex(self.tms_df.index, method='nearest')
+        np.testing.assert_array_equal(result['wind'].to_numpy(), expected.to_numpy())
+
+    def test_target_columns_not_copied(self):
+        result = TimeJoin(self.tms_df.index, self.wind_df.index).join(self.tms_df, self.wind_df)
+        self.assertTrue(np.shares_memory(result['tms'].to_numpy(), self.tms_df['tms'].to_numpy()))
+
+
+if __name__ == '__main__':
+    unittest.main()
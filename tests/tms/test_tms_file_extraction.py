@@ -0,0 +1,127 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from treemotion.tms.tms_file_extraction import read_tms_csv, iter_tms_csv_chunks, read_tms_csv_tail, import_tms_csv, \
+    get_csv_import_state
+from treemotion.utils.data_file_io import write_feather_chunks, read_feather_file, get_dataset_directory, \
+    is_dataset_fresh, read_time_partitioned_dataset
+from treemotion.utils.file_fingerprint import last_line_end_offset, prefix_checksum
+
+COLUMNS = ['East-West-Inclination', 'North-South-Inclination', 'Absolute-Inclination',
+           'Inclination direction of the tree', 'Temperature']
+COLUMNS_AND_DTYPES = {col: 'float64' for col in COLUMNS}
+
+
+class TestChunkedCsvImport(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.csv_filepath = Path(self.tmp_dir.name) / "tms.csv"
+
+        n = 10_007  # Keine ganze Anzahl an Chunks
+        rng = np.random.default_rng(42)
+        df = pd.DataFrame(rng.normal(size=(n, len(COLUMNS))).round(3), columns=COLUMNS,
+                          index=pd.date_range("2022-01-29 19:30", periods=n, freq="50ms", name="Time"))
+        df.iloc[10, 2] = np.nan
+        df.to_csv(self.csv_filepath, sep=";", decimal=",", date_format="%Y-%m-%d %H:%M:%S.%f")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_chunked_equals_eager(self):
+        """Der gestreamte Import muss identisch zum einmaligen Einlesen sein."""
+        eager = read_tms_csv(self.csv_filepath, "Time", COLUMNS_AND_DTYPES)
+
+        data_filepath = Path(self.tmp_dir.name) / "data" / "tms.feather"
+        chunks = iter_tms_csv_chunks(self.csv_filepath, "Time", COLUMNS_AND_DTYPES, chunksize=1000)
+        rows = write_feather_chunks(chunks, data_filepath)
+
+        self.assertEqual(rows, len(eager))
+        pd.testing.assert_frame_equal(read_feather_file(data_filepath), eager)
+
+    def test_append_tail_equals_full_import(self):
+        """Import eines wachsenden Files: erster Teil plus neuer Rest muss dem vollständigen Import entsprechen."""
+        content = self.csv_filepath.read_bytes()
+        growing_filepath = Path(self.tmp_dir.name) / "growing.csv"
+        growing_filepath.write_bytes(content[:content.index(b"\n", len(content) // 2) + 1])
+
+        first = read_tms_csv(growing_filepath, "Time", COLUMNS_AND_DTYPES)
+        offset = last_line_end_offset(growing_filepath)
+        checksum = prefix_checksum(growing_filepath, offset)
+
+        growing_filepath.write_bytes(content)
+        self.assertEqual(prefix_checksum(growing_filepath, offset), checksum)
+
+        tail = read_tms_csv_tail(growing_filepath, offset, "Time", COLUMNS_AND_DTYPES)
+        appended = pd.concat([first, tail[tail.index > first.index.max()]])
+        pd.testing.assert_frame_equal(appended, read_tms_csv(self.csv_filepath, "Time", COLUMNS_AND_DTYPES))
+
+    def test_incomplete_last_line(self):
+        """Eine unvollständige letzte Zeile wird nicht importiert, sondern mit dem nächsten Rest gelesen."""
+        content = self.csv_filepath.read_bytes()
+        growing_filepath = Path(self.tmp_dir.name) / "growing.csv"
+        line_end = content.index(b"\n", len(content) // 2) + 1
+        # Logger schreibt gerade die Zeile nach `line_end`, der Zeitstempel ist schon vollständig
+        growing_filepath.write_bytes(content[:content.index(b";", line_end + 30) + 4])
+
+        data_filepath = Path(self.tmp_dir.name) / "growing.feather"
+        for chunksize in (None, 1000):
+            result = import_tms_csv(growing_filepath, data_filepath, "Time", COLUMNS_AND_DTYPES, chunksize)
+            self.assertEqual(result['import_state']['csv_import_offset'], line_end)
+        first = read_feather_file(data_filepath)
+        pd.testing.assert_frame_equal(first, read_tms_csv(growing_filepath, "Time", COLUMNS_AND_DTYPES,
+                                                          end=line_end))
+
+        growing_filepath.write_bytes(content)
+        tail = read_tms_csv_tail(growing_filepath, result['import_state']['csv_import_offset'], "Time",
+                                 COLUMNS_AND_DTYPES)
+        self.assertEqual(tail.index[0], first.index.max() + pd.Timedelta("50ms"))
+        appended = pd.concat([first, tail[tail.index > result['import_state']['csv_import_last_time']]])
+        pd.testing.assert_frame_equal(appended, read_tms_csv(self.csv_filepath, "Time", COLUMNS_AND_DTYPES))
+
+    def test_usecols_skips_columns(self):
+        """Nicht gespeicherte (abgeleitete) Spalten werden beim Einlesen übersprungen."""
+        stored = {col: 'float64' for col in ['East-West-Inclination', 'North-South-Inclination', 'Temperature']}
+        eager = read_tms_csv(self.csv_filepath, "Time", stored, usecols=list(stored))
+        chunked = pd.concat(iter_tms_csv_chunks(self.csv_filepath, "Time", stored, 1000, usecols=list(stored)))
+
+        self.assertEqual(list(eager.columns), list(stored))
+        pd.testing.assert_frame_equal(chunked, eager)
+
+    def test_import_returns_import_state(self):
+        """Der Import im Worker liefert den Import-Zustand, die Datendatei muss dafür nicht gelesen werden."""
+        eager = read_tms_csv(self.csv_filepath, "Time", COLUMNS_AND_DTYPES)
+        expected = get_csv_import_state(self.csv_filepath, eager.index.max())
+        self.assertEqual(expected['csv_import_offset'], self.csv_filepath.stat().st_size)
+
+        for chunksize in (None, 1000):
+            data_filepath = Path(self.tmp_dir.name) / f"tms_{chunksize}.feather"
+            result = import_tms_csv(self.csv_filepath, data_filepath, "Time", COLUMNS_AND_DTYPES, chunksize)
+            self.assertEqual(result, {'rows': len(eager), 'import_state': expected})
+            pd.testing.assert_frame_equal(read_feather_file(data_filepath), eager)
+
+    def test_import_writes_dataset(self):
+        """Der Worker schreibt auch den zeitlich partitionierten Datensatz, ohne Optionen wird er entfernt."""
+        data_filepath = Path(self.tmp_dir.name) / "tms.feather"
+        dataset_options = {'row_group_size': 1000, 'compression': 'zstd', 'compression_level': None,
+                           'pre_filters': False}
+        import_tms_csv(self.csv_filepath, data_filepath, "Time", COLUMNS_AND_DTYPES, 1000,
+                       dataset_options=dataset_options)
+        directory = get_dataset_directory(data_filepath)
+        self.assertTrue(is_dataset_fresh(directory, data_filepath))
+        pd.testing.assert_frame_equal(read_time_partitioned_dataset(directory), read_feather_file(data_filepath))
+
+        import_tms_csv(self.csv_filepath, data_filepath, "Time", COLUMNS_AND_DTYPES, 1000)
+        self.assertFalse(directory.exists())
+
+    def test_missing_column_raises(self):
+        columns_and_dtypes = {**COLUMNS_AND_DTYPES, 'Missing': 'float64'}
+        with self.assertRaises(ValueError):
+            list(iter_tms_csv_chunks(self.csv_filepath, "Time", columns_and_dtypes, chunksize=1000))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from treemotion.utils.column_cache import ColumnCache
+from treemotion.utils.data_file_io import write_feather_chunks
+
+
+class TestColumnCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.df = pd.DataFrame(np.random.default_rng(1).normal(size=(1000, 3)), columns=['a', 'b', 'c'],
+                               index=pd.date_range("2022-01-29", periods=1000, freq="50ms", name="Time"))
+        self.filepath = Path(self.tmp_dir.name) / "data.feather"
+        write_feather_chunks([self.df], self.filepath)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_projected_read(self):
+        cache = ColumnCache(max_bytes=1 << 30)
+        pd.testing.assert_frame_equal(cache.get(self.filepath, ['c', 'a']), self.df[['c', 'a']], check_freq=False)
+        self.assertEqual(cache.nbytes, 2 * 2 * 8 * len(self.df))  # Zwei Spalten, je mit Index
+
+        cache.release(self.filepath)
+        self.assertEqual(cache.nbytes, 0)
+
+    def test_budget_releases_least_recently_used(self):
+        column_bytes = 2 * 8 * len(self.df)
+        cache = ColumnCache(max_bytes=2 * column_bytes)
+        cache.get(self.filepath, ['a'])
+        cache.get(self.filepath, ['b'])
+        cache.get(self.filepath, ['a'])
+        cache.get(self.filepath, ['c'])
+
+        self.assertEqual(cache.nbytes, 2 * column_bytes)
+        self.assertEqual(sorted(key[2] for key in cache._columns), ['a', 'c'])
+
+
+if __name__ == '__main__':
+    unittest.main()
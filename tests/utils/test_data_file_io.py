@@ -0,0 +1,99 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from treemotion.utils.data_file_io import get_dataset_directory, is_dataset_fresh, \
+    read_time_partitioned_dataset, write_time_partitioned_dataset, write_feather_chunks, read_feather_file, \
+    write_parquet_file, append_feather_chunks, append_time_partitioned_dataset
+
+
+class TestTimePartitionedDataset(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        n = 20 * 60 * 60 * 30  # 30 Stunden mit 20 Hz, über zwei Tageswechsel
+        rng = np.random.default_rng(42)
+        self.df = pd.DataFrame(rng.normal(size=(n, 3)), columns=['a', 'b', 'c'],
+                               index=pd.date_range("2022-01-29 19:30", periods=n, freq="50ms", name="Time"))
+        self.data_filepath = Path(self.tmp_dir.name) / "data.feather"
+        self.df.to_feather(self.data_filepath)
+        self.directory = get_dataset_directory(self.data_filepath)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_cut_equals_loc(self):
+        partitions = write_time_partitioned_dataset(self.df, self.directory, 72_000, self.data_filepath)
+        self.assertEqual(partitions, 3)
+
+        start, end = pd.Timestamp("2022-01-30 23:30"), pd.Timestamp("2022-01-31 00:30")
+        cut = read_time_partitioned_dataset(self.directory, start, end, columns=['b'])
+        pd.testing.assert_frame_equal(cut, self.df.loc[start:end, ['b']], check_freq=False)
+        pd.testing.assert_frame_equal(read_time_partitioned_dataset(self.directory), self.df, check_freq=False)
+
+    def test_stale_dataset(self):
+        write_time_partitioned_dataset(self.df, self.directory, 72_000, self.data_filepath)
+        self.assertTrue(is_dataset_fresh(self.directory, self.data_filepath))
+
+        self.df.iloc[:10].to_feather(self.data_filepath)
+        self.assertFalse(is_dataset_fresh(self.directory, self.data_filepath))
+
+    def test_append_equals_write(self):
+        """Anhängen schreibt nur die Tage der neuen Zeilen und entspricht dem vollständigen Schreiben."""
+        split = 20 * 60 * 60 * 20  # Mitten im zweiten Tag
+        write_feather_chunks([self.df.iloc[:split]], self.data_filepath)
+        write_time_partitioned_dataset(self.df.iloc[:split], self.directory, 72_000, self.data_filepath)
+        first_day = self.directory / "date=2022-01-29" / "part-0.parquet"
+        mtime_ns = first_day.stat().st_mtime_ns
+
+        self.assertEqual(append_feather_chunks([self.df.iloc[split:]], self.data_filepath), len(self.df) - split)
+        partitions = append_time_partitioned_dataset(self.df.iloc[split:], self.directory, 72_000,
+                                                     self.data_filepath)
+        self.assertEqual(partitions, 2)
+        self.assertEqual(first_day.stat().st_mtime_ns, mtime_ns)
+        self.assertTrue(is_dataset_fresh(self.directory, self.data_filepath))
+        pd.testing.assert_frame_equal(read_feather_file(self.data_filepath), self.df, check_freq=False)
+        pd.testing.assert_frame_equal(read_time_partitioned_dataset(self.directory), self.df, check_freq=False)
+
+        with self.assertRaises(ValueError):
+            append_feather_chunks([self.df[['a']]], self.data_filepath)
+
+
+class TestMemoryMappedFeather(unittest.TestCase):
+    def test_memory_map_equals_read(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            df = pd.DataFrame(np.random.default_rng(0).normal(size=(1000, 2)), columns=['a', 'b'],
+                              index=pd.date_range("2022-01-29", periods=1000, freq="50ms", name="Time"))
+            df.iloc[5, 0] = np.nan
+            filepath = Path(tmp_dir) / "data.feather"
+            write_feather_chunks([df], filepath)
+
+            mapped = read_feather_file(filepath, memory_map=True)
+            pd.testing.assert_frame_equal(mapped, df, check_freq=False)
+            pd.testing.assert_frame_equal(read_feather_file(filepath, columns=['b'], memory_map=True), df[['b']],
+                                          check_freq=False)
+            # Spalte ohne NaN ist eine schreibgeschützte Sicht auf die Datei
+            self.assertFalse(mapped['b'].to_numpy().flags.writeable)
+            del mapped
+
+    def test_codecs_roundtrip(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            df = pd.DataFrame(np.random.default_rng(0).normal(size=(1000, 2)).astype('float32'), columns=['a', 'b'],
+                              index=pd.date_range("2022-01-29", periods=1000, freq="50ms", name="Time"))
+            filepath = Path(tmp_dir) / "data.feather"
+            for compression in ['lz4', 'zstd']:
+                write_feather_chunks([df], filepath, compression, compression_level=1)
+                pd.testing.assert_frame_equal(read_feather_file(filepath), df, check_freq=False)
+
+            filepath = Path(tmp_dir) / "data.parquet"
+            write_parquet_file(df, filepath, compression='zstd', pre_filters=True)
+            pd.testing.assert_frame_equal(pd.read_parquet(filepath), df, check_freq=False)
+
+            with self.assertRaises(ValueError):
+                write_feather_chunks([df], Path(tmp_dir) / "x.feather", 'gzip')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from treemotion.utils.data_file_io import read_feather_file
+from treemotion.utils.frame_cache import SharedFrameCache, read_only_view
+
+
+class TestSharedFrameCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.filepath = Path(self.tmp_dir.name) / "wind.feather"
+        self.df = pd.DataFrame({'wind_speed_10min_avg': np.arange(144, dtype='float32'),
+                                'wind_direction_10min_avg': np.arange(144, dtype='int32')},
+                               index=pd.date_range("2024-06-01", periods=144, freq="10min", name='datetime'))
+        self.df.to_feather(self.filepath)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_shared_read_only_views(self):
+        cache = SharedFrameCache()
+        with cache.acquire(self.filepath, "2024-06-01 01:00", "2024-06-01 02:00") as part, \
+                cache.acquire(self.filepath) as full:
+            pd.testing.assert_frame_equal(part, self.df.loc["2024-06-01 01:00":"2024-06-01 02:00"], check_freq=False)
+            self.assertTrue(np.shares_memory(part['wind_speed_10min_avg'].to_numpy(),
+                                             full['wind_speed_10min_avg'].to_numpy()))
+            self.assertEqual(cache.refcount(self.filepath), 2)
+            with self.assertRaises(ValueError):
+                part.iloc[0, 0] = -1.0
+        self.assertEqual(cache.refcount(self.filepath), 0)
+
+    def test_read_once_without_copy(self):
+        df = read_feather_file(self.filepath)
+        values = df['wind_speed_10min_avg'].to_numpy()
+        cache = SharedFrameCache()
+        with mock.patch('treemotion.utils.frame_cache.read_feather_file', return_value=df) as read:
+            with cache.acquire(self.filepath) as first, cache.acquire(self.filepath, "2024-06-01 01:00") as second:
+                self.assertTrue(np.shares_memory(first['wind_speed_10min_avg'].to_numpy(), values))
+                self.assertTrue(np.shares_memory(second['wind_speed_10min_avg'].to_numpy(), values))
+        self.assertEqual(read.call_count, 1)
+
+    def test_read_only_view(self):
+        """Sicht auf Daten im Speicher: nicht beschreibbar, ohne Kopie, das Original bleibt beschreibbar."""
+        view = read_only_view(self.df.iloc[10:20])
+        pd.testing.assert_frame_equal(view, self.df.iloc[10:20])
+        self.assertTrue(np.shares_memory(view['wind_speed_10min_avg'].to_numpy(),
+                                         self.df['wind_speed_10min_avg'].to_numpy()))
+        with self.assertRaises(ValueError):
+            view.iloc[0, 0] = -1.0
+        self.df.iloc[10, 0] = -1.0
+        self.assertEqual(view.iloc[0, 0], -1.0)
+
+    def test_memory_map(self):
+        with SharedFrameCache(memory_map=True).acquire(self.filepath) as df:
+            pd.testing.assert_frame_equal(df, self.df, check_freq=False)
+            with self.assertRaises(ValueError):
+                df.iloc[0, 0] = -1.0
+
+    def test_rewritten_file_and_idle_limit(self):
+        cache = SharedFrameCache(max_idle=1)
+        cache.acquire(self.filepath).release()
+
+        self.df.iloc[0, 0] = 99.0
+        self.df.to_feather(self.filepath)
+        stat = self.filepath.stat()
+        os.utime(self.filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        with cache.acquire(self.filepath) as df:
+            self.assertEqual(df.iloc[0, 0], 99.0)
+        self.assertEqual(len(cache._frames), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from treemotion.utils.precision import to_precision, precision_loss
+
+
+class TestPrecision(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        n = 100_000
+        self.df = pd.DataFrame({
+            'East-West-Inclination': rng.uniform(-90, 90, n),
+            'Temperature': rng.uniform(-30, 60, n),
+            'station_id': np.full(n, 6163, dtype='int32'),
+        })
+
+    def test_to_precision_downcasts_only_floats(self):
+        df = to_precision(self.df, 'float32')
+        self.assertEqual(df['East-West-Inclination'].dtype, np.float32)
+        self.assertEqual(df['Temperature'].dtype, np.float32)
+        self.assertEqual(df['station_id'].dtype, np.int32)
+
+        # float64 policy lässt die Daten unverändert
+        self.assertIs(to_precision(self.df, 'float64'), self.df)
+
+    def test_float32_error_below_bound(self):
+        """Der Rundungsfehler von float32 muss unter 2**-24 relativ und 6e-6 Grad absolut bleiben."""
+        loss = precision_loss(self.df, 'float32')
+        self.assertListEqual(list(loss.index), ['East-West-Inclination', 'Temperature'])
+        self.assertTrue((loss['max_rel_error'] <= 2 ** -24).all())
+        self.assertLess(loss.loc['East-West-Inclination', 'max_abs_error'], 6e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
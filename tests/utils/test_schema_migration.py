@@ -0,0 +1,50 @@
+import unittest
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, create_engine, inspect, text
+from sqlalchemy.pool import StaticPool
+
+from treemotion.utils.schema_migration import SchemaMigration, add_missing_columns
+
+
+def _tables():
+    metadata = MetaData()
+    return Table('DataTMS', metadata, Column('data_id', Integer, primary_key=True), Column('data_filepath', String),
+                 Column('csv_import_offset', Integer), Column('csv_import_last_time', DateTime))
+
+
+class TestSchemaMigration(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://", poolclass=StaticPool)
+        with self.engine.begin() as connection:
+            # Datenbank einer älteren Version ohne die Import-Spalten
+            connection.execute(text("CREATE TABLE \"DataTMS\" (data_id INTEGER PRIMARY KEY, data_filepath VARCHAR)"))
+            connection.execute(text("INSERT INTO \"DataTMS\" VALUES (1, 'a.feather')"))
+
+    def test_add_missing_columns(self):
+        table = _tables()
+        with self.engine.begin() as connection:
+            added = add_missing_columns(connection, [table])
+        self.assertEqual(added, ['DataTMS.csv_import_offset', 'DataTMS.csv_import_last_time'])
+        columns = [col['name'] for col in inspect(self.engine).get_columns('DataTMS')]
+        self.assertEqual(columns, ['data_id', 'data_filepath', 'csv_import_offset', 'csv_import_last_time'])
+        with self.engine.connect() as connection:
+            row = connection.execute(text("SELECT * FROM \"DataTMS\"")).one()
+        self.assertEqual(tuple(row), (1, 'a.feather', None, None))
+
+        with self.engine.begin() as connection:
+            self.assertEqual(add_missing_columns(connection, [table]), [])
+
+    def test_migration_on_connect(self):
+        migration = SchemaMigration([_tables()])
+        migration.register()
+        try:
+            with self.engine.connect():
+                pass
+        finally:
+            migration.remove()
+        columns = [col['name'] for col in inspect(self.engine).get_columns('DataTMS')]
+        self.assertIn('csv_import_offset', columns)
+
+
+if __name__ == '__main__':
+    unittest.main()
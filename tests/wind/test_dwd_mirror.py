@@ -0,0 +1,115 @@
+import functools
+import hashlib
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from treemotion.wind.dwd_mirror import DwdMirror, create_dwd_session
+
+
+class DwdStandInHandler(SimpleHTTPRequestHandler):
+    """Lokaler Ersatz für den DWD-Server mit ETag und bedingten Requests."""
+    requests_log = []
+
+    def send_head(self):
+        path = Path(self.translate_path(self.path))
+        if path.is_file():
+            etag = f'"{hashlib.md5(path.read_bytes()).hexdigest()}"'
+            if self.headers.get('If-None-Match') == etag:
+                self.requests_log.append((self.path, 304))
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return None
+            self._etag = etag
+        self.requests_log.append((self.path, 200))
+        return super().send_head()
+
+    def end_headers(self):
+        etag = getattr(self, '_etag', None)
+        if etag:
+            self.send_header('ETag', etag)
+            self._etag = None
+        super().end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestDwdMirror(unittest.TestCase):
+    def setUp(self):
+        self.server_dir = tempfile.TemporaryDirectory()
+        self.mirror_dir = tempfile.TemporaryDirectory()
+        wind_dir = Path(self.server_dir.name) / "wind"
+        wind_dir.mkdir()
+        (wind_dir / "10minutenwerte_wind_00298_akt.zip").write_bytes(b"zip v1")
+        (wind_dir / "index.html").write_text(
+            '<html><a href="10minutenwerte_wind_00298_akt.zip">00298</a></html>')
+
+        handler = functools.partial(DwdStandInHandler, directory=self.server_dir.name)
+        DwdStandInHandler.requests_log = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/wind/"
+        self.wind_dir = wind_dir
+
+    def tearDown(self):
+        self.stop_server()
+        self.server_dir.cleanup()
+        self.mirror_dir.cleanup()
+
+    def stop_server(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def test_unchanged_file_served_locally(self):
+        mirror = DwdMirror(self.mirror_dir.name)
+        path = mirror.fetch_station_zip(self.url, "00298")
+        self.assertEqual(path.read_bytes(), b"zip v1")
+
+        # Listing aus dem Cache, Zip per bedingtem Request nicht erneut übertragen
+        self.assertEqual(mirror.fetch_station_zip(self.url, "00298"), path)
+        zip_requests = [status for url, status in DwdStandInHandler.requests_log if url.endswith(".zip")]
+        listing_requests = [url for url, _ in DwdStandInHandler.requests_log if url.endswith("/")]
+        self.assertEqual(zip_requests, [200, 304])
+        self.assertEqual(len(listing_requests), 1)
+
+        # Geänderte Datei wird neu geladen, auch von einer neuen Instanz
+        (self.wind_dir / "10minutenwerte_wind_00298_akt.zip").write_bytes(b"zip v2")
+        path = DwdMirror(self.mirror_dir.name).fetch_station_zip(self.url, "00298")
+        self.assertEqual(path.read_bytes(), b"zip v2")
+
+    def test_offline_serves_mirror(self):
+        mirror = DwdMirror(self.mirror_dir.name)
+        mirror.fetch(self.url + "10minutenwerte_wind_00298_akt.zip")
+        self.stop_server()
+
+        path = mirror.fetch(self.url + "10minutenwerte_wind_00298_akt.zip")
+        self.assertEqual(path.read_bytes(), b"zip v1")
+
+    def test_concurrent_fetch(self):
+        """Mehrere Stationen parallel über eine gemeinsame Session, die Liste wird nur einmal geladen."""
+        station_ids = [f"{i:05d}" for i in range(1, 13)]
+        for station_id in station_ids:
+            (self.wind_dir / f"10minutenwerte_wind_{station_id}_akt.zip").write_bytes(station_id.encode())
+        links = "".join(f'<a href="10minutenwerte_wind_{station_id}_akt.zip">{station_id}</a>'
+                        for station_id in station_ids)
+        (self.wind_dir / "index.html").write_text(f"<html>{links}</html>")
+
+        mirror = DwdMirror(self.mirror_dir.name, create_dwd_session(pool_size=4))
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            paths = list(executor.map(lambda station_id: mirror.fetch_station_zip(self.url, station_id),
+                                      station_ids))
+
+        self.assertEqual([path.read_bytes().decode() for path in paths], station_ids)
+        listing_requests = [url for url, _ in DwdStandInHandler.requests_log if url.endswith("/")]
+        self.assertEqual(len(listing_requests), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from treemotion.wind.station_catalog import StationCatalog, EARTH_RADIUS_KM
+from treemotion.wind.wind_file_extraction import extract_station_metadata
+
+STATION_LIST = """Stations_id von_datum bis_datum Stationshoehe geoBreite geoLaenge Stationsname Bundesland
+----------- --------- --------- ------------- --------- --------- ----------------------------------------- ----------
+00003 19930429 20110331            202     50.7827    6.0941 Aachen                                   Nordrhein-Westfalen
+00298 20070410 20240612             12     54.3218   13.0404 Barth                                    Mecklenburg-Vorpommern
+00303 20040614 20240612             46     52.3123   13.7416 Baruth                                   Brandenburg
+00433 20041101 20240612             48     52.4675   13.4021 Berlin-Tempelhof                         Berlin
+00403 20100101 20240612             51     52.4537   13.3017 Berlin-Dahlem (FU)                       Berlin
+"""
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class TestStationCatalog(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.filepath = Path(self.tmp_dir.name) / "zehn_min_ff_Beschreibung_Stationen.txt"
+        self.filepath.write_text(STATION_LIST, encoding='latin1')
+        self.catalog = StationCatalog.load(self.filepath)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_metadata_equals_line_scan(self):
+        for station_id in ["00003", "00403"]:
+            self.assertEqual(self.catalog.get_metadata(station_id),
+                             extract_station_metadata(station_id, str(self.filepath)))
+        with self.assertRaises(ValueError):
+            self.catalog.get_metadata("99999")
+
+    def test_cache_reused(self):
+        cache = self.filepath.with_suffix('.feather')
+        self.assertTrue(cache.exists())
+        self.assertTrue(StationCatalog.load(self.filepath).stations.equals(self.catalog.stations))
+
+    def test_nearest(self):
+        # Berlin-Mitte: Tempelhof vor Dahlem, Aachen ist inaktiv
+        nearest = self.catalog.nearest(52.52, 13.405, k=3)
+        self.assertEqual(list(nearest['station_id']), ["00433", "00403", "00303"])
+        expected = haversine_km(52.52, 13.405, nearest['station_latitude'], nearest['station_longitude'])
+        np.testing.assert_allclose(nearest['distance_km'], expected, rtol=1e-9)
+
+        self.assertIn("00003", set(self.catalog.nearest(52.52, 13.405, k=5, active_days=None)['station_id']))
+
+        # Dahlem hat erst ab 2010 Daten
+        covering = self.catalog.nearest(52.52, 13.405, k=2, start_time="2008-05-01", end_time="2024-06-12 12:00")
+        self.assertEqual(list(covering['station_id']), ["00433", "00303"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,23 @@
+import unittest
+
+import numpy as np
+
+from treemotion.wind._wind_correction import calc_wind_front_delay
+
+
+class TestWindFrontDelay(unittest.TestCase):
+    def test_calm_records_not_shifted(self):
+        """Bei nahezu Windstille keine Laufzeit statt einer an max_delay_sec abgeschnittenen."""
+        direction = np.array([0, 0, 0, 0])
+        speed = np.array([10.0, 1.0, 0.0, np.nan])
+        delay = calc_wind_front_delay(direction, speed, distance=6000, direction=180, front_speed_factor=1.0,
+                                      max_delay_sec=5400)
+        np.testing.assert_allclose(delay, [-1200, -5400, -5400, 0])
+
+        delay = calc_wind_front_delay(direction, speed, distance=6000, direction=180, front_speed_factor=1.0,
+                                      max_delay_sec=5400, min_wind_speed=2.0)
+        np.testing.assert_allclose(delay, [-1200, 0, 0, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
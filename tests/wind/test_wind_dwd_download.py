@@ -0,0 +1,38 @@
+import unittest
+
+import pandas as pd
+
+from treemotion.wind.wind_dwd_download import find_historical_zip_urls, get_historical_period
+
+LINK = "https://opendata.dwd.de/historical/"
+HREFS = ["10minutenwerte_wind_00298_20100101_20191231_hist.zip",
+         "10minutenwerte_wind_00298_19930101_19991231_hist.zip",
+         "10minutenwerte_wind_00298_20000101_20091231_hist.zip"]
+
+
+class ListingStandIn:
+    """Ersatz für DwdMirror.find_files mit fester Verzeichnisliste."""
+    def find_files(self, link, pattern):
+        return list(HREFS)
+
+
+class TestWindDwdDownload(unittest.TestCase):
+    def test_get_historical_period(self):
+        start, end = get_historical_period(HREFS[0])
+        self.assertEqual(start, pd.Timestamp("2010-01-01"))
+        self.assertEqual(end, pd.Timestamp("2019-12-31 23:59:59.999999999"))
+        with self.assertRaises(ValueError):
+            get_historical_period("10minutenwerte_wind_00298_akt.zip")
+
+    def test_find_historical_zip_urls_in_range(self):
+        mirror = ListingStandIn()
+        self.assertEqual(find_historical_zip_urls(LINK, "00298", mirror),
+                         [LINK + HREFS[1], LINK + HREFS[2], LINK + HREFS[0]])
+        self.assertEqual(find_historical_zip_urls(LINK, "00298", mirror, start_time="2009-12-31 12:00"),
+                         [LINK + HREFS[2], LINK + HREFS[0]])
+        self.assertEqual(find_historical_zip_urls(LINK, "00298", mirror, start_time="2005-01-01",
+                                                  end_time="2008-01-01"), [LINK + HREFS[2]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import io
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from treemotion.wind.wind_file_extraction import extract_wind_df, parse_mess_datum, read_wind_file, combine_archives, \
+    dwd_time_to_utc
+
+WIND = b"""STATIONS_ID;MESS_DATUM;  QN;FF_10;DD_10;eor
+        298;202402282350;    3;   3.4;  250;eor
+        298;202402290000;    3;-999;  -999;eor
+        298;202402290010;    3;   2.1;  240;eor
+        298;202402290020;    3;   2.0;  230;eor
+"""
+WIND_EXTREME = b"""STATIONS_ID;MESS_DATUM;  QN;FX_10;FNX_10;FMX_10;DX_10;eor
+        298;202402282350;    3;   6.1;   1.2;   4.0;  260;eor
+        298;202402290000;    3;   5.0;-999;   3.5;  255;eor
+        298;202402290010;    3;   4.2;   0.9;   3.1;  245;eor
+"""
+
+
+class TestWindFileExtraction(unittest.TestCase):
+    def test_parse_mess_datum(self):
+        index = pd.date_range("1899-12-31 23:50", "2100-03-01", freq="997min")
+        values = index.strftime('%Y%m%d%H%M').astype('int64').to_numpy()
+        pd.testing.assert_index_equal(parse_mess_datum(values), pd.DatetimeIndex(index, name='datetime'),
+                                      exact=False)
+        for invalid in [202302290000, 202313010000, 202301012400, 202301010060]:
+            with self.assertRaises(ValueError):
+                parse_mess_datum(np.array([invalid]))
+
+    def test_extract_wind_df(self):
+        df = extract_wind_df(io.BytesIO(WIND), io.BytesIO(WIND_EXTREME))
+
+        self.assertEqual(list(df.columns), ['station_id', 'quality_level_wind_avg', 'wind_speed_10min_avg',
+                                            'wind_direction_10min_avg', 'quality_level_wind_extremes',
+                                            'wind_speed_max_10min', 'wind_speed_min_10min',
+                                            'wind_speed_max_10min_moving_avg', 'wind_direction_max_wind_speed'])
+        # Nur Zeitpunkte in beiden Dateien
+        self.assertEqual(list(df.index.strftime('%Y%m%d%H%M')), ['202402282350', '202402290000', '202402290010'])
+        self.assertEqual(df['wind_speed_10min_avg'].dtype, 'float32')
+        self.assertEqual(df['wind_direction_10min_avg'].dtype, 'int32')
+        # -999 ist NaN in Float-Spalten und der letzte gültige Wert in Integer-Spalten
+        self.assertTrue(np.isnan(df['wind_speed_10min_avg'].iloc[1]))
+        self.assertTrue(np.isnan(df['wind_speed_min_10min'].iloc[1]))
+        self.assertEqual(list(df['wind_direction_10min_avg']), [250, 250, 240])
+
+    def test_dwd_time_to_utc(self):
+        """Bis Ende 1999 MEZ, ab 2000 UTC."""
+        index = pd.DatetimeIndex(["1999-12-31 23:40", "1999-12-31 23:50", "2000-01-01 00:00"], name='datetime')
+        pd.testing.assert_index_equal(
+            dwd_time_to_utc(index),
+            pd.DatetimeIndex(["1999-12-31 22:40", "1999-12-31 22:50", "2000-01-01 00:00"], name='datetime'))
+        recent = pd.DatetimeIndex(["2024-02-29 00:00"], name='datetime')
+        self.assertIs(dwd_time_to_utc(recent), recent)
+
+    def test_combine_archives(self):
+        """Historisches und aktuelles Archiv überlappen, doppelte Zeitpunkte aus dem ersten Archiv."""
+        recent = read_wind_file(io.BytesIO(WIND))
+        historical = recent.iloc[:2].copy()
+        historical['FF_10'] = np.float32([1.0, 1.5])
+
+        combined = combine_archives([historical, recent])
+        self.assertTrue(combined.index.is_unique and combined.index.is_monotonic_increasing)
+        self.assertEqual(len(combined), len(recent))
+        self.assertEqual(list(combined['FF_10'].iloc[:3]), [1.0, 1.5, np.float32(2.1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from treemotion.wind.wind_interpolation import interpolate_wind, distance_and_bearing
+
+
+def station_df(speed, direction, start="2024-06-01 00:00"):
+    index = pd.date_range(start, periods=len(speed), freq="10min", name='datetime')
+    return pd.DataFrame({'station_id': 1, 'wind_speed_10min_avg': np.float32(speed),
+                         'wind_direction_10min_avg': np.int32(direction)}, index=index)
+
+
+class TestWindInterpolation(unittest.TestCase):
+    def test_distance_and_bearing(self):
+        distance, bearing = distance_and_bearing(52.0, 13.0, [53.0, 52.0], [13.0, 14.0])
+        np.testing.assert_allclose(distance, [111.19, 68.45], atol=0.01)
+        np.testing.assert_allclose(bearing, [0.0, 89.6], atol=0.1)
+
+    def test_idw(self):
+        a = station_df([2.0, 4.0, np.nan], [350, 90, 90])
+        b = station_df([4.0, 8.0, 6.0], [10, 90, 180])
+        # b doppelt so weit weg: Gewicht 1/4 von a
+        df = interpolate_wind([a, b], [10.0, 20.0], [0.0, 180.0])
+
+        np.testing.assert_allclose(df['wind_speed_10min_avg'], [2.4, 4.8, 6.0], rtol=1e-6)
+        # Richtungen als Einheitsvektoren gemittelt: 350° und 10° ergeben ~354°, nicht 270°
+        self.assertAlmostEqual(float(df['wind_direction_10min_avg'].iloc[0]), 354.0, delta=0.5)
+        np.testing.assert_allclose(df['wind_direction_10min_avg'].iloc[1:], [90.0, np.degrees(np.arctan2(0.8, -0.2))],
+                                   atol=0.01)
+
+    def test_shared_grid(self):
+        a = station_df([1.0, 1.0], [0, 0])
+        b = station_df([3.0, 3.0], [0, 0], start="2024-06-01 00:10")
+        df = interpolate_wind([a, b], [10.0, 10.0], [0.0, 180.0])
+        self.assertEqual(len(df), 3)
+        np.testing.assert_allclose(df['wind_speed_10min_avg'], [1.0, 2.0, 3.0])
+
+    def test_direction_favours_upwind(self):
+        # Wind aus Norden: die Station im Norden liegt stromaufwärts
+        north = station_df([2.0], [0])
+        south = station_df([4.0], [0])
+        idw = interpolate_wind([north, south], [10.0, 10.0], [0.0, 180.0], method='idw')
+        direction = interpolate_wind([north, south], [10.0, 10.0], [0.0, 180.0], method='direction',
+                                     direction_floor=0.2)
+        self.assertAlmostEqual(float(idw['wind_speed_10min_avg'].iloc[0]), 3.0, places=5)
+        self.assertAlmostEqual(float(direction['wind_speed_10min_avg'].iloc[0]), (2.0 + 0.2 * 4.0) / 1.2, places=5)
+
+
+if __name__ == '__main__':
+    unittest.main()
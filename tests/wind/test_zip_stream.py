@@ -0,0 +1,70 @@
+import io
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+
+from treemotion.wind.zip_stream import open_zip_member
+
+PRODUCT = ("STATIONS_ID;MESS_DATUM;FF_10;eor\n" +
+           "".join(f"298;2023010100{i % 60:02d};{i / 10};eor\n" for i in range(4999))).encode()
+
+
+class UnseekableStream(io.RawIOBase):
+    """Nicht seekbarer Ausgabestrom, zipfile schreibt dann Data Descriptors wie beim Streaming."""
+
+    def __init__(self):
+        super().__init__()
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.data += b
+        return len(b)
+
+
+def build_zip(seekable: bool = True, compression: int = zipfile.ZIP_DEFLATED) -> bytes:
+    stream = io.BytesIO() if seekable else UnseekableStream()
+    with zipfile.ZipFile(stream, 'w', compression=compression) as zip_file:
+        zip_file.writestr("Metadaten_Geographie_00298.txt", b"metadata " * 1000)
+        zip_file.writestr("produkt_zehn_min_ff_20230101_20231231_00298.txt", PRODUCT)
+    return stream.getvalue() if seekable else bytes(stream.data)
+
+
+class TestZipStream(unittest.TestCase):
+    def test_member_equals_zipfile(self):
+        for seekable in (True, False):
+            for compression in (zipfile.ZIP_DEFLATED, zipfile.ZIP_STORED):
+                with self.subTest(seekable=seekable, compression=compression):
+                    if not seekable and compression == zipfile.ZIP_STORED:
+                        continue
+                    with open_zip_member(io.BytesIO(build_zip(seekable, compression)), r"^produkt_") as member:
+                        self.assertEqual(member.read(), PRODUCT)
+
+    def test_parse_and_keep(self):
+        """Der Member wird direkt von pandas gelesen, optional bleibt die entpackte Datei erhalten."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with open_zip_member(io.BytesIO(build_zip(False)), r"^produkt_", keep_directory=tmp_dir) as member:
+                df = pd.read_csv(member, sep=';')
+            self.assertEqual(len(df), 4999)
+            kept = Path(tmp_dir) / "produkt_zehn_min_ff_20230101_20231231_00298.txt"
+            self.assertEqual(kept.read_bytes(), PRODUCT)
+
+    def test_corrupt_member_raises(self):
+        data = bytearray(build_zip(True, zipfile.ZIP_STORED))
+        data[data.index(b"298;") + 1] ^= 1
+        with self.assertRaises(ValueError):
+            with open_zip_member(io.BytesIO(bytes(data)), r"^produkt_") as member:
+                member.read()
+
+    def test_missing_member_raises(self):
+        with self.assertRaises(ValueError):
+            open_zip_member(io.BytesIO(build_zip()), r"^missing_")
+
+
+if __name__ == '__main__':
+    unittest.main()
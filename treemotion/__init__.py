@@ -8,6 +8,8 @@ from kj_core import PlotManager
 
 from .classes import DataWindStation, DataTMS, DataMerge, DataLS3
 from .classes import Project, Series, Measurement, MeasurementVersion, TreeTreatment, Tree, TreeCable
+from .classes.lazy_data_file import register_data_file_listeners
+from .utils.schema_migration import SchemaMigration
 from .tms.crown_motion_similarity.cms import CrownMotionSimilarity
 
 CONFIG = None
@@ -15,6 +17,9 @@ DATA_MANAGER = None
 DATABASE_MANAGER = None
 PLOT_MANAGER = None
 
+# Tables with columns added after the first release, existing databases get them on connect
+SCHEMA_MIGRATION = SchemaMigration([Series.__table__, DataTMS.__table__, DataMerge.__table__])
+
 
 def setup(working_directory: Optional[str] = None, log_level="info", safe_logs_to_file=True) -> tuple[
     Config, LogManager, DataManager, DatabaseManager, PlotManager]:
@@ -41,8 +46,11 @@ def setup(working_directory: Optional[str] = None, log_level="info", safe_logs_t
     DATA_MANAGER = DataManager(CONFIG)
 
     # Listen to changes on Attribut-"data" for all classes of type CoreDataClass
-    DATA_MANAGER.register_listeners([DataWindStation, DataTMS, DataMerge, DataLS3])
+    DATA_MANAGER.register_listeners([DataLS3])
+    # Data read on first access, written and deleted with the instance, see classes/lazy_data_file.py
+    register_data_file_listeners([DataWindStation, DataTMS, DataMerge])
 
+    SCHEMA_MIGRATION.register()
     DATABASE_MANAGER = DatabaseManager(CONFIG)
 
     PLOT_MANAGER = PlotManager(CONFIG)
@@ -1,3 +1,4 @@
+import shutil
 import numpy as np
 import pandas as pd
 from typing import Type, Dict, Tuple, List, Optional, Union, Any, Callable
@@ -15,6 +16,10 @@ from ..tms.tempdrift import temp_drift_comp_lin_reg, temp_drift_comp_lin_reg_2,
 from ..tms.tempdrift import fft_freq_filter, butter_lowpass_filter
 from ..tms.rotate import rotate_pca
 from ..tms.inclination import calc_abs_inclino, calc_inclination_direction
+from ..utils.precision import to_precision, precision_loss
+from ..utils.data_file_io import get_dataset_directory, is_dataset_fresh, write_time_partitioned_dataset, \
+    read_time_partitioned_dataset, read_feather_columns
+from ..utils.column_cache import ColumnCache
 
 logger = get_logger(__name__)
 
@@ -41,6 +46,23 @@ class BaseClassDataTMS(BaseClass):
         "rotate_pca": rotate_pca
     }
 
+    # Shared by all TMS data classes, see get_column_cache
+    _column_cache: Optional[ColumnCache] = None
+
+    # Columns computed from the EW/NS axes: column -> (function, x column, y column)
+    derived_columns: Dict[str, Tuple[Callable, str, str]] = {
+        'Absolute-Inclination': (
+            calc_abs_inclino, 'East-West-Inclination', 'North-South-Inclination'),
+        'Inclination direction of the tree': (
+            calc_inclination_direction, 'East-West-Inclination', 'North-South-Inclination'),
+        'Absolute-Inclination - drift compensated': (
+            calc_abs_inclino, 'East-West-Inclination - drift compensated',
+            'North-South-Inclination - drift compensated'),
+        'Inclination direction of the tree - drift compensated': (
+            calc_inclination_direction, 'East-West-Inclination - drift compensated',
+            'North-South-Inclination - drift compensated'),
+    }
+
     def __init__(self, data: pd.DataFrame = None, measurement_version_id: int = None, tempdrift_method: str = None,
                  filter_method: str = None, rotation_method: str = None):
         super().__init__()
@@ -90,10 +112,11 @@ class BaseClassDataTMS(BaseClass):
         filter_func = self.filter_methods[freq_filter]
         rotation_func = self.rotation_methods[rotation]
 
+        data = self.get_stored_data()
         if method in ["linear", "linear_2"]:
-            kwargs["temperature"] = self.data["Temperature"]
+            kwargs["temperature"] = data["Temperature"]
 
-        data_copy = self.data.copy()
+        data_copy = data.copy()
         try:
             for axis in ['East-West-Inclination', 'North-South-Inclination']:
                 inclino_series = data_copy[axis]
@@ -105,12 +128,17 @@ class BaseClassDataTMS(BaseClass):
             if rotation_func:
                 data_copy = self.rotate(data_copy, rotation_func)
 
-            data_copy = self.calc_inclino_abs_and_dir(data_copy)
+            if self.store_derived_columns():
+                data_copy = self.calc_inclino_abs_and_dir(data_copy)
+            else:
+                data_copy = self.drop_derived_columns(data_copy)
+            data_copy = to_precision(data_copy, self.get_config().Data.data_tms_default_dtype)
 
             if inplace:
                 self.data = data_copy
                 self.tempdrift_method = method
                 self.filter_method = freq_filter
+                self._data_modified()
 
             if auto_commit:
                 self.get_database_manager().commit()
@@ -123,6 +151,172 @@ class BaseClassDataTMS(BaseClass):
             logger.error(f"Error in performing temperature drift compensation: {e}")
             raise
 
+    def _data_modified(self):
+        """
+        Hook called after the data was modified in place. Subclasses reset state that depends on the data
+        and call this implementation, which counts up the version of the data and drops the cached derived
+        columns. Code writing into the arrays of the data (e.g. `data.loc[...] = ...`) has to call it.
+        """
+        self._data_version = getattr(self, '_data_version', 0) + 1
+        self._derived_cache = {}
+
+    @classmethod
+    def store_derived_columns(cls) -> bool:
+        """
+        Returns True if the derived columns are stored, see 'data_tms_store_derived_columns' in config.
+        """
+        return cls.get_config().Data.data_tms_store_derived_columns
+
+    @classmethod
+    def get_stored_columns(cls, columns: List[str]) -> List[str]:
+        """
+        Returns the columns of `columns` that are stored, without the derived columns if they are not stored.
+        """
+        if cls.store_derived_columns():
+            return list(columns)
+        return [col for col in columns if col not in cls.derived_columns]
+
+    @classmethod
+    def drop_derived_columns(cls, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Drops the derived columns from `data`, they are recomputed on access.
+        """
+        return data.drop(columns=[col for col in cls.derived_columns if col in data.columns])
+
+    @classmethod
+    def add_derived_columns(cls, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Adds the derived columns missing in `data` whose axes are present. Returns `data` if nothing is missing.
+        """
+        missing = {col: func(data[x_col], data[y_col]) for col, (func, x_col, y_col) in cls.derived_columns.items()
+                   if col not in data.columns and x_col in data.columns and y_col in data.columns}
+        if not missing:
+            return data
+        return data.assign(**missing)
+
+    def get_column(self, column: str) -> pd.Series:
+        """
+        Returns a column of the data. Derived columns which are not stored are computed from the EW/NS axes
+        and cached until the data changes, see `_data_modified`. With lazy loading only this column is read
+        from the data file.
+
+        Parameters:
+            column (str): Name of the column.
+
+        Returns:
+            pd.Series: The column.
+
+        Raises:
+            KeyError: If the column is neither in the data nor a derived column.
+        """
+        file_columns = self._get_lazy_file_columns()
+        if file_columns is None:
+            if column in self.data.columns:
+                return self.data[column]
+        elif column in file_columns:
+            return self.get_column_cache().get(self.data_filepath, [column])[column]
+        if column not in self.derived_columns:
+            raise KeyError(f"Column '{column}' not in data of '{self}'.")
+
+        func, x_col, y_col = self.derived_columns[column]
+        x_series = self.get_column(x_col)
+        y_series = self.get_column(y_col)
+        x = x_series.to_numpy()
+        y = y_series.to_numpy()
+
+        cache = getattr(self, '_derived_cache', None)
+        if cache is None:
+            cache = self._derived_cache = {}
+        cached = cache.get(column)
+        # An entry is valid for one version of the data, a pointer check alone misses writes into the axes.
+        # The cache holds the axes arrays, so their memory cannot be reused while the entry is compared
+        version = getattr(self, '_data_version', 0)
+        if cached is None or cached[0] != version or not (_same_array(cached[1], x) and _same_array(cached[2], y)):
+            values = func(x_series, y_series).to_numpy()
+            cached = cache[column] = (version, x, y, values)
+        return pd.Series(cached[3], index=x_series.index, name=column)
+
+    def get_data(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Returns the data including the derived columns which are not stored. With lazy loading only the
+        requested columns are read from the data file.
+
+        Parameters:
+            columns (List[str], optional): Columns to return. Defaults to all stored and derived columns.
+
+        Returns:
+            pd.DataFrame: The data, `self.data` itself if all columns are stored and in memory.
+        """
+        file_columns = self._get_lazy_file_columns()
+        available = list(self.data.columns) if file_columns is None else file_columns
+        if columns is None:
+            columns = available + [
+                col for col, (_, x_col, y_col) in self.derived_columns.items()
+                if col not in available and x_col in available and y_col in available]
+            if file_columns is None and len(columns) == len(available):
+                return self.data
+        elif file_columns is None and all(col in available for col in columns):
+            return self.data[columns]
+
+        stored = [col for col in columns if col in available]
+        derived = {col: self.get_column(col).to_numpy() for col in columns if col not in available}
+        if file_columns is None:
+            data = self.data[stored]
+        elif stored:
+            data = self.get_column_cache().get(self.data_filepath, stored)
+        else:
+            data = pd.DataFrame(index=self.get_column(columns[0]).index)
+        return data.assign(**derived)[columns]
+
+    def get_stored_data(self) -> pd.DataFrame:
+        """
+        Returns the stored columns of the data without the derived columns which are not stored. With lazy
+        loading they are read from the data file.
+
+        Returns:
+            pd.DataFrame: The stored data, `self.data` itself if it is in memory. Do not modify it in place.
+        """
+        file_columns = self._get_lazy_file_columns()
+        if file_columns is None:
+            return self.data
+        return self.get_column_cache().get(self.data_filepath, file_columns)
+
+    @classmethod
+    def get_column_cache(cls) -> ColumnCache:
+        """
+        Returns the column cache for lazy loading shared by all TMS data classes, see utils/column_cache.py.
+        """
+        if BaseClassDataTMS._column_cache is None:
+            config = cls.get_config().Data
+            BaseClassDataTMS._column_cache = ColumnCache(config.data_column_cache_max_bytes,
+                                                         memory_map=config.data_file_memory_map)
+        return BaseClassDataTMS._column_cache
+
+    def _get_lazy_file_columns(self) -> Optional[List[str]]:
+        """
+        Returns the columns of the data file if columns are read lazily from it, i.e. 'data_lazy_loading' is
+        enabled in config and the data is not in memory. Returns None if the data in memory has to be used.
+        """
+        if not self.get_config().Data.data_lazy_loading or self.is_data_loaded() or not self.data_filepath:
+            return None
+        filepath = Path(self.data_filepath)
+        if not filepath.exists():
+            return None
+
+        mtime_ns = filepath.stat().st_mtime_ns
+        cached = getattr(self, '_file_columns_cache', None)
+        if cached is None or cached[0] != mtime_ns:
+            cached = self._file_columns_cache = (mtime_ns, read_feather_columns(filepath))
+        return cached[1]
+
+    def release_data(self):
+        """
+        Releases the columns of this instance read lazily from the data file and the cached derived columns.
+        """
+        if self.data_filepath:
+            self.get_column_cache().release(self.data_filepath)
+        self._derived_cache = {}
+
     @staticmethod
     def rotate(data: pd.DataFrame, rotation_func: Callable) -> pd.DataFrame:
         x_axs = 'East-West-Inclination - drift compensated'
@@ -156,6 +350,30 @@ class BaseClassDataTMS(BaseClass):
             data['North-South-Inclination - drift compensated'])
         return data
 
+    def check_precision(self, dtype: str = 'float32', resolution: Optional[float] = None) -> pd.DataFrame:
+        """
+        Checks the rounding error of storing the data with a narrower float dtype, see utils/precision.py.
+
+        Parameters:
+            dtype (str): Storage dtype to check. Defaults to 'float32'.
+            resolution (float, optional): Resolution of the logged values. Defaults to 'data_tms_resolution' in config.
+
+        Returns:
+            pd.DataFrame: 'max_abs_error' and 'max_rel_error' per float column and 'below_resolution',
+                          True if the absolute error is below half of the resolution.
+        """
+        resolution = resolution or self.get_config().Data.data_tms_resolution
+        result = precision_loss(self.get_stored_data(), dtype)
+        result['below_resolution'] = result['max_abs_error'] < resolution / 2
+
+        if result['below_resolution'].all():
+            logger.info(f"Precision check for '{self}' with '{dtype}' passed, "
+                        f"max_abs_error: '{result['max_abs_error'].max():.3g}'")
+        else:
+            logger.warning(f"Precision check for '{self}' with '{dtype}' failed for columns: "
+                           f"{list(result.index[~result['below_resolution']])}")
+        return result
+
     def compare_correct_tms_data_methods(self) -> Dict[str, pd.DataFrame]:
         """
         Compares different methods for correcting TMS data for temperature drift, filtering, and rotation.
@@ -163,7 +381,7 @@ class BaseClassDataTMS(BaseClass):
         Returns:
             A dictionary with keys as method descriptions and values as the compensated data DataFrames.
         """
-        results = {"original": self.data.copy()}
+        results = {"original": self.add_derived_columns(self.get_stored_data().copy())}
 
         tempdrift_methods = ["linear"]  # Placeholder for additional methods: "moving_average", "emd", "linear_2"
         filter_methods = ["butter_lowpass"]  # Placeholder for additional methods: "no_filter", "fft"
@@ -179,7 +397,7 @@ class BaseClassDataTMS(BaseClass):
             compensated_data = self.correct_tms_data(method=method, freq_filter=freq_filter, rotation=rotation,
                                                      inplace=False)
             key = f"{method}_{freq_filter}_{rotation}" if method != "emd" else f"{method}_{rotation}"  # Special handling for "emd" method
-            results[key] = compensated_data
+            results[key] = self.add_derived_columns(compensated_data)
 
         return results
 
@@ -252,21 +470,23 @@ class BaseClassDataTMS(BaseClass):
 
         logger.info(f"Selecting a random sample of {n} data points.")
 
-        if n > len(self.data):
+        data = self.get_stored_data()
+        if n > len(data):
             logger.warning(
-                f"The requested sample size ({n}) exceeds the data length ({len(self.data)}). Using all data.")
-            n = len(self.data)
+                f"The requested sample size ({n}) exceeds the data length ({len(data)}). Using all data.")
+            n = len(data)
 
         try:
             # Sample without replacement, sort indices to preserve order
-            sampled_indices = self.data.sample(n, random_state=None).index
+            sampled_indices = data.sample(n, random_state=None).index
             sampled_indices_sorted = sorted(sampled_indices)
 
             # Use loc to maintain the datetime index
-            sampled_data = self.data.loc[sampled_indices_sorted]
+            sampled_data = data.loc[sampled_indices_sorted]
 
             if inplace:
                 self.data = sampled_data
+                self._data_modified()
 
             if auto_commit:
                 self.get_database_manager().commit()
@@ -307,11 +527,14 @@ class BaseClassDataTMS(BaseClass):
 
         # Attempt to limit data within the specified time range
         try:
-            data = self.data.copy()
-            data = time_cut_by_datetime_index(data, start_time=start_time, end_time=end_time)
+            data = self._cut_by_dataset(start_time, end_time)
+            if data is None:
+                data = self.data.copy()
+                data = time_cut_by_datetime_index(data, start_time=start_time, end_time=end_time)
 
             if inplace:
                 self.data = data
+                self._data_modified()
 
             if auto_commit:
                 self.get_database_manager().commit()
@@ -324,12 +547,67 @@ class BaseClassDataTMS(BaseClass):
             logger.error(f"Error limiting the data of '{self}': {e}")
             return
 
+    def write_time_partitioned_dataset(self) -> Optional[Path]:
+        """
+        Writes the data as day partitioned Parquet dataset next to the data file, see utils/data_file_io.py.
+        The data file must be up to date, the dataset records its state to detect when it gets stale.
+
+        Returns:
+            Path: Directory of the dataset, None if the data file is not up to date.
+        """
+        if self.data_changed or not self.data_filepath or not Path(self.data_filepath).exists():
+            logger.warning(f"Data file of '{self}' not up to date, time partitioned dataset not written.")
+            return None
+
+        directory = get_dataset_directory(self.data_filepath)
+        write_time_partitioned_dataset(self.data, directory, source_filepath=self.data_filepath,
+                                       **self.get_dataset_options())
+        logger.info(f"Wrote time partitioned dataset of '{self}' to '{directory}'.")
+        return directory
+
+    @classmethod
+    def get_dataset_options(cls) -> Dict[str, Any]:
+        """
+        Returns the options of the time partitioned dataset from config, see
+        data_file_io.write_time_partitioned_dataset.
+        """
+        config = cls.get_config().Data
+        return {'row_group_size': config.data_parquet_row_group_size, 'compression': config.data_parquet_compression,
+                'compression_level': config.data_parquet_compression_level,
+                'pre_filters': config.data_parquet_pre_filters}
+
+    def update_time_partitioned_dataset(self):
+        """
+        Keeps the time partitioned dataset in line with the data file after it was written: writes it again with
+        the 'parquet' data file backend, otherwise removes a stale one.
+        """
+        if self.get_config().Data.data_file_backend == 'parquet':
+            self.write_time_partitioned_dataset()
+            return
+        directory = get_dataset_directory(self.data_filepath)
+        if directory.exists():
+            shutil.rmtree(directory)
+            logger.debug(f"Removed stale time partitioned dataset of '{self}'.")
+
+    def _cut_by_dataset(self, start_time: str, end_time: str) -> Optional[pd.DataFrame]:
+        """
+        Reads only the partitions and row groups of the time partitioned dataset in range. Returns None if
+        'data_file_backend' is not 'parquet' in config, the data is in memory or the dataset is missing or stale.
+        """
+        if self.get_config().Data.data_file_backend != 'parquet' or self.is_data_loaded() or not self.data_filepath:
+            return None
+        directory = get_dataset_directory(self.data_filepath)
+        if not is_dataset_fresh(directory, self.data_filepath):
+            logger.debug(f"No up to date time partitioned dataset for '{self}', cut in memory.")
+            return None
+        return read_time_partitioned_dataset(directory, start_time, end_time)
+
     @property
     def peak_max(self) -> Optional[Tuple]:
 
         column: str = self.get_config().Data.main_tms_value
         try:
-            index, value = find_max_peak(self.data[column])
+            index, value = find_max_peak(self.get_column(column))
         except Exception as e:
             logger.warning(f"No peak found for {self}, error: {e}")
             return None
@@ -350,7 +628,7 @@ class BaseClassDataTMS(BaseClass):
         prominence: int = config.peak_n_prominence
 
         try:
-            peaks: pd.Series = find_n_peaks(self.data[column], n_peaks, sample_rate, min_time_diff, prominence)
+            peaks: pd.Series = find_n_peaks(self.get_column(column), n_peaks, sample_rate, min_time_diff, prominence)
 
         except Exception as e:
             raise ValueError(f"No peaks found for {self}, error: {e}")
@@ -359,3 +637,11 @@ class BaseClassDataTMS(BaseClass):
         if False:
             logger.debug(f"Peaks found in {self}:\n {peaks}\n")
         return peaks
+
+
+def _same_array(a: np.ndarray, b: np.ndarray) -> bool:
+    """
+    Checks if two arrays are views on the same memory with the same layout.
+    """
+    return (a.__array_interface__['data'][0] == b.__array_interface__['data'][0] and a.shape == b.shape
+            and a.strides == b.strides and a.dtype == b.dtype)
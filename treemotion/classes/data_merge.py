@@ -3,11 +3,13 @@ from kj_core.df_utils.validate import validate_df
 
 from ..common_imports.imports_classes import *
 from .base_class_data_tms import BaseClassDataTMS
+from .lazy_data_file import LazyDataFile
+from ..utils.precision import to_precision
 
 logger = get_logger(__name__)
 
 
-class DataMerge(CoreDataClass, BaseClassDataTMS):
+class DataMerge(LazyDataFile, CoreDataClass, BaseClassDataTMS):
     __tablename__ = 'DataMerge'
     data_id = Column(Integer, primary_key=True, autoincrement=True, nullable=False, unique=True)
     data_filepath = Column(String, unique=True)
@@ -20,22 +22,39 @@ class DataMerge(CoreDataClass, BaseClassDataTMS):
     tempdrift_method = Column(String)
     filter_method = Column(String)
     rotation_method = Column(String)
+    # Parameters of the merge, a virtual DataMerge has no data file and computes its data from them on access.
+    # With site coordinates the wind records are also shifted by the travel time of the wind front
+    virtual = Column(Boolean)
+    shift_sec = Column(Float)
+    time_rolling_max = Column(String)
+    site_latitude = Column(Float)
+    site_longitude = Column(Float)
 
     def __init__(self, data_id: int = None, data: pd.DataFrame = None, data_filepath: str = None, data_changed: bool = False, datetime_added=None,
-                 datetime_last_edit=None, measurement_version_id: int = None, tempdrift_method: str = None, filter_method: str = None, rotation_method: str = None):
+                 datetime_last_edit=None, measurement_version_id: int = None, tempdrift_method: str = None, filter_method: str = None, rotation_method: str = None,
+                 virtual: bool = False, shift_sec: float = None, time_rolling_max: str = None,
+                 site_latitude: float = None, site_longitude: float = None):
         CoreDataClass.__init__(self, data_id=data_id, data=data, data_filepath=data_filepath, data_changed=data_changed,
                                datetime_added=datetime_added, datetime_last_edit=datetime_last_edit)
         BaseClassDataTMS.__init__(self, data=data, measurement_version_id=measurement_version_id, tempdrift_method=tempdrift_method,
                                   filter_method=filter_method, rotation_method=rotation_method)
+        self.virtual = virtual
+        self.shift_sec = shift_sec
+        self.time_rolling_max = time_rolling_max
+        self.site_latitude = site_latitude
+        self.site_longitude = site_longitude
 
     def __str__(self):
         """
         Returns a string representation of the DataMerge instance.
         """
-        return f"{self.__class__.__name__}: data_id='{self.data_id}', measurement_version={self.measurement_version_id}'"
+        virtual = ", virtual" if self.virtual else ""
+        return f"{self.__class__.__name__}: data_id='{self.data_id}', measurement_version={self.measurement_version_id}'{virtual}"
 
     @classmethod
-    def create_from_measurement_version(cls, measurement_version_id, data) -> 'DataMerge':
+    def create_from_measurement_version(cls, measurement_version_id, data, shift_sec: float = None,
+                                        time_rolling_max: str = None, site_latitude: float = None,
+                                        site_longitude: float = None) -> 'DataMerge':
         try:
             # create data_filepath
             data_directory: Path = cls.get_config().data_directory
@@ -47,8 +66,13 @@ class DataMerge(CoreDataClass, BaseClassDataTMS):
             )
             data_filepath = str(data_directory / folder / filename)
 
+            if not cls.store_derived_columns():
+                data = cls.drop_derived_columns(data)
+            data = to_precision(data, cls.get_config().Data.data_tms_default_dtype)
             obj = cls(data=data, data_filepath=data_filepath,
-                      measurement_version_id=measurement_version_id)
+                      measurement_version_id=measurement_version_id, shift_sec=shift_sec,
+                      time_rolling_max=time_rolling_max, site_latitude=site_latitude,
+                      site_longitude=site_longitude)
             logger.info(f"New {obj}")
             session = cls.get_database_manager().session
             session.add(obj)
@@ -59,7 +83,32 @@ class DataMerge(CoreDataClass, BaseClassDataTMS):
                 f"Error creating {cls.__name__} from from measurement_version_id: '{measurement_version_id}': {e}")
             raise
 
-    def update_from_measurement_version(self, data) -> None:
+    @classmethod
+    def create_virtual_from_measurement_version(cls, measurement_version_id: int, shift_sec: float,
+                                                time_rolling_max: str, site_latitude: float = None,
+                                                site_longitude: float = None) -> 'DataMerge':
+        """
+        Creates a virtual DataMerge, which stores only the parameters of the merge instead of a data file.
+        Its data is computed from the DataTMS and the wind station of the measurement version on access.
+
+        Parameters:
+            measurement_version_id (int): ID of the MeasurementVersion.
+            shift_sec (float): Shift of the wind data in seconds, see MeasurementVersion.sync_wind_tms_data.
+            time_rolling_max (str): Window of the rolling maximum.
+            site_latitude (float, optional): Latitude of the site for the wind front shift.
+            site_longitude (float, optional): Longitude of the site for the wind front shift.
+
+        Returns:
+            DataMerge: The new instance, added to the session.
+        """
+        obj = cls(measurement_version_id=measurement_version_id, virtual=True, shift_sec=shift_sec,
+                  time_rolling_max=time_rolling_max, site_latitude=site_latitude, site_longitude=site_longitude)
+        logger.info(f"New {obj}")
+        cls.get_database_manager().session.add(obj)
+        return obj
+
+    def update_from_measurement_version(self, data, shift_sec: float = None, time_rolling_max: str = None,
+                                        site_latitude: float = None, site_longitude: float = None) -> None:
         """
         Updates the object with data from the station.
 
@@ -68,12 +117,141 @@ class DataMerge(CoreDataClass, BaseClassDataTMS):
             Exception: Propagates any exceptions that occur during the update.
         """
         try:
-            self.data = data
+            if not self.store_derived_columns():
+                data = self.drop_derived_columns(data)
+            self.data = to_precision(data, self.get_config().Data.data_tms_default_dtype)
+            self.shift_sec = shift_sec
+            self.time_rolling_max = time_rolling_max
+            self.site_latitude = site_latitude
+            self.site_longitude = site_longitude
+            self._data_modified()
 
         except Exception as e:
             logger.error(f"Error in updating from station: {e}")
             raise
 
+    def update_virtual(self, shift_sec: float, time_rolling_max: str, site_latitude: float = None,
+                       site_longitude: float = None) -> None:
+        """
+        Updates the parameters of a virtual DataMerge, its data is computed with them on the next access.
+        """
+        self.shift_sec = shift_sec
+        self.time_rolling_max = time_rolling_max
+        self.site_latitude = site_latitude
+        self.site_longitude = site_longitude
+        self._data_modified()
+        logger.info(f"Updated {self}: shift_sec '{shift_sec}', time_rolling_max '{time_rolling_max}'")
+
+    def materialize(self, start_time=None, end_time=None) -> pd.DataFrame:
+        """
+        Computes the merged data of a virtual DataMerge with its stored parameters, optionally only for a time
+        range (e.g. in chunks). The data is not stored, see MeasurementVersion.sync_wind_tms_data.
+
+        Parameters:
+            start_time: Optional start of the range.
+            end_time: Optional end of the range (included).
+
+        Returns:
+            pd.DataFrame: The merged data.
+        """
+        _, data = self.measurement_version.sync_wind_tms_data(shift_sec=self.shift_sec,
+                                                              site_latitude=self.site_latitude,
+                                                              site_longitude=self.site_longitude,
+                                                              start_time=start_time, end_time=end_time,
+                                                              time_rolling_max=self.time_rolling_max)
+        if not self.store_derived_columns():
+            data = self.drop_derived_columns(data)
+        return to_precision(data, self.get_config().Data.data_tms_default_dtype)
+
+    def _get_virtual_data(self) -> pd.DataFrame:
+        # The whole merged data is kept until the parameters or the TMS or wind data change, or release_data is called
+        sources = self._get_sources_version()
+        cached = getattr(self, '_virtual_data', None)
+        if cached is None or cached[0] != sources:
+            cached = self._virtual_data = (sources, self.materialize())
+        return cached[1]
+
+    def _get_sources_version(self) -> Tuple:
+        """
+        Returns the data versions of the TMS data and the wind station the data of a virtual DataMerge is computed
+        from, see LazyDataFile.get_data_version.
+        """
+        measurement_version = self.measurement_version
+        return (measurement_version.data_tms.get_data_version(),
+                measurement_version.data_wind_station.get_data_version())
+
+    def get_data(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Returns the data, see BaseClassDataTMS.get_data. A virtual DataMerge computes it, see materialize.
+        """
+        if not self.virtual:
+            return super().get_data(columns)
+        data = self.add_derived_columns(self._get_virtual_data())
+        return data if columns is None else data[columns]
+
+    def get_column(self, column: str) -> pd.Series:
+        """
+        Returns a column of the data, see BaseClassDataTMS.get_column. A virtual DataMerge computes it, see materialize.
+        """
+        if not self.virtual:
+            return super().get_column(column)
+        data = self._get_virtual_data()
+        if column not in data.columns and column not in self.derived_columns:
+            raise KeyError(f"Column '{column}' not in data of '{self}'.")
+        return self.get_data([column])[column]
+
+    def get_stored_data(self) -> pd.DataFrame:
+        """
+        Returns the stored columns of the data, see BaseClassDataTMS.get_stored_data. A virtual DataMerge computes
+        them, see materialize.
+        """
+        if not self.virtual:
+            return super().get_stored_data()
+        return self._get_virtual_data()
+
+    def cut_by_time(self, start_time: str, end_time: str, inplace: bool = False,
+                    auto_commit: bool = False) -> Optional[pd.DataFrame]:
+        """
+        Limits the data to a time range, see BaseClassDataTMS.cut_by_time. A virtual DataMerge computes only the
+        range, with `inplace` it is stored afterward like a DataMerge created from the data.
+        """
+        if not self.virtual:
+            return super().cut_by_time(start_time, end_time, inplace, auto_commit)
+
+        data = self.materialize(start_time, end_time)
+        if inplace:
+            self.data = data
+            self._data_modified()
+        if auto_commit:
+            self.get_database_manager().commit()
+        logger.info(f"Computed the data of '{self}' between '{start_time}' and '{end_time}', inplace: '{inplace}'.")
+        return data
+
+    def release_data(self):
+        """
+        Releases the lazily read or computed data of this instance, see BaseClassDataTMS.release_data.
+        """
+        self._virtual_data = None
+        super().release_data()
+
+    def _data_modified(self):
+        """
+        Drops the computed data of a virtual DataMerge. If data was set, e.g. corrected or cut in place, it can no
+        longer be computed from the merge parameters and the DataMerge is stored with a data file from now on.
+        """
+        self._virtual_data = None
+        if self.virtual and self.data is not None:
+            data_directory: Path = self.get_config().data_directory
+            filename: str = self.get_data_manager().get_new_filename(
+                data_id=self.measurement_version_id,
+                prefix=f"data_merge",
+                file_extension="feather"
+            )
+            self.data_filepath = str(data_directory / self.get_config().Data.data_merge_directory / filename)
+            self.virtual = False
+            logger.info(f"Data of virtual '{self}' modified, stored from now on.")
+        super()._data_modified()
+
     def validate_data(self) -> bool:
         """
         Checks if the DataFrame data is valid and contains the required columns.
@@ -82,7 +260,7 @@ class DataMerge(CoreDataClass, BaseClassDataTMS):
             bool: True if the DataFrame is valid, False otherwise.
         """
         try:
-            validate_df(df=self.data, columns=self.get_config().Data.data_merge_columns)
+            validate_df(df=self.get_stored_data(), columns=self.get_stored_columns(self.get_config().Data.data_merge_columns))
             logger.debug(f"Data validation for '{self}' correct!")
             return True
         except Exception as e:
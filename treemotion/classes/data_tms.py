@@ -3,11 +3,16 @@ from kj_core.df_utils.validate import validate_df
 
 from ..common_imports.imports_classes import *
 from .base_class_data_tms import BaseClassDataTMS
+from .lazy_data_file import LazyDataFile
+from ..tms.tms_file_extraction import read_tms_csv, iter_tms_csv_chunks, read_tms_csv_tail, get_csv_import_state
+from ..utils.data_file_io import write_feather_chunks, read_feather_file, append_feather_chunks, \
+    append_time_partitioned_dataset, get_dataset_directory, is_dataset_fresh
+from ..utils.file_fingerprint import last_line_end_offset, prefix_checksum, quick_hash
 
 logger = get_logger(__name__)
 
 
-class DataTMS(CoreDataClass, BaseClassDataTMS):
+class DataTMS(LazyDataFile, CoreDataClass, BaseClassDataTMS):
     __tablename__ = 'DataTMS'
     data_id = Column(Integer, primary_key=True, autoincrement=True, unique=True)
     data_filepath = Column(String, unique=True)
@@ -18,36 +23,296 @@ class DataTMS(CoreDataClass, BaseClassDataTMS):
     tempdrift_method = Column(String)
     filter_method = Column(String)
     rotation_method = Column(String)
+    # State of the last CSV import, used for incremental imports of growing CSV files
+    csv_import_offset = Column(Integer)
+    csv_import_last_time = Column(DateTime)
+    csv_import_checksum = Column(String)
+    # Fingerprint of the imported CSV file, an import of an unchanged file is skipped
+    csv_size = Column(Integer)
+    csv_mtime = Column(Float)
+    csv_hash = Column(String)
 
     def __init__(self, data_id: int = None, data: pd.DataFrame = None, data_filepath: str = None, data_changed: bool = False, datetime_added=None,
-                 datetime_last_edit=None, measurement_version_id: int = None, tempdrift_method: str = None, filter_method: str = None, rotation_method: str = None):
+                 datetime_last_edit=None, measurement_version_id: int = None, tempdrift_method: str = None, filter_method: str = None, rotation_method: str = None,
+                 csv_import_offset: int = None, csv_import_last_time=None, csv_import_checksum: str = None,
+                 csv_size: int = None, csv_mtime: float = None, csv_hash: str = None):
         CoreDataClass.__init__(self, data_id=data_id, data=data, data_filepath=data_filepath, data_changed=data_changed,
                                datetime_added=datetime_added, datetime_last_edit=datetime_last_edit)
         BaseClassDataTMS.__init__(self, data=data, measurement_version_id=measurement_version_id,
                                   tempdrift_method=tempdrift_method, filter_method=filter_method,
                                   rotation_method=rotation_method)
+        self.csv_import_offset = csv_import_offset
+        self.csv_import_last_time = csv_import_last_time
+        self.csv_import_checksum = csv_import_checksum
+        self.csv_size = csv_size
+        self.csv_mtime = csv_mtime
+        self.csv_hash = csv_hash
 
     @classmethod
-    def create_from_csv(cls, csv_filepath: str, data_filepath: str, measurement_version_id: int) -> Optional['DataTMS']:
+    def create_from_csv(cls, csv_filepath: str, data_filepath: str, measurement_version_id: int,
+                        chunksize: Optional[int] = None) -> Optional['DataTMS']:
+        """
+        Creates a new DataTMS instance from a CSV file.
+
+        :param csv_filepath: Path to the CSV file.
+        :param data_filepath: Path of the data file of the new instance.
+        :param measurement_version_id: ID of the MeasurementVersion the data belongs to.
+        :param chunksize: Rows per chunk for the streaming import, 0 reads the whole CSV at once. None uses config.
+        :return: The new DataTMS instance.
+        """
+        if chunksize is None:
+            chunksize = cls.get_config().Data.data_tms_csv_chunksize
 
-        data: pd.DataFrame = cls.read_data_csv(csv_filepath)
-        obj = cls(data=data, data_filepath=data_filepath, measurement_version_id=measurement_version_id)
+        # Lines written by the logger during the import are left to the next import
+        end = last_line_end_offset(csv_filepath) if Path(csv_filepath).exists() else None
+        if chunksize:
+            obj = cls(data_filepath=data_filepath, measurement_version_id=measurement_version_id)
+            obj._import_data_csv_chunked(csv_filepath, chunksize, end)
+        else:
+            data: pd.DataFrame = cls.read_data_csv(csv_filepath, end)
+            obj = cls(data=data, data_filepath=data_filepath, measurement_version_id=measurement_version_id)
+        obj.record_csv_import_state(csv_filepath, end)
         logger.info(f"Created new '{obj}'")
         return obj
 
-    def update_from_csv(self, csv_filepath: str) -> Optional['DataTMS']:
-        self.data = self.read_data_csv(csv_filepath)
+    def update_from_csv(self, csv_filepath: str, chunksize: Optional[int] = None,
+                        force: bool = False) -> 'DataTMS':
+        """
+        Updates the data of the instance from a CSV file.
+
+        :param csv_filepath: Path to the CSV file.
+        :param chunksize: Rows per chunk for the streaming import, 0 reads the whole CSV at once. None uses config.
+        :param force: If True, imports the CSV file even if it is unchanged since the last import.
+        :return: The DataTMS instance, unchanged if the CSV file does not exist.
+        """
+        if not Path(csv_filepath).exists():
+            logger.error(f"search_path {csv_filepath} does not exist, '{self}' not updated.")
+            return self
+
+        if not force and self.is_csv_unchanged(csv_filepath):
+            logger.info(f"'{Path(csv_filepath).stem}' unchanged since last import, '{self}' not updated.")
+            return self
+
+        if chunksize is None:
+            chunksize = self.get_config().Data.data_tms_csv_chunksize
+
+        # Lines written by the logger during the import are left to the next import
+        end = last_line_end_offset(csv_filepath)
+        if chunksize:
+            self._import_data_csv_chunked(csv_filepath, chunksize, end)
+        else:
+            self.data = self.read_data_csv(csv_filepath, end)
+            self._data_modified()
+        self.record_csv_import_state(csv_filepath, end)
         logger.info(f"Updated new '{self}'")
 
         return self
 
+    @dec_runtime
+    def append_from_csv(self, csv_filepath: str, chunksize: Optional[int] = None,
+                        force: bool = False) -> 'DataTMS':
+        """
+        Appends the rows added to a growing CSV file since the last import.
+
+        Only the complete lines after the recorded byte offset are parsed, a line the logger is still writing
+        is read with the next append. The new rows are appended to the data file and the new days to the time
+        partitioned dataset without loading the stored data, see `_append_to_data_file`. Falls back to a full
+        `update_from_csv` if there is no recorded import state, the data was corrected in the meantime,
+        or the already imported part of the file has changed (checksum mismatch).
+
+        :param csv_filepath: Path to the CSV file.
+        :param chunksize: Rows per chunk, only used if falling back to a full import.
+        :param force: If True, imports the CSV file even if it is unchanged since the last import.
+        :return: The DataTMS instance, unchanged if the CSV file does not exist.
+        """
+        filepath = Path(csv_filepath)
+        if not filepath.exists():
+            logger.error(f"search_path {filepath} does not exist, '{self}' not updated.")
+            return self
+
+        if not force and self.is_csv_unchanged(csv_filepath):
+            logger.info(f"'{filepath.stem}' unchanged since last import, '{self}' not updated.")
+            return self
+
+        if None in (self.csv_import_offset, self.csv_import_last_time, self.csv_import_checksum):
+            logger.info(f"No import state for '{self}', full import of '{filepath.stem}'.")
+            return self.update_from_csv(csv_filepath, chunksize, force=True)
+
+        if any((self.tempdrift_method, self.filter_method, self.rotation_method)):
+            logger.warning(f"Data of '{self}' was corrected, full import of '{filepath.stem}'.")
+            return self.update_from_csv(csv_filepath, chunksize, force=True)
+
+        offset: int = self.csv_import_offset
+        if (filepath.stat().st_size < offset or
+                prefix_checksum(filepath, offset) != self.csv_import_checksum):
+            logger.warning(f"Already imported part of '{filepath.stem}' has changed, full import.")
+            return self.update_from_csv(csv_filepath, chunksize, force=True)
+
+        end = last_line_end_offset(filepath)
+        if end <= offset:
+            logger.info(f"No new data in '{filepath.stem}' for '{self}'.")
+            return self
+
+        config = self.get_config().Data
+        try:
+            tail = read_tms_csv_tail(filepath, offset, config.data_tms_time_column,
+                                     self.get_columns_and_dtypes(), self.get_csv_usecols(), end)
+        except pd.errors.ParserError as e:
+            logger.error(f"Error while reading the file {filepath.stem}. Please check the file format.")
+            raise e
+
+        # Only complete lines are imported, rows already stored are skipped in case the file was rewritten
+        last_time = pd.Timestamp(self.csv_import_last_time)
+        tail = tail[tail.index > last_time]
+        if not tail.empty:
+            if self.is_data_loaded() and self.data_changed:
+                # Not yet written, the data file is written with the appended rows on flush
+                self.data = pd.concat([self.data, tail])
+            else:
+                try:
+                    self._append_to_data_file(tail)
+                except (ValueError, OSError) as e:
+                    logger.warning(f"Cannot append to the data file of '{self}', full import: {e}")
+                    return self.update_from_csv(csv_filepath, chunksize, force=True)
+            self._data_modified()
+            last_time = tail.index.max()
+        self.record_csv_import_state(csv_filepath, end, last_time)
+        logger.info(f"Appended {len(tail)} rows from '{filepath.stem}' to '{self}'.")
+        return self
+
+    def _append_to_data_file(self, tail: pd.DataFrame):
+        """
+        Appends rows to the data file and the time partitioned dataset, see data_file_io.append_feather_chunks
+        and data_file_io.append_time_partitioned_dataset. The stored data is not loaded, it is read on the next
+        access. A missing or stale dataset is written again completely, see `update_time_partitioned_dataset`.
+        """
+        config = self.get_config().Data
+        directory = get_dataset_directory(self.data_filepath)
+        dataset_fresh = config.data_file_backend == 'parquet' and is_dataset_fresh(directory, self.data_filepath)
+
+        append_feather_chunks([tail], self.data_filepath, config.data_file_compression,
+                              config.data_file_compression_level)
+        self.unload_data()
+        self.release_data()
+        if dataset_fresh:
+            append_time_partitioned_dataset(tail, directory, source_filepath=self.data_filepath,
+                                            **self.get_dataset_options())
+        else:
+            self.update_time_partitioned_dataset()
+
+    def record_csv_import_state(self, csv_filepath: str, offset: Optional[int] = None, last_time=None):
+        """
+        Records how far the CSV file was imported: the end of the imported lines, the last timestamp
+        of the data and a checksum of the imported part of the file. Also records the fingerprint
+        (size, modification time and quick hash) of the file, see get_csv_import_state.
+
+        Data not in memory is not loaded for this, only the index is read from the data file.
+
+        :param csv_filepath: Path to the CSV file.
+        :param offset: Byte offset up to which the file was imported, None for the end of its last complete line.
+        :param last_time: Last timestamp of the data, None takes it from the data.
+        """
+        if last_time is None:
+            if self.is_data_loaded():
+                index = self.data.index
+            elif self.data_filepath and Path(self.data_filepath).exists():
+                index = read_feather_file(self.data_filepath, columns=[], memory_map=True).index
+            else:
+                return
+            if index.empty:
+                return
+            last_time = index.max()
+        self.set_csv_import_state(get_csv_import_state(csv_filepath, last_time, offset))
+
+    def set_csv_import_state(self, import_state: Optional[Dict[str, Any]]):
+        """
+        Sets the import state of the CSV file, e.g. returned by an import in a worker process, see
+        tms_file_extraction.import_tms_csv. None resets it.
+        """
+        for column in ('csv_import_offset', 'csv_import_last_time', 'csv_import_checksum', 'csv_size',
+                       'csv_mtime', 'csv_hash'):
+            setattr(self, column, None if import_state is None else import_state[column])
+
+    def is_csv_unchanged(self, csv_filepath: str) -> bool:
+        """
+        Checks if the CSV file matches the fingerprint of the last import.
+
+        Size and modification time must match, the quick hash is only calculated if both do. A changed
+        modification time counts as changed, the sampled quick hash cannot prove an edit in place at equal size.
+
+        :param csv_filepath: Path to the CSV file.
+        :return: True if the CSV file is unchanged since the last import, False otherwise.
+        """
+        if self.csv_size is None or self.csv_hash is None or not Path(csv_filepath).exists():
+            return False
+
+        stat = Path(csv_filepath).stat()
+        if stat.st_size != self.csv_size or stat.st_mtime != self.csv_mtime:
+            return False
+        return quick_hash(csv_filepath) == self.csv_hash
+
+    def _data_modified(self):
+        """
+        Resets the import state and the fingerprint of the imported CSV file, so the next import is a full
+        import and not skipped. A virtual DataMerge of the measurement version computes its data from this
+        data, its computed data is dropped.
+        """
+        super()._data_modified()
+        self.set_csv_import_state(None)
+
+        data_merge = self.measurement_version.data_merge if self.measurement_version is not None else None
+        if data_merge is not None and data_merge.virtual:
+            data_merge.release_data()
+
+    def _import_data_csv_chunked(self, csv_filepath: str, chunksize: int, end: Optional[int] = None):
+        """
+        Streams the CSV file up to the byte offset `end` into the data file of the instance, the data is read
+        from it on access.
+        """
+        if self.write_data_csv_chunked(csv_filepath, self.data_filepath, chunksize, end) is None:
+            return
+        self.use_imported_data_file()
+
+    def use_imported_data_file(self, update_dataset: bool = True):
+        """
+        Uses the data file written directly by an import as data, it is read on the next access, see
+        LazyDataFile.unload_data. The import state is reset, record it afterward with `record_csv_import_state`
+        or `set_csv_import_state`.
+
+        :param update_dataset: If True, updates the time partitioned dataset, see `update_time_partitioned_dataset`.
+                               False if the import already did, see tms_file_extraction.import_tms_csv.
+        """
+        self.unload_data()
+        self.release_data()
+        self._data_modified()
+        if update_dataset:
+            self.update_time_partitioned_dataset()
+
+    @classmethod
+    def get_columns_and_dtypes(cls) -> Dict[str, str]:
+        """
+        Returns the stored TMS columns with the dtype of the precision policy 'data_tms_default_dtype' in config.
+        """
+        config = cls.get_config().Data
+        return {col: config.data_tms_default_dtype for col in cls.get_stored_columns(config.data_tms_columns)}
+
+    @classmethod
+    def get_csv_usecols(cls) -> Optional[List[str]]:
+        """
+        Returns the columns to read from CSV, None reads all columns. Derived columns are skipped if not stored.
+        """
+        if cls.store_derived_columns():
+            return None
+        return list(cls.get_columns_and_dtypes())
+
     @classmethod
     @dec_runtime
-    def read_data_csv(cls, filepath: str) -> Optional[pd.DataFrame]:
+    def read_data_csv(cls, filepath: str, end: Optional[int] = None) -> Optional[pd.DataFrame]:
         """
-        Reads data from a CSV file.
+        Reads data from the complete lines of a CSV file.
 
         :param filepath: Path to the CSV file.
+        :param end: Byte offset to stop reading at, None for the end of the last complete line.
         :return: DataFrame with the read data.
         """
         filepath = Path(filepath)
@@ -57,10 +322,10 @@ class DataTMS(CoreDataClass, BaseClassDataTMS):
 
         config = cls.get_config().Data
         time_column: str = config.data_tms_time_column
-        columns_and_dtypes: Dict = config.data_tms_columns_and_dtypes
+        columns_and_dtypes: Dict = cls.get_columns_and_dtypes()
 
         try:
-            df = pd.read_csv(filepath, sep=";", parse_dates=[time_column], decimal=",", index_col=time_column, dtype=columns_and_dtypes)
+            df = read_tms_csv(filepath, time_column, columns_and_dtypes, cls.get_csv_usecols(), end)
         except pd.errors.ParserError as e:
             logger.error(f"Error while reading the file {filepath.stem}. Please check the file format.")
             raise e
@@ -69,6 +334,46 @@ class DataTMS(CoreDataClass, BaseClassDataTMS):
             raise e
         return df
 
+    @classmethod
+    @dec_runtime
+    def write_data_csv_chunked(cls, filepath: str, data_filepath: str, chunksize: int,
+                               end: Optional[int] = None) -> Optional[int]:
+        """
+        Reads data from the complete lines of a CSV file in chunks and writes each validated chunk straight into
+        a Feather data file.
+
+        Peak memory is bound by `chunksize` instead of the size of the CSV file. Reading the data file gives
+        the same DataFrame as `read_data_csv`.
+
+        :param filepath: Path to the CSV file.
+        :param data_filepath: Path of the Feather data file to write.
+        :param chunksize: Rows per chunk.
+        :param end: Byte offset to stop reading at, None for the end of the last complete line.
+        :return: Number of rows written, or None if the CSV file does not exist.
+        """
+        filepath = Path(filepath)
+        if not filepath.exists():
+            logger.error(f"search_path {filepath} does not exist.")
+            return
+
+        config = cls.get_config().Data
+        time_column: str = config.data_tms_time_column
+        columns_and_dtypes: Dict = cls.get_columns_and_dtypes()
+
+        try:
+            chunks = iter_tms_csv_chunks(filepath, time_column, columns_and_dtypes, chunksize,
+                                         cls.get_csv_usecols(), end)
+            rows = write_feather_chunks(chunks, data_filepath, config.data_file_compression,
+                                        config.data_file_compression_level)
+        except pd.errors.ParserError as e:
+            logger.error(f"Error while reading the file {filepath.stem}. Please check the file format.")
+            raise e
+        except Exception as e:
+            logger.error(f"Unusual error while loading {filepath.stem}: {e}")
+            raise e
+        logger.debug(f"Streamed {rows} rows from '{filepath.stem}' in chunks of {chunksize} rows.")
+        return rows
+
     def validate_data(self) -> bool:
         """
         Checks if the DataFrame data is valid and contains the required columns.
@@ -77,7 +382,7 @@ class DataTMS(CoreDataClass, BaseClassDataTMS):
             bool: True if the DataFrame is valid, False otherwise.
         """
         try:
-            validate_df(df=self.data, columns=self.get_config().Data.data_tms_columns)
+            validate_df(df=self.data, columns=self.get_stored_columns(self.get_config().Data.data_tms_columns))
             logger.debug(f"Data validation for '{self}' correct!")
             return True
         except Exception as e:
@@ -1,16 +1,28 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 from kj_core.classes.core_data_class import CoreDataClass
 from kj_core.df_utils.validate import validate_df
+from kj_core.utils.path_utils import get_directory
 
 from ..common_imports.imports_classes import *
 
-from ..wind.wind_dwd_download import download_wind_file, download_wind_extreme_file, download_station_list_file
-from ..wind.wind_file_extraction import extract_wind_df, extract_station_metadata
+from ..wind.wind_dwd_download import download_wind_file, download_wind_extreme_file, download_station_list_file, \
+    open_station_zip_member, open_zip_url_member, find_historical_zip_urls, LINK_WIND, LINK_WIND_EXTREME, \
+    LINK_WIND_HISTORICAL, LINK_WIND_EXTREME_HISTORICAL, LINK_STATIONS_LIST
+from ..wind.dwd_mirror import DwdMirror, create_dwd_session
+from ..wind.wind_file_extraction import extract_wind_df, extract_station_metadata, read_wind_file, \
+    read_wind_extreme_file, combine_archives, join_wind_dfs
+from ..wind.station_catalog import StationCatalog
+from ..wind.wind_interpolation import interpolate_wind, distance_and_bearing
+from ..utils.frame_cache import SharedFrameCache, SharedFrame, read_only_view
+from .lazy_data_file import LazyDataFile
 
 
 logger = get_logger(__name__)
 
 
-class DataWindStation(CoreDataClass, BaseClass):
+class DataWindStation(LazyDataFile, CoreDataClass, BaseClass):
 
     __tablename__ = 'DataWindStation'
     data_id = Column(Integer, primary_key=True, autoincrement=True, nullable=False, unique=True)
@@ -57,6 +69,51 @@ class DataWindStation(CoreDataClass, BaseClass):
             return obj
         return None
 
+    @classmethod
+    @dec_runtime
+    def create_virtual(cls, latitude: float, longitude: float, stations: List['DataWindStation'],
+                       method: Optional[str] = None) -> 'DataWindStation':
+        """
+        Creates a virtual wind station at a site by combining the data of several stations, see interpolate_wind.
+        It is stored like a real station with source 'virtual' and can be used as Series.data_wind_station.
+
+        :param latitude: Latitude of the site in degrees.
+        :param longitude: Longitude of the site in degrees.
+        :param stations: DataWindStations with data to combine.
+        :param method: 'idw' or 'direction'. Defaults to 'wind_interpolation_method' in config.
+        :return: New DataWindStation, not added to the session.
+        """
+        config = cls.get_config().Data
+        method = method or config.wind_interpolation_method
+        station_id = cls.get_virtual_station_id(latitude, longitude, [station.station_id for station in stations],
+                                                method)
+        obj = cls(station_id=station_id, data_filepath=str(cls._get_feather_file_path(station_id)))
+        obj._set_virtual_data(latitude, longitude, stations, method)
+        return obj
+
+    @staticmethod
+    def get_virtual_station_id(latitude: float, longitude: float, station_ids: List[str], method: str) -> str:
+        return f"virtual_{latitude:.4f}_{longitude:.4f}_{method}_{'-'.join(sorted(station_ids))}"
+
+    def _set_virtual_data(self, latitude: float, longitude: float, stations: List['DataWindStation'], method: str):
+        config = self.get_config().Data
+        distances, bearings = distance_and_bearing(latitude, longitude,
+                                                   [station.station_latitude for station in stations],
+                                                   [station.station_longitude for station in stations])
+        wind_df = interpolate_wind([station.data for station in stations], distances, bearings, method,
+                                   config.wind_interpolation_power, config.wind_interpolation_direction_floor,
+                                   config.wind_dwd_freq, config.data_wind_default_dtype)
+        wind_df.insert(0, 'station_id', np.array(-1, dtype=config.data_wind_default_int_dtype))
+
+        self.data = wind_df
+        self.station_name = f"Virtual {method} of {', '.join(station.station_id for station in stations)}"
+        self.bundesland = None
+        self.station_height = None
+        self.station_latitude = latitude
+        self.station_longitude = longitude
+        self.source = 'virtual'
+        logger.info(f"Created {self} from stations at {np.round(distances, 1).tolist()} km, {len(wind_df)} rows.")
+
     # helper method
     @classmethod
     def _get_feather_file_path(cls, station_id: str) -> Path:
@@ -67,40 +124,284 @@ class DataWindStation(CoreDataClass, BaseClass):
 
     def update_from_dwd(self, filename_wind: Optional[str] = None,
                         filename_wind_extreme: Optional[str] = None,
-                        filename_stations_list: Optional[str] = None) -> bool:
+                        filename_stations_list: Optional[str] = None, incremental: bool = True) -> bool:
+        """
+        Updates the data from DWD. With 'incremental', only rows newer than the stored data are appended from
+        the recent archives, see append_from_dwd, otherwise (or if that is not possible) all data is replaced.
+        """
+        if self.source == 'virtual':
+            raise ValueError(f"{self} is virtual, create it again with Series.add_virtual_wind_station.")
+        streamed = self.get_config().Data.wind_dwd_stream and not (filename_wind or filename_wind_extreme)
+        if incremental and streamed and self._has_stored_data() and self.append_from_dwd():
+            return self
 
         self.get_dwd_data(self.station_id, filename_wind,
                           filename_wind_extreme, filename_stations_list)
         return self
 
+    def _has_stored_data(self) -> bool:
+        return bool(self.data_filepath) and Path(self.data_filepath).exists()
+
+    def append_from_dwd(self) -> bool:
+        """
+        Appends the rows of the recent DWD archives newer than the stored data, historical archives are not read.
+
+        :return: False if the station has no stored data or the recent archives start after its end, then all
+                 data has to be downloaded again.
+        """
+        parsed = self._stream_dwd_data(self.station_id, historical=False)
+        return parsed is not None and self._append_dwd_data(*parsed)
+
+    def _append_dwd_data(self, recent_df: pd.DataFrame, station_metadata: Dict) -> bool:
+        stored_df = self.data
+        if stored_df is None or stored_df.empty or list(stored_df.columns) != list(recent_df.columns):
+            return False
+        last = stored_df.index.max()
+        if recent_df.empty or recent_df.index.min() > last + pd.Timedelta(self.get_config().Data.wind_dwd_freq):
+            logger.info(f"{self}: recent archive does not continue the stored data ending '{last}'.")
+            return False
+
+        new_df = recent_df[recent_df.index > last]
+        if not new_df.empty:
+            self.data = pd.concat([stored_df, new_df.astype(stored_df.dtypes.to_dict())])
+        self._set_station_metadata(station_metadata)
+        logger.info(f"{self}: appended {len(new_df)} rows after '{last}'.")
+        return True
+
     def get_dwd_data(self, station_id: str, filename_wind: Optional[str],
                      filename_wind_extreme: Optional[str],
                      filename_stations_list: Optional[str]) -> bool:
+        if self.get_config().Data.wind_dwd_stream and not (filename_wind or filename_wind_extreme):
+            parsed = self._stream_dwd_data(station_id, filename_stations_list)
+            if parsed is None:
+                return None
+            self._set_dwd_data(*parsed)
+            return self
+
         path = self._get_download_folder_path(station_id)
+        mirror = self.get_dwd_mirror()
 
         # Use alternative filenames provided as arguments
         if not filename_wind:
-            filename_wind = download_wind_file(station_id, path)
+            filename_wind = download_wind_file(station_id, path, mirror)
 
         if not filename_wind_extreme:
-            filename_wind_extreme = download_wind_extreme_file(station_id, path)
+            filename_wind_extreme = download_wind_extreme_file(station_id, path, mirror)
 
         if not filename_stations_list:
-            filename_stations_list = download_station_list_file(path)
+            filename_stations_list = download_station_list_file(path, mirror)
 
         self.read_dwd_files(filename_wind, filename_wind_extreme, filename_stations_list)
         return self
 
-    def _get_download_folder_path(self, station_id: str) -> Path:
-        data_directory = self.get_data_manager().data_directory
-        folder = self.get_config().Data.wind_download_folder
+    @classmethod
+    def get_shared_frame_cache(cls) -> SharedFrameCache:
+        """
+        Returns the process-wide cache of the wind frames, shared by all stations and measurements.
+        """
+        cache = getattr(cls, '_shared_frame_cache', None)
+        if cache is None:
+            config = cls.get_config().Data
+            cache = DataWindStation._shared_frame_cache = SharedFrameCache(config.data_wind_cache_max_idle,
+                                                                           memory_map=config.data_file_memory_map)
+        return cache
+
+    def acquire_data(self, start_time=None, end_time=None) -> SharedFrame:
+        """
+        Returns a read-only view on the wind data between start_time and end_time (both included). The stored
+        data of a station is held once per process no matter how many measurements use it, see SharedFrameCache.
+        Data already in memory (also unsaved data) is returned as read-only view on self.data, the data file is not
+        read again.
+
+        :param start_time: Start of the range, None for the first row.
+        :param end_time: End of the range, None for the last row.
+        :return: SharedFrame, use it as context manager or call release when done.
+        :raises ValueError: If the station has neither data in memory nor stored data.
+        """
+        if self.is_data_loaded():
+            return SharedFrame(read_only_view(self.data.loc[start_time:end_time]))
+        if not self._has_stored_data():
+            raise ValueError(f"No wind data in memory or stored for '{self}'.")
+        return self.get_shared_frame_cache().acquire(self.data_filepath, start_time, end_time)
+
+    _dwd_mirror_lock = threading.Lock()
+
+    @classmethod
+    def get_dwd_mirror(cls) -> Optional[DwdMirror]:
+        """
+        Returns the DWD mirror in 'wind_download_folder', shared by all instances and threads. None if
+        'wind_dwd_mirror' is disabled in config.
+        """
+        config = cls.get_config().Data
+        if not config.wind_dwd_mirror:
+            return None
+        directory = cls.get_data_manager().data_directory / config.wind_download_folder / config.wind_dwd_mirror_folder
+        with cls._dwd_mirror_lock:
+            mirror = getattr(cls, '_dwd_mirror', None)
+            if mirror is None or mirror.directory != directory:
+                session = create_dwd_session(config.wind_dwd_max_workers, config.wind_dwd_retries,
+                                             config.wind_dwd_backoff_factor)
+                mirror = DataWindStation._dwd_mirror = DwdMirror(
+                    directory, session, listing_max_age=config.wind_dwd_listing_max_age,
+                    timeout=config.wind_dwd_timeout)
+        return mirror
+
+    _station_catalog_lock = threading.Lock()
+
+    @classmethod
+    def get_station_catalog(cls) -> StationCatalog:
+        """
+        Returns the catalog of all DWD wind stations, shared by all instances. The stations list is downloaded
+        to 'wind_download_folder' (with the mirror only if it changed) and parsed into a cached columnar file
+        next to it.
+
+        :raises FileNotFoundError: If the stations list can not be downloaded.
+        """
+        with cls._station_catalog_lock:
+            config = cls.get_config().Data
+            directory = cls.get_data_manager().data_directory / config.wind_download_folder
+            mirror = cls.get_dwd_mirror()
+            catalog, filepath, mtime_ns = getattr(cls, '_station_catalog', (None, None, None))
+
+            if mirror is not None:
+                # The mirrored file only changes if the list changed on the server
+                filepath = mirror.fetch(LINK_STATIONS_LIST, max_age=mirror.listing_max_age)
+            elif catalog is not None and filepath.parent == directory:
+                # Without mirror the list is downloaded once per process
+                return catalog
+            else:
+                filename = download_station_list_file(directory)
+                if not filename:
+                    raise FileNotFoundError(f"Stations list can not be downloaded to '{directory}'.")
+                filepath = directory / filename
+
+            if catalog is None or (filepath, filepath.stat().st_mtime_ns) != cls._station_catalog[1:]:
+                catalog = StationCatalog.load(filepath, directory / config.wind_station_catalog_filename)
+                cls._station_catalog = (catalog, filepath, filepath.stat().st_mtime_ns)
+            return catalog
+
+    @classmethod
+    def find_nearest_stations(cls, latitude: float, longitude: float, k: int = 5, start_time=None,
+                              end_time=None) -> pd.DataFrame:
+        """
+        Finds the k nearest active DWD wind stations to a site with data from start_time to end_time,
+        see StationCatalog.nearest.
+
+        :param latitude: Latitude of the site in degrees.
+        :param longitude: Longitude of the site in degrees.
+        :param k: Number of stations.
+        :param start_time: Optional start of the required data.
+        :param end_time: Optional end of the required data.
+        :return: Stations ordered by distance with the column 'distance_km'.
+        """
+        return cls.get_station_catalog().nearest(latitude, longitude, k, start_time, end_time,
+                                                 cls.get_config().Data.wind_station_active_days)
+
+    @classmethod
+    def _get_download_folder_path(cls, station_id: str) -> Path:
+        data_directory = cls.get_data_manager().data_directory
+        folder = cls.get_config().Data.wind_download_folder
         return data_directory / folder / station_id
 
-    def read_dwd_files(self, filename_wind, filename_wind_extreme, filename_stations_list):
+    @classmethod
+    @dec_runtime
+    def create_from_stations(cls, station_ids: List[str], update_existing: bool = False,
+                             max_workers: Optional[int] = None) -> Dict[str, 'DataWindStation']:
         """
-        Loads wind measurement data from online DWD (Deutscher Wetterdienst) resources.
+        Creates or updates the DataWindStation instances of many stations at once.
+
+        The wind, extreme wind and station list files of all stations are downloaded concurrently with the
+        pooled session of the DWD mirror, then all files are parsed concurrently. New instances are added to
+        the session, nothing is committed.
+
+        :param station_ids: DWD station ids.
+        :param update_existing: If True, updates stations already in the database, with streamed downloads only
+                                the rows newer than the stored data are appended, see append_from_dwd.
+        :param max_workers: Concurrent downloads. Defaults to 'wind_dwd_max_workers' in config.
+        :return: Dict of station id and DataWindStation, stations without data are missing.
         """
-        path = self._get_download_folder_path(self.station_id)
+        session = cls.get_database_manager().session
+        max_workers = max_workers or cls.get_config().Data.wind_dwd_max_workers
+        station_ids = list(dict.fromkeys(station_ids))
+
+        existing = {obj.station_id: obj for obj in
+                    session.query(cls).filter(cls.station_id.in_(station_ids)).all()}
+        result = {station_id: obj for station_id, obj in existing.items() if not update_existing}
+        to_download = [station_id for station_id in station_ids if station_id not in result]
+        if not to_download:
+            return result
+
+        if cls.get_config().Data.wind_dwd_stream:
+            # Download and parsing overlap per station, no files are extracted. Stored stations are only
+            # appended from the recent archives, see append_from_dwd. The mirror and its pooled session are
+            # created once before the threads share them. New stations include the historical archives as
+            # configured by 'wind_dwd_historical'
+            cls.get_dwd_mirror()
+            appendable = {station_id for station_id, obj in existing.items() if obj._has_stored_data()}
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                parsed = dict(zip(to_download, executor.map(
+                    lambda station_id: cls._stream_dwd_data(
+                        station_id, historical=False if station_id in appendable else None),
+                    to_download)))
+        else:
+            appendable = set()
+            filenames = cls.download_dwd_files(to_download, max_workers)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                parsed = dict(zip(to_download, executor.map(
+                    lambda station_id: cls._read_dwd_files(station_id, *filenames[station_id]), to_download)))
+
+        downloaded = 0
+        for station_id in to_download:
+            if parsed[station_id] is None:
+                logger.warning(f"No data for station '{station_id}', not created.")
+                continue
+            obj = existing.get(station_id)
+            if obj is None:
+                obj = cls(station_id=station_id, data_filepath=str(cls._get_feather_file_path(station_id)))
+                session.add(obj)
+            if station_id in appendable:
+                if not obj._append_dwd_data(*parsed[station_id]):
+                    obj.get_dwd_data(station_id, None, None, None)
+            else:
+                obj._set_dwd_data(*parsed[station_id])
+            result[station_id] = obj
+            downloaded += 1
+
+        logger.info(f"Created or updated {downloaded} of {len(to_download)} DataWindStations "
+                    f"with max_workers '{max_workers}'.")
+        return result
+
+    @classmethod
+    def download_dwd_files(cls, station_ids: List[str], max_workers: Optional[int] = None) \
+            -> Dict[str, Tuple[Optional[str], Optional[str], Optional[str]]]:
+        """
+        Downloads the wind, extreme wind and station list files of many stations concurrently.
+
+        :param station_ids: DWD station ids.
+        :param max_workers: Concurrent downloads. Defaults to 'wind_dwd_max_workers' in config.
+        :return: Dict of station id and the filenames (wind, extreme wind, station list), None if a download failed.
+        """
+        mirror = cls.get_dwd_mirror()
+        max_workers = max_workers or cls.get_config().Data.wind_dwd_max_workers
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {}
+            for station_id in station_ids:
+                path = cls._get_download_folder_path(station_id)
+                futures[station_id] = (executor.submit(download_wind_file, station_id, path, mirror),
+                                       executor.submit(download_wind_extreme_file, station_id, path, mirror),
+                                       executor.submit(download_station_list_file, path, mirror))
+            return {station_id: tuple(future.result() for future in station_futures)
+                    for station_id, station_futures in futures.items()}
+
+    @classmethod
+    def _read_dwd_files(cls, station_id: str, filename_wind, filename_wind_extreme, filename_stations_list) \
+            -> Optional[Tuple[pd.DataFrame, Dict]]:
+        """
+        Reads the downloaded DWD files of a station without changing an instance, so it can run in threads.
+
+        :return: Tuple of wind data and station metadata, None if a file is missing or cannot be read.
+        """
+        path = cls._get_download_folder_path(station_id)
 
         # Check if the downloaded files actually exist
         for filename in [filename_wind, filename_wind_extreme, filename_stations_list]:
@@ -110,21 +411,92 @@ class DataWindStation(CoreDataClass, BaseClass):
                 return None
 
         try:
-            wind_df = extract_wind_df(path.joinpath(filename_wind), path.joinpath(filename_wind_extreme))
-            wind_df.drop(self.get_config().Data.data_wind_columns_drop, axis=1, inplace=True)
+            config = cls.get_config().Data
+            wind_df = extract_wind_df(path.joinpath(filename_wind), path.joinpath(filename_wind_extreme),
+                                      config.data_wind_default_dtype, config.data_wind_default_int_dtype)
+            wind_df.drop(config.data_wind_columns_drop, axis=1, inplace=True)
         except Exception as e:
             logger.error(f"Error while loading and preparing dataframes: {e}")
             return None
 
         try:
-            station_metadata = extract_station_metadata(self.station_id, str(path.joinpath(filename_stations_list)))
+            station_metadata = extract_station_metadata(station_id, str(path.joinpath(filename_stations_list)))
+        except Exception as e:
+            logger.error(
+                f"Error while loading and preparing station metadata from {filename_stations_list}: {e}")
+            return None
+        return wind_df, station_metadata
+
+    @classmethod
+    def _stream_dwd_data(cls, station_id: str, filename_stations_list: Optional[str] = None,
+                         historical: Optional[bool] = None) -> Optional[Tuple[pd.DataFrame, Dict]]:
+        """
+        Parses the wind and extreme wind zip files of a station while they are streamed, see
+        open_station_zip_member. Only the station list is written to the download folder.
+
+        With historical archives, they are combined with the recent archive on the 10 minutes index. Rows in both
+        are taken from the historical archives, their data is quality controlled. Only the archives with data from
+        'wind_dwd_historical_start' in config on are downloaded.
+
+        :param historical: Include the historical archives. Defaults to 'wind_dwd_historical' in config.
+        :return: Tuple of wind data and station metadata, None if a file is missing or cannot be read.
+        """
+        config = cls.get_config().Data
+        path = cls._get_download_folder_path(station_id)
+        mirror = cls.get_dwd_mirror()
+        session = mirror.session if mirror else None
+        keep_directory = get_directory(path) if config.wind_dwd_keep_extracted else None
+        dtypes = (config.data_wind_default_dtype, config.data_wind_default_int_dtype)
+        historical = config.wind_dwd_historical if historical is None else historical
+
+        try:
+            wind_dfs, wind_extreme_dfs = [], []
+            for link, read_file, dfs in [(LINK_WIND_HISTORICAL, read_wind_file, wind_dfs),
+                                         (LINK_WIND_EXTREME_HISTORICAL, read_wind_extreme_file, wind_extreme_dfs)]:
+                for url in find_historical_zip_urls(link, station_id, mirror, session,
+                                                    config.wind_dwd_historical_start) if historical else []:
+                    with open_zip_url_member(url, mirror, session, keep_directory) as file:
+                        dfs.append(read_file(file, *dtypes))
+
+            with open_station_zip_member(LINK_WIND, station_id, mirror, session, keep_directory) as file:
+                wind_dfs.append(read_wind_file(file, *dtypes))
+            with open_station_zip_member(LINK_WIND_EXTREME, station_id, mirror, session, keep_directory) as file:
+                wind_extreme_dfs.append(read_wind_extreme_file(file, *dtypes))
+
+            wind_df = join_wind_dfs(combine_archives(wind_dfs), combine_archives(wind_extreme_dfs))
+            wind_df.drop(config.data_wind_columns_drop, axis=1, inplace=True)
+            logger.debug(f"Streamed {len(wind_dfs) - 1} historical and the recent archives of station "
+                         f"'{station_id}', {len(wind_df)} rows.")
+        except Exception as e:
+            logger.error(f"Error while streaming and preparing dataframes of station '{station_id}': {e}")
+            return None
+
+        try:
+            if filename_stations_list:
+                station_metadata = extract_station_metadata(station_id, str(path.joinpath(filename_stations_list)))
+            else:
+                station_metadata = cls.get_station_catalog().get_metadata(station_id)
         except Exception as e:
             logger.error(
                 f"Error while loading and preparing station metadata from {filename_stations_list}: {e}")
             return None
+        return wind_df, station_metadata
+
+    def read_dwd_files(self, filename_wind, filename_wind_extreme, filename_stations_list):
+        """
+        Loads wind measurement data from online DWD (Deutscher Wetterdienst) resources.
+        """
+        parsed = self._read_dwd_files(self.station_id, filename_wind, filename_wind_extreme, filename_stations_list)
+        if parsed is None:
+            return None
+        self._set_dwd_data(*parsed)
+
+    def _set_dwd_data(self, wind_df: pd.DataFrame, station_metadata: Dict):
         self.data = wind_df
         #self.interpolate_data()
+        self._set_station_metadata(station_metadata)
 
+    def _set_station_metadata(self, station_metadata: Dict):
         self.station_name = station_metadata['station_name']
         self.bundesland = station_metadata['bundesland']
         self.station_height = station_metadata['station_height']
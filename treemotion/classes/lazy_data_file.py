@@ -0,0 +1,134 @@
+import shutil
+from pathlib import Path
+from typing import Iterable, Optional, Tuple, Type
+
+import pandas as pd
+from sqlalchemy import event
+from sqlalchemy.orm.attributes import flag_modified
+
+from kj_logger import get_logger
+
+from ..utils.data_file_io import get_dataset_directory, read_feather_file, write_feather_chunks
+
+logger = get_logger(__name__)
+
+
+class LazyDataFile:
+    """
+    Mixin for data classes storing 'data' in the feather data file 'data_filepath', listed before CoreDataClass.
+
+    'data' is read from the data file on first access instead of when the instance is loaded from the database,
+    with 'data_file_memory_map' in config it is mapped, see utils/data_file_io.py. Operations of the data classes
+    work on copies, so only code writing into 'data' in place has to copy it first.
+    Assigning a DataFrame sets 'data_changed', changed and new data is written with `write_data_file` when the
+    instance is flushed and the data file is deleted with the instance, see `register_data_file_listeners`.
+    Assigning None drops the data from memory, it is read again on the next access.
+    """
+
+    @property
+    def data(self) -> Optional[pd.DataFrame]:
+        if not getattr(self, '_data_loaded', False):
+            self._data = self._read_data_file()
+            self._data_loaded = True
+        return self._data
+
+    @data.setter
+    def data(self, data: Optional[pd.DataFrame]):
+        self._data = data
+        self._data_loaded = data is not None
+        self._data_version = getattr(self, '_data_version', 0) + 1
+        if data is not None:
+            self.data_changed = True
+            # Also flushed if 'data_changed' was already set
+            flag_modified(self, 'data_changed')
+
+    def is_data_loaded(self) -> bool:
+        """
+        Returns True if 'data' is in memory, False if it is read from the data file on the next access.
+        """
+        return getattr(self, '_data', None) is not None
+
+    def get_data_version(self) -> Tuple:
+        """
+        Returns a stamp of the data, it changes when data is assigned or unloaded and when the data file is
+        rewritten. Data computed from this data (e.g. a virtual DataMerge) compares it before reuse.
+        """
+        filepath = Path(self.data_filepath) if self.data_filepath else None
+        mtime_ns = filepath.stat().st_mtime_ns if filepath is not None and filepath.exists() else None
+        return self.data_filepath, mtime_ns, getattr(self, '_data_version', 0)
+
+    def unload_data(self):
+        """
+        Drops 'data' from memory, e.g. after an import has written the data file directly. The data file is up
+        to date, so 'data_changed' is reset.
+        """
+        self._data = None
+        self._data_loaded = False
+        self._data_version = getattr(self, '_data_version', 0) + 1
+        self.data_changed = False
+
+    def _read_data_file(self) -> Optional[pd.DataFrame]:
+        if not self.data_filepath or not Path(self.data_filepath).exists():
+            return None
+        data = read_feather_file(self.data_filepath, memory_map=self.get_config().Data.data_file_memory_map)
+        logger.debug(f"Read data file of '{self}', {len(data)} rows.")
+        return data
+
+    def write_data_file(self) -> int:
+        """
+        Writes 'data' to the data file with the codec 'data_file_compression' and 'data_file_compression_level'
+        in config. The data file is up to date afterwards, so 'data_changed' is reset.
+
+        Returns:
+            int: Number of rows written.
+        """
+        config = self.get_config().Data
+        rows = write_feather_chunks([self.data], self.data_filepath, config.data_file_compression,
+                                    config.data_file_compression_level)
+        self.data_changed = False
+        logger.debug(f"Wrote data file of '{self}' with compression '{config.data_file_compression}'.")
+        # TMS data classes keep their time partitioned dataset in line with the data file
+        update_dataset = getattr(self, 'update_time_partitioned_dataset', None)
+        if update_dataset is not None:
+            update_dataset()
+        return rows
+
+    def delete_data_file(self):
+        """
+        Deletes the data file and the time partitioned dataset next to it.
+        """
+        if not self.data_filepath:
+            return
+        filepath = Path(self.data_filepath)
+        if filepath.exists():
+            filepath.unlink()
+        directory = get_dataset_directory(filepath)
+        if directory.exists():
+            shutil.rmtree(directory)
+        logger.debug(f"Deleted data file of '{self}'.")
+
+
+def _before_insert(mapper, connection, target: LazyDataFile):
+    if target.is_data_loaded() and target.data_filepath:
+        target.write_data_file()
+
+
+def _before_update(mapper, connection, target: LazyDataFile):
+    if target.is_data_loaded() and target.data_changed and target.data_filepath:
+        target.write_data_file()
+
+
+def _after_delete(mapper, connection, target: LazyDataFile):
+    target.delete_data_file()
+
+
+def register_data_file_listeners(classes: Iterable[Type[LazyDataFile]]):
+    """
+    Registers the listeners writing the data file of new and changed instances on flush and deleting it with
+    the instance. Registering a class twice has no effect.
+    """
+    for cls in classes:
+        for identifier, listener in (('before_insert', _before_insert), ('before_update', _before_update),
+                                     ('after_delete', _after_delete)):
+            if not event.contains(cls, identifier, listener):
+                event.listen(cls, identifier, listener)
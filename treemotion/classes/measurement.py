@@ -61,7 +61,8 @@ class Measurement(BaseClass):
 
     @dec_runtime
     def load_from_csv(self, measurement_version_name: str = None,
-                      update_existing: bool = True) -> Optional[MeasurementVersion]:
+                      update_existing: bool = True, chunksize: Optional[int] = None,
+                      incremental: bool = False, force: bool = False) -> Optional[MeasurementVersion]:
         """
         Loads data from a CSV file into a MeasurementVersion instance.
 
@@ -73,6 +74,9 @@ class Measurement(BaseClass):
         Args:
             measurement_version_name (str, optional): Name of the MeasurementVersion. Defaults to None, which uses the default name from config.
             update_existing (bool): Whether to update an existing MeasurementVersion with the same name. Defaults to True.
+            chunksize (int, optional): Rows per chunk for the streaming CSV import, 0 reads the whole CSV at once. Defaults to None, which uses the value from config.
+            incremental (bool): Whether an existing MeasurementVersion only appends the rows added to the CSV since the last import. Defaults to False.
+            force (bool): Whether an existing MeasurementVersion is updated even if the CSV is unchanged since the last import. Defaults to False.
 
         Returns:
             Optional[MeasurementVersion]: The updated, newly created, or found MeasurementVersion instance, or None if an error occurs.
@@ -101,7 +105,7 @@ class Measurement(BaseClass):
             # Fall 2: Kein vorhandenes Objekt existiert.
             # Erstelle ein neues Objekt und gib dieses zurück.
             try:
-                mv_new = MeasurementVersion.create_from_csv(self.filepath_tms, self.measurement_id, mv_name)
+                mv_new = MeasurementVersion.create_from_csv(self.filepath_tms, self.measurement_id, mv_name, chunksize)
                 DATABASE_MANAGER = self.get_database_manager()
                 self.measurement_version.append(mv_new)
                 DATABASE_MANAGER.commit()
@@ -114,7 +118,7 @@ class Measurement(BaseClass):
             # Fall 3: Ein vorhandenes Objekt existiert und soll aktualisiert werden.
             # Aktualisiere das vorhandene Objekt und gib es zurück.
             try:
-                mv_updated = m_v_present.update_from_csv(self.filepath_tms)
+                mv_updated = m_v_present.update_from_csv(self.filepath_tms, chunksize, incremental, force)
                 DATABASE_MANAGER = self.get_database_manager()
                 self.measurement_version.append(mv_updated)
                 DATABASE_MANAGER.commit()
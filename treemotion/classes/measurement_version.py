@@ -1,7 +1,11 @@
 # from kj_core.df_utils.sample_rate import calc_sample_rate
 
 from ..common_imports.imports_classes import *
-from treemotion.tms.df_merge_by_time import merge_dfs_by_time, calc_optimal_shift
+from treemotion.tms.df_merge_by_time import merge_dfs_by_time, merge_dfs_by_shifted_time, calc_optimal_shift
+from ..tms.time_join import TimeJoin, nearest_indexer
+from ..tms.rolling_extrema import rolling_max, piecewise_rolling_max
+from ..wind._wind_correction import calc_wind_front_delay
+from ..wind.wind_interpolation import distance_and_bearing
 
 from .data_tms import DataTMS
 from .data_merge import DataMerge
@@ -53,27 +57,22 @@ class MeasurementVersion(BaseClass):
         return filename
 
     @classmethod
-    def create_from_csv(cls, csv_filepath: str, measurement_id: int, measurement_version_name: str = None) -> Optional['MeasurementVersion']:
+    def create_from_csv(cls, csv_filepath: str, measurement_id: int, measurement_version_name: str = None,
+                        chunksize: Optional[int] = None) -> Optional['MeasurementVersion']:
         """
         Loads TMS Data from a CSV file.
 
         :param csv_filepath: Path to the CSV file.
         :param measurement_id: ID of the measurement to which the data belongs.
         :param measurement_version_name: Version Name of the data.
+        :param chunksize: Rows per chunk for the streaming CSV import, see DataTMS.create_from_csv.
         :return: MeasurementVersion object.
         """
-        config = cls.get_config()
         obj = cls(measurement_id=measurement_id, measurement_version_name=measurement_version_name)
 
-        data_directory = config.data_directory
-        folder: str = config.Data.data_tms_directory
-        filename: str = cls.get_data_manager().get_new_filename(measurement_id,
-                                                                prefix=f"tms_{measurement_version_name}",
-                                                                file_extension="feather")
-
-        data_filepath = str(data_directory / folder / filename)
+        data_filepath = cls.get_data_tms_filepath(measurement_id, measurement_version_name)
 
-        data_tms = DataTMS.create_from_csv(csv_filepath, data_filepath, obj.measurement_version_id)
+        data_tms = DataTMS.create_from_csv(csv_filepath, data_filepath, obj.measurement_version_id, chunksize)
 
         obj.data_tms = data_tms
 
@@ -82,8 +81,29 @@ class MeasurementVersion(BaseClass):
         logger.info(f"Created new '{obj}'")
         return obj
 
-    def update_from_csv(self, csv_filepath: str) -> Optional['MeasurementVersion']:
-        self.data_tms = self.data_tms.update_from_csv(csv_filepath)
+    @classmethod
+    def get_data_tms_filepath(cls, measurement_id: int, measurement_version_name: str) -> str:
+        """
+        Builds the path of a new DataTMS data file.
+
+        :param measurement_id: ID of the measurement to which the data belongs.
+        :param measurement_version_name: Version Name of the data.
+        :return: Path of the data file.
+        """
+        config = cls.get_config()
+        data_directory = config.data_directory
+        folder: str = config.Data.data_tms_directory
+        filename: str = cls.get_data_manager().get_new_filename(measurement_id,
+                                                                prefix=f"tms_{measurement_version_name}",
+                                                                file_extension="feather")
+        return str(data_directory / folder / filename)
+
+    def update_from_csv(self, csv_filepath: str, chunksize: Optional[int] = None,
+                        incremental: bool = False, force: bool = False) -> Optional['MeasurementVersion']:
+        if incremental:
+            self.data_tms = self.data_tms.append_from_csv(csv_filepath, chunksize, force)
+        else:
+            self.data_tms = self.data_tms.update_from_csv(csv_filepath, chunksize, force)
         logger.info(f"Updated new '{self}'")
         return self
 
@@ -125,13 +145,18 @@ class MeasurementVersion(BaseClass):
 
         config = self.get_config().Data
 
-        tms_series: pd.Series = self.data_tms.data[config.main_tms_value].copy()
-        wind_series: pd.Series = self.data_wind_station.data[config.main_wind_value].copy()
+        tms_series: pd.Series = self.data_tms.get_column(config.main_tms_value).copy()
 
-        wind_series = wind_series.reindex(tms_series.index, method='nearest')
+        # Only the wind records next to the TMS time range are needed for the nearest reindex
+        padding = pd.Timedelta(config.wind_dwd_freq)
+        with self.data_wind_station.acquire_data(tms_series.index.min() - padding,
+                                                 tms_series.index.max() + padding) as wind_df:
+            positions = nearest_indexer(wind_df.index.asi8, tms_series.index.asi8)
+            wind_series = pd.Series(wind_df[config.main_wind_value].to_numpy()[positions], index=tms_series.index)
 
-        tms_series = tms_series.rolling(window=config.time_rolling_max, closed='right').max()
-        wind_series = wind_series.rolling(window=config.time_rolling_max, closed='right').max()
+        # Like rolling(window, closed='right').max(), the wind data joined to the TMS index is piecewise constant
+        tms_series = rolling_max(tms_series, config.time_rolling_max)
+        wind_series = piecewise_rolling_max(wind_series, config.time_rolling_max)
 
         tms_series.dropna(inplace=True)
         wind_series.dropna(inplace=True)
@@ -144,9 +169,12 @@ class MeasurementVersion(BaseClass):
             f"Input: sample_rate: '{sample_rate:.4f} Hz', max_shift_sec: '{max_shift_sec} s', "
             f"max_shift: '{max_shift} samples'")
 
+        coarse_sec = config.shift_search_coarse_sec
+        coarse_factor = round(sample_rate * coarse_sec) if coarse_sec else None
+
         # Calculate optimal shift
-        optimal_shift, correlation_no_shift, correlation_optimal_shift = calc_optimal_shift(tms_series, wind_series,
-                                                                                            max_shift)
+        optimal_shift, correlation_no_shift, correlation_optimal_shift = calc_optimal_shift(
+            tms_series, wind_series, max_shift, coarse_factor=coarse_factor, candidates=config.shift_search_candidates)
 
         optimal_shift_sec = optimal_shift / sample_rate
 
@@ -156,43 +184,118 @@ class MeasurementVersion(BaseClass):
 
         return optimal_shift, optimal_shift_sec, correlation_no_shift, correlation_optimal_shift
 
-    def _get_rolling_max(self, merged_data: pd.DataFrame) -> pd.DataFrame:
+    def _get_rolling_max(self, merged_data: pd.DataFrame, tms_rolling_max: Optional[pd.Series] = None,
+                         time_rolling_max: Optional[str] = None) -> pd.DataFrame:
         """
         Applies a rolling maximum function to specified columns in the DataFrame.
 
-        This method updates the DataFrame 'merged_data' by replacing specified columns with their rolling maximum values.
+        Returns the DataFrame 'merged_data' with the rolling maximum of the TMS and wind value added as merge
+        columns. The columns of 'merged_data' are not copied.
 
         :param merged_data: The DataFrame to which the rolling maximum will be applied.
-        :return: The updated DataFrame with rolling maximum values.
+        :param tms_rolling_max: Optional rolling maximum of the TMS value already computed for the same TMS data,
+                                it is shared instead of computed again.
+        :param time_rolling_max: Window of the rolling maximum, defaults to 'time_rolling_max' in config. The merge
+                                 columns keep their names from config.
+        :return: DataFrame with rolling maximum values.
         """
         config = self.get_config().Data
+        time_rolling_max = time_rolling_max or config.time_rolling_max
 
-        # Apply rolling max to the specified TMS and wind columns
-        for value_col, merged_col in [(config.main_tms_value, config.merge_tms_value),
-                                      (config.main_wind_value, config.merge_wind_value)]:
-            merged_data[merged_col] = merged_data[value_col].rolling(
-                window=config.time_rolling_max, closed='right').max()
+        # Like rolling(window, closed='right').max(), see tms/rolling_extrema.py
+        if tms_rolling_max is None:
+            tms_rolling_max = rolling_max(merged_data[config.main_tms_value], time_rolling_max)
+        wind_rolling_max = piecewise_rolling_max(merged_data[config.main_wind_value], time_rolling_max)
 
-        return merged_data
+        # Assigning columns would copy them, the DataFrame is built from the arrays instead
+        columns = {col: merged_data[col].to_numpy() for col in merged_data.columns}
+        columns[config.merge_tms_value] = tms_rolling_max.to_numpy()
+        columns[config.merge_wind_value] = wind_rolling_max.to_numpy()
+        return pd.DataFrame(columns, index=merged_data.index, copy=False)
+
+    def calc_wind_front_delay(self, wind_df: pd.DataFrame, site_latitude: float, site_longitude: float) -> np.ndarray:
+        """
+        Calculates the travel time of the wind front from the wind station to the site for every wind record,
+        from its direction and speed, see wind/_wind_correction.py.
+
+        :param wind_df: Wind data of the station.
+        :param site_latitude: Latitude of the site in degrees.
+        :param site_longitude: Longitude of the site in degrees.
+        :return: Delay in seconds per record.
+        """
+        config = self.get_config().Data
+        station = self.data_wind_station
+        distance_km, bearing = distance_and_bearing(station.station_latitude, station.station_longitude,
+                                                    [site_latitude], [site_longitude])
+        delay = calc_wind_front_delay(wind_df['wind_direction_10min_avg'], wind_df['wind_speed_10min_avg'],
+                                      distance_km[0] * 1000, bearing[0], config.wind_front_speed_factor,
+                                      config.max_shift_sec, config.wind_front_min_speed)
+        logger.info(f"Wind front delay over {distance_km[0]:.1f} km: median '{np.median(delay):.0f} s', "
+                    f"range '{delay.min():.0f}' to '{delay.max():.0f} s'.")
+        return delay
 
     @dec_runtime
-    def sync_wind_tms_data(self, shift_sec: float = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    def sync_wind_tms_data(self, shift_sec: float = None, site_latitude: Optional[float] = None,
+                           site_longitude: Optional[float] = None, with_reference: bool = False,
+                           start_time=None, end_time=None, time_rolling_max: Optional[str] = None) \
+            -> Tuple[Optional[pd.DataFrame], pd.DataFrame]:
         """
         Synchronizes wind and TMS data by applying an optimal time shift to the wind data.
 
-        :return: A tuple of merged DataFrame without shift (for reference) and the shifted DataFrame.
+        With the site coordinates, every wind record is additionally moved by the travel time of the wind front
+        from the station to the site (depending on its direction and speed), see calc_wind_front_delay.
+
+        :param shift_sec: Constant shift in seconds. Defaults to the median shift of the series.
+        :param site_latitude: Optional latitude of the site in degrees for the per record shift.
+        :param site_longitude: Optional longitude of the site in degrees for the per record shift.
+        :param with_reference: Also merge the wind data without shift for reference (e.g. for plotting).
+        :param start_time: Optional start of the TMS data to synchronize, e.g. for a chunk of a virtual DataMerge.
+        :param end_time: Optional end of the TMS data to synchronize (included).
+        :param time_rolling_max: Window of the rolling maximum, defaults to 'time_rolling_max' in config.
+        :return: A tuple of merged DataFrame without shift (None without `with_reference`) and the shifted DataFrame.
+                 The TMS columns are shared between both and with the TMS data, not copied.
         """
         logger.info("Starting synchronization of wind and TMS data.")
 
         config = self.get_config().Data
 
-        shift_sec = shift_sec or self.shift_sec_median
+        shift_sec = self.shift_sec_median if shift_sec is None else shift_sec
+        time_rolling_max = time_rolling_max or config.time_rolling_max
+
+        # Not modified, the merged DataFrames share its columns
+        tms_df: pd.DataFrame = self.data_tms.get_data()
+        if start_time is not None or end_time is not None:
+            # The rolling max of the first rows of the range needs the rows of one window before
+            padded_start = None if start_time is None else pd.Timestamp(start_time) - pd.Timedelta(time_rolling_max)
+            tms_df = tms_df.loc[padded_start:end_time]
+
+        # Read-only view on the shared wind frame, padded by the largest shift
+        padding = pd.Timedelta(seconds=abs(shift_sec) + config.max_shift_sec) + pd.Timedelta(config.wind_dwd_freq)
+        with self.data_wind_station.acquire_data(tms_df.index.min() - padding,
+                                                 tms_df.index.max() + padding) as wind_df:
+            merged_df, shifted_data = self._sync_wind_tms_data(tms_df, wind_df, shift_sec, site_latitude,
+                                                               site_longitude, with_reference, time_rolling_max)
+        if start_time is not None:
+            shifted_data = shifted_data.loc[start_time:]
+            merged_df = None if merged_df is None else merged_df.loc[start_time:]
+        return merged_df, shifted_data
 
-        tms_df: pd.DataFrame = self.data_tms.data.copy()
-        wind_df: pd.DataFrame = self.data_wind_station.data.copy()
+    def _sync_wind_tms_data(self, tms_df: pd.DataFrame, wind_df: pd.DataFrame, shift_sec: float,
+                            site_latitude: Optional[float], site_longitude: Optional[float],
+                            with_reference: bool = False, time_rolling_max: Optional[str] = None) \
+            -> Tuple[Optional[pd.DataFrame], pd.DataFrame]:
+        config = self.get_config().Data
 
-        # Merge without shift for reference
-        merged_df: pd.DataFrame = merge_dfs_by_time(tms_df, wind_df)
+        if site_latitude is not None and site_longitude is not None:
+            delay = self.calc_wind_front_delay(wind_df, site_latitude, site_longitude)
+            shifted_data = self._get_rolling_max(merge_dfs_by_shifted_time(tms_df, wind_df, shift_sec + delay),
+                                                 time_rolling_max=time_rolling_max)
+            merged_df = None
+            if with_reference:
+                merged_df = self._get_rolling_max(merge_dfs_by_time(tms_df, wind_df),
+                                                  shifted_data[config.merge_tms_value], time_rolling_max)
+            logger.info("Completed data synchronization with wind front shift.")
+            return merged_df, shifted_data
 
         # Calculate the shift in index values for wind_df
         freq = wind_df.index.inferred_freq
@@ -207,22 +310,24 @@ class MeasurementVersion(BaseClass):
             logger.error(f"Error converting frequency to timedelta: {e}")
             raise
 
-        # Shift specified columns in wind_df
         columns_to_shift = config.data_wind_columns
         for column in columns_to_shift:
-            if column in wind_df.columns:
-                wind_df[column] = wind_df[column].shift(index_shift)
-            else:
+            if column not in wind_df.columns:
                 logger.warning(f"Column '{column}' not found in wind_df. Skipping shift for this column.")
 
-        # Merge after applying shift
-        shifted_data: pd.DataFrame = merge_dfs_by_time(tms_df, wind_df)
+        # The nearest wind row of every TMS row is searched once, the shift is an offset on that lookup
+        time_join = TimeJoin(tms_df.index, wind_df.index)
+        shifted_data = self._get_rolling_max(time_join.join(tms_df, wind_df, offset=index_shift,
+                                                            offset_columns=columns_to_shift),
+                                             time_rolling_max=time_rolling_max)
 
-        # Apply rolling max to both DataFrames
-        self._get_rolling_max(merged_df)
-        self._get_rolling_max(shifted_data)
+        merged_df = None
+        if with_reference:
+            # The rolling max of the TMS column does not depend on the shift
+            merged_df = self._get_rolling_max(time_join.join(tms_df, wind_df), shifted_data[config.merge_tms_value],
+                                              time_rolling_max)
 
-        logger.info("Completed data synchronization. Returning merged data and shifted data.")
+        logger.info("Completed data synchronization.")
         return merged_df, shifted_data
 
     @dec_runtime
@@ -240,7 +345,8 @@ class MeasurementVersion(BaseClass):
                 logger.error(f"Invalid mode: {mode}. Use 'median' or 'single'.")
                 raise ValueError("Invalid mode. Use 'median' or 'single'.")
 
-            merged_data, shifted_data = self.sync_wind_tms_data(shift_sec=shift_sec)
+            # The merge without shift is only needed for plot_wind_shift
+            merged_data, shifted_data = self.sync_wind_tms_data(shift_sec=shift_sec, with_reference=plot_shift)
 
             if plot_shift:
                 fig = plot_wind_shift(self.measurement_id, merged_data, shifted_data,
@@ -277,10 +383,38 @@ class MeasurementVersion(BaseClass):
             logger.error(f"Failed to plot_shift_sync_wind_tms: '{self}'. Error: {e}")
             raise
 
+    def get_site_coordinates(self) -> Tuple[float, float]:
+        """
+        Returns the coordinates of the site stored in the series, see Series.add_wind_station.
+
+        :raises ValueError: If the series has no site coordinates.
+        """
+        series = self.measurement.series
+        if series.site_latitude is None or series.site_longitude is None:
+            error_msg = f"No site coordinates for '{self}', pass latitude and longitude to series.add_wind_station first."
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+        return series.site_latitude, series.site_longitude
+
     @dec_runtime
-    def add_data_merge(self, update_existing: bool = True) -> Optional[DataMerge]:
+    def add_data_merge(self, update_existing: bool = True, virtual: Optional[bool] = None,
+                       wind_front_shift: Optional[bool] = None) -> Optional[DataMerge]:
+        """
+        Adds the merged wind and TMS data of this measurement version, see sync_wind_tms_data.
+
+        :param update_existing: Update an existing DataMerge, otherwise it is returned unchanged.
+        :param virtual: Store only the shift and the rolling max window, the merged data is computed on access,
+                        see DataMerge.materialize. Defaults to 'data_merge_virtual' in config.
+        :param wind_front_shift: Additionally shift every wind record by the travel time of the wind front to the
+                                 site of the series, see calc_wind_front_delay. Defaults to 'wind_front_shift' in config.
+        :return: The DataMerge.
+        """
         logger.info(f"Processing add_data_merge for '{self}'")
         session = self.get_database_manager().session
+        config = self.get_config().Data
+        virtual = config.data_merge_virtual if virtual is None else virtual
+        wind_front_shift = config.wind_front_shift if wind_front_shift is None else wind_front_shift
+        site_latitude, site_longitude = self.get_site_coordinates() if wind_front_shift else (None, None)
 
         try:
             # Check for an existing DataMerge with the given measurement_version_id
@@ -294,18 +428,37 @@ class MeasurementVersion(BaseClass):
                     f"Return existing {data_merge.__class__.__name__}, update_existing = '{update_existing}': '{data_merge}'")
 
             else:
+                if existing_data and bool(existing_data.virtual) != virtual:
+                    # Switching between a stored and a virtual DataMerge replaces it
+                    self.data_merge = None
+                    session.delete(existing_data)
+                    session.flush()
+                    existing_data = None
+
+                shift_sec = self.shift_sec_median
+                merge_parameters = dict(shift_sec=shift_sec, time_rolling_max=config.time_rolling_max,
+                                        site_latitude=site_latitude, site_longitude=site_longitude)
                 if not existing_data:  # Create a new instance
-                    _, shifted_data = self.sync_wind_tms_data()
-                    data_merge = DataMerge.create_from_measurement_version(
-                        measurement_version_id=self.measurement_version_id,
-                        data=shifted_data)
+                    if virtual:
+                        data_merge = DataMerge.create_virtual_from_measurement_version(
+                            measurement_version_id=self.measurement_version_id, **merge_parameters)
+                    else:
+                        _, shifted_data = self.sync_wind_tms_data(shift_sec=shift_sec, site_latitude=site_latitude,
+                                                                  site_longitude=site_longitude)
+                        data_merge = DataMerge.create_from_measurement_version(
+                            measurement_version_id=self.measurement_version_id, data=shifted_data,
+                            **merge_parameters)
                     session.flush()
                     logger.info(f"Created new {DataMerge.__class__.__name__}: '{data_merge}'")
 
                 else:  # Update existing  instance
                     data_merge = existing_data
-                    _, shifted_data = self.sync_wind_tms_data()
-                    data_merge.update_from_measurement_version(data=shifted_data)
+                    if virtual:
+                        data_merge.update_virtual(**merge_parameters)
+                    else:
+                        _, shifted_data = self.sync_wind_tms_data(shift_sec=shift_sec, site_latitude=site_latitude,
+                                                                  site_longitude=site_longitude)
+                        data_merge.update_from_measurement_version(data=shifted_data, **merge_parameters)
                     session.flush()
                     logger.warning(
                         f"Update existing {DataMerge.__class__.__name__}, update_existing = '{update_existing}': '{data_merge}'")
@@ -1,6 +1,7 @@
 from ..common_imports.imports_classes import *
 
 from .series import Series
+from .data_wind_station import DataWindStation
 
 logger = get_logger(__name__)
 
@@ -36,3 +37,58 @@ class Project(BaseClass):
             str: A string representation of the Project instance.
         """
         return f"Project(id={self.project_id}, name={self.project_name})"
+
+    @dec_runtime
+    def load_all_from_csv(self, measurement_version_name: str = None, update_existing: bool = True,
+                          max_workers: Optional[int] = None, chunksize: Optional[int] = None,
+                          force: bool = False, auto_commit: bool = True) -> pd.DataFrame:
+        """
+        Loads the TMS data of all measurements of all series from CSV in parallel, with one process pool and one
+        commit for the whole project, see Series.load_measurements_from_csv.
+
+        :param measurement_version_name: Name of the MeasurementVersion. Defaults to the default name from config.
+        :param update_existing: Whether to update existing MeasurementVersions with the same name.
+        :param max_workers: Number of worker processes. Defaults to config, None uses all CPUs.
+        :param chunksize: Rows per chunk for the streaming CSV import, 0 reads each CSV at once. None uses config.
+        :param force: If True, existing MeasurementVersions are updated even if their CSV file is unchanged.
+        :param auto_commit: If True, commits the transaction automatically.
+        :return: DataFrame with one row per measurement and its 'series_id', see Series.load_measurements_from_csv.
+        """
+        measurements = [measurement for series in self.series for measurement in series.measurement]
+        report = Series.load_measurements_from_csv(measurements, measurement_version_name, update_existing,
+                                                   max_workers, chunksize, force, auto_commit)
+        series_ids = {measurement.measurement_id: measurement.series_id for measurement in measurements}
+        report['series_id'] = report['measurement_id'].map(series_ids)
+        logger.info(f"{self}: load_all_from_csv finished, status counts: {report['status'].value_counts().to_dict()}")
+        return report
+
+    @dec_runtime
+    def add_wind_stations(self, station_id_by_series: Dict[int, str], update_existing: bool = False,
+                          max_workers: Optional[int] = None, auto_commit: bool = True) -> Dict[str, DataWindStation]:
+        """
+        Adds the wind stations of many series at once, the DWD files are downloaded concurrently,
+        see DataWindStation.create_from_stations.
+
+        :param station_id_by_series: Dict of series_id and DWD station id.
+        :param update_existing: If True, downloads the data of stations already in the database again.
+        :param max_workers: Concurrent downloads. Defaults to config.
+        :param auto_commit: If True, commits the transaction automatically.
+        :return: Dict of station id and DataWindStation.
+        """
+        series_by_id = {series.series_id: series for series in self.series}
+        unknown = set(station_id_by_series) - set(series_by_id)
+        if unknown:
+            raise ValueError(f"{self} has no series with ids {sorted(unknown)}.")
+
+        stations = DataWindStation.create_from_stations(list(station_id_by_series.values()), update_existing,
+                                                        max_workers)
+        self.get_database_manager().session.flush()
+        for series_id, station_id in station_id_by_series.items():
+            if station_id not in stations:
+                logger.warning(f"No DataWindStation '{station_id}' for {series_by_id[series_id]}.")
+                continue
+            series_by_id[series_id].data_wind_station_id = stations[station_id].data_id
+
+        if auto_commit:
+            self.get_database_manager().commit()
+        return stations
@@ -1,5 +1,6 @@
 import pandas as pd
 from typing import Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 from kj_core.utils.path_utils import validate_and_get_file_list, extract_sensor_id, extract_last_three_digits
 from ..common_imports.imports_classes import *
@@ -10,6 +11,7 @@ from .data_wind_station import DataWindStation
 from .base_class_data_tms import BaseClassDataTMS
 from .data_tms import DataTMS
 from .data_merge import DataMerge
+from ..tms.tms_file_extraction import import_tms_csv
 
 import treemotion
 
@@ -32,6 +34,9 @@ class Series(BaseClass):
     filepath_tms = Column(String)
     filepath_ls3 = Column(String)
     optimal_shift_sec_median = Column(Float)
+    # Coordinates of the site, e.g. for the wind front shift, see MeasurementVersion.add_data_merge
+    site_latitude = Column(Float)
+    site_longitude = Column(Float)
 
     measurement = relationship(Measurement, backref="series", lazy="joined",
                                cascade='all, delete-orphan', order_by='Measurement.measurement_id')
@@ -39,7 +44,7 @@ class Series(BaseClass):
 
     def __init__(self, series_id=None, project_id=None, description=None, datetime_start=None,
                  datetime_end=None, location=None, note=None, filepath_tms=None, filepath_ls3=None,
-                 optimal_shift_sec_median: int = None):
+                 optimal_shift_sec_median: int = None, site_latitude: float = None, site_longitude: float = None):
         super().__init__()
         self.series_id = series_id
         self.project_id = project_id
@@ -52,6 +57,8 @@ class Series(BaseClass):
         self.filepath_ls3 = filepath_ls3
 
         self.optimal_shift_sec_median = optimal_shift_sec_median
+        self.site_latitude = site_latitude
+        self.site_longitude = site_longitude
 
         self._version_dict = {}
 
@@ -127,29 +134,165 @@ class Series(BaseClass):
         total_measurements = len(self.measurement)
         logger.info(f"Updated filenames for {successful_updates} out of {total_measurements} measurements.")
 
+    @dec_runtime
+    def load_all_from_csv(self, measurement_version_name: str = None, update_existing: bool = True,
+                          max_workers: Optional[int] = None, chunksize: Optional[int] = None,
+                          force: bool = False, auto_commit: bool = True) -> pd.DataFrame:
+        """
+        Loads the TMS data of all measurements of the series from CSV in parallel, see `load_measurements_from_csv`.
+
+        :param measurement_version_name: Name of the MeasurementVersion. Defaults to the default name from config.
+        :param update_existing: Whether to update existing MeasurementVersions with the same name.
+        :param max_workers: Number of worker processes. Defaults to config, None uses all CPUs.
+        :param chunksize: Rows per chunk for the streaming CSV import, 0 reads each CSV at once. None uses config.
+        :param force: If True, existing MeasurementVersions are updated even if their CSV file is unchanged.
+        :param auto_commit: If True, commits the transaction automatically.
+        :return: DataFrame with one row per measurement, see `load_measurements_from_csv`.
+        """
+        report_df = self.load_measurements_from_csv(self.measurement, measurement_version_name, update_existing,
+                                                    max_workers, chunksize, force, auto_commit)
+        logger.info(f"{self}: load_all_from_csv finished, status counts: {report_df['status'].value_counts().to_dict()}")
+        return report_df
+
+    @classmethod
+    @dec_runtime
+    def load_measurements_from_csv(cls, measurements: List[Measurement], measurement_version_name: str = None,
+                                   update_existing: bool = True, max_workers: Optional[int] = None,
+                                   chunksize: Optional[int] = None, force: bool = False,
+                                   auto_commit: bool = True) -> pd.DataFrame:
+        """
+        Loads the TMS data of measurements, e.g. of many series, from CSV in parallel.
+
+        The CSV files are parsed and written to the DataTMS data files and their time partitioned datasets in one
+        process pool. The MeasurementVersion and DataTMS instances are registered afterwards on the main process
+        with one commit. Same behaviour per measurement as Measurement.load_from_csv.
+
+        :param measurements: Measurements to load.
+        :param measurement_version_name: Name of the MeasurementVersion. Defaults to the default name from config.
+        :param update_existing: Whether to update existing MeasurementVersions with the same name.
+        :param max_workers: Number of worker processes. Defaults to config, None uses all CPUs.
+        :param chunksize: Rows per chunk for the streaming CSV import, 0 reads each CSV at once. None uses config.
+        :param force: If True, existing MeasurementVersions are updated even if their CSV file is unchanged.
+        :param auto_commit: If True, commits the transaction automatically.
+        :return: DataFrame with one row per measurement, containing 'status' ('created', 'updated', 'unchanged',
+                 'skipped' or 'failed'), the number of imported 'rows' and the 'error' message if failed.
+        """
+        config = cls.get_config()
+        mv_name = measurement_version_name or config.MeasurementVersion.measurement_version_name_default
+        max_workers = max_workers or config.Series.bulk_import_max_workers
+        chunksize = config.Data.data_tms_csv_chunksize if chunksize is None else chunksize
+        time_column: str = config.Data.data_tms_time_column
+        columns_and_dtypes: Dict = DataTMS.get_columns_and_dtypes()
+        # The workers write the dataset, it is not written again serially on registration
+        dataset_options = DataTMS.get_dataset_options() if config.Data.data_file_backend == 'parquet' else None
+
+        report: Dict[int, Dict[str, Any]] = {}
+        jobs: Dict[int, Tuple[Measurement, Optional[MeasurementVersion], str]] = {}
+
+        for measurement in measurements:
+            m_id = measurement.measurement_id
+            report[m_id] = {'measurement_id': m_id, 'filepath_tms': measurement.filepath_tms,
+                            'status': None, 'rows': None, 'error': None}
+            m_v_present: Optional[MeasurementVersion] = next(
+                (mv for mv in measurement.measurement_version if mv.measurement_version_name == mv_name), None)
+
+            if m_v_present and not update_existing:
+                logger.warning(f"Existing measurement_version '{mv_name}' not updated: '{m_v_present}'")
+                report[m_id]['status'] = 'skipped'
+            elif not measurement.filepath_tms:
+                report[m_id].update(status='failed', error="No 'filepath_tms', call add_filenames first.")
+            elif (m_v_present and m_v_present.data_tms and not force
+                  and m_v_present.data_tms.is_csv_unchanged(measurement.filepath_tms)):
+                logger.info(f"'{measurement.filename_tms}' unchanged since last import, '{m_v_present}' not updated.")
+                report[m_id]['status'] = 'unchanged'
+            elif m_v_present and m_v_present.data_tms:
+                jobs[m_id] = (measurement, m_v_present, m_v_present.data_tms.data_filepath)
+            else:
+                jobs[m_id] = (measurement, m_v_present, MeasurementVersion.get_data_tms_filepath(m_id, mv_name))
+
+        logger.info(f"Importing {len(jobs)} of {len(report)} CSV files with max_workers '{max_workers}'.")
+        results: Dict[int, Dict[str, Any]] = {}
+        if jobs:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = {executor.submit(import_tms_csv, measurement.filepath_tms, data_filepath, time_column,
+                                           columns_and_dtypes, chunksize, DataTMS.get_csv_usecols(),
+                                           config.Data.data_file_compression,
+                                           config.Data.data_file_compression_level, dataset_options): m_id
+                           for m_id, (measurement, _, data_filepath) in jobs.items()}
+                for future in as_completed(futures):
+                    m_id = futures[future]
+                    try:
+                        results[m_id] = future.result()
+                        report[m_id]['rows'] = results[m_id]['rows']
+                    except Exception as e:
+                        logger.error(f"Failed to import '{report[m_id]['filepath_tms']}' for measurement '{m_id}': {e}")
+                        report[m_id].update(status='failed', error=str(e))
+
+        # Register all imported data on the main process, with the import state computed by the workers the data
+        # files are not read again
+        session = cls.get_database_manager().session
+        new_mvs: List[MeasurementVersion] = []
+        for m_id, (measurement, m_v_present, data_filepath) in jobs.items():
+            if report[m_id]['status'] == 'failed':
+                continue
+            try:
+                if m_v_present:
+                    if m_v_present.data_tms is None:
+                        m_v_present.data_tms = DataTMS(data_filepath=data_filepath)
+                    m_v_present.data_tms.use_imported_data_file(update_dataset=False)
+                    m_v_present.data_tms.set_csv_import_state(results[m_id]['import_state'])
+                    report[m_id]['status'] = 'updated'
+                else:
+                    mv_new = MeasurementVersion(measurement_id=m_id, measurement_version_name=mv_name)
+                    mv_new.data_tms = DataTMS(data_filepath=data_filepath)
+                    mv_new.data_tms.use_imported_data_file(update_dataset=False)
+                    mv_new.data_tms.set_csv_import_state(results[m_id]['import_state'])
+                    measurement.measurement_version.append(mv_new)
+                    new_mvs.append(mv_new)
+                    report[m_id]['status'] = 'created'
+            except Exception as e:
+                logger.error(f"Failed to register imported data for measurement '{m_id}': {e}")
+                report[m_id].update(status='failed', error=str(e))
+
+        session.add_all(new_mvs)
+        if auto_commit:
+            cls.get_database_manager().commit()
+
+        return pd.DataFrame(list(report.values()), columns=['measurement_id', 'filepath_tms', 'status', 'rows',
+                                                            'error'])
+
     @dec_runtime
     def add_wind_station(self,
-                         station_id: str,
+                         station_id: Optional[str] = None,
                          filename_wind: Optional[str] = None,
                          filename_wind_extreme: Optional[str] = None,
                          filename_stations_list: Optional[str] = None,
                          auto_commit: bool = True,
-                         update_existing: bool = False):
+                         update_existing: bool = False,
+                         latitude: Optional[float] = None,
+                         longitude: Optional[float] = None):
         """
         Adds or updates a wind station in the database.
 
-        :param station_id: Identifier for the station.
+        :param station_id: Identifier for the station. If None, the nearest active station to latitude/longitude
+                           with data from datetime_start to datetime_end of the series is used.
         :param filename_wind: Alternative filename for wind data.
         :param filename_wind_extreme: Alternative filename for wind extreme data.
         :param filename_stations_list: Alternative filename for stations list.
         :param auto_commit: If True, commits the transaction automatically.
         :param update_existing: If True, overwrites the existing wind station data; otherwise, retains the existing data.
+        :param latitude: Latitude of the site in degrees, required without station_id. Stored as site_latitude.
+        :param longitude: Longitude of the site in degrees, required without station_id. Stored as site_longitude.
         :return: DataWindStation instance that was added or found in the database.
         """
         logger.info(f"Processing add_wind_station for '{self}'")
         session = self.get_database_manager().session
 
         try:
+            self.set_site_coordinates(latitude, longitude)
+            if station_id is None:
+                station_id = self.find_wind_station(latitude, longitude)
+
             # Check for an existing DataWindStation with the given station_id
             existing_station: DataWindStation = session.query(DataWindStation).filter(
                 DataWindStation.station_id == station_id).first()
@@ -184,6 +327,87 @@ class Series(BaseClass):
             logger.error(f"Error in add_wind_station: {e}")
             raise  # Optionally re-raise the exception to notify calling functions
 
+    @dec_runtime
+    def add_virtual_wind_station(self, latitude: float, longitude: float, station_ids: Optional[List[str]] = None,
+                                 method: Optional[str] = None, update_existing: bool = False,
+                                 auto_commit: bool = True) -> 'DataWindStation':
+        """
+        Adds a virtual wind station combining several DWD stations onto the site, see DataWindStation.create_virtual.
+        It replaces data_wind_station, so sync_wind_tms_data of all measurements uses it.
+
+        :param latitude: Latitude of the site in degrees, stored as site_latitude.
+        :param longitude: Longitude of the site in degrees, stored as site_longitude.
+        :param station_ids: Stations to combine. Defaults to the nearest 'wind_interpolation_station_count' active
+                            stations with data from datetime_start to datetime_end of the series.
+        :param method: 'idw' or 'direction'. Defaults to config.
+        :param update_existing: If True, updates the stations and creates the virtual station again.
+        :param auto_commit: If True, commits the transaction automatically.
+        :return: The virtual DataWindStation.
+        """
+        config = self.get_config().Data
+        method = method or config.wind_interpolation_method
+        if station_ids is None:
+            nearest = DataWindStation.find_nearest_stations(latitude, longitude,
+                                                            config.wind_interpolation_station_count,
+                                                            self.datetime_start, self.datetime_end)
+            station_ids = list(nearest['station_id'])
+        if not station_ids:
+            raise ValueError(f"No wind stations to combine for {self}.")
+        self.set_site_coordinates(latitude, longitude)
+
+        session = self.get_database_manager().session
+        station_id = DataWindStation.get_virtual_station_id(latitude, longitude, station_ids, method)
+        virtual_station = session.query(DataWindStation).filter(DataWindStation.station_id == station_id).first()
+
+        if virtual_station is None or update_existing:
+            stations = DataWindStation.create_from_stations(station_ids, update_existing)
+            missing = set(station_ids) - set(stations)
+            if missing:
+                raise ValueError(f"No data for wind stations {sorted(missing)}.")
+            stations = [stations[station_id] for station_id in station_ids]
+            if virtual_station is None:
+                virtual_station = DataWindStation.create_virtual(latitude, longitude, stations, method)
+                session.add(virtual_station)
+            else:
+                virtual_station._set_virtual_data(latitude, longitude, stations, method)
+
+        session.flush()
+        self.data_wind_station_id = virtual_station.data_id
+        if auto_commit:
+            self.get_database_manager().commit()
+        return virtual_station
+
+    def set_site_coordinates(self, latitude: Optional[float], longitude: Optional[float]):
+        """
+        Stores the coordinates of the site if both are given, otherwise keeps the stored ones.
+        """
+        if latitude is not None and longitude is not None:
+            self.site_latitude = latitude
+            self.site_longitude = longitude
+
+    def find_wind_station(self, latitude: Optional[float], longitude: Optional[float]) -> str:
+        """
+        Returns the id of the nearest active DWD wind station to the site with data from datetime_start to
+        datetime_end of the series, see DataWindStation.find_nearest_stations.
+
+        :param latitude: Latitude of the site in degrees.
+        :param longitude: Longitude of the site in degrees.
+        :return: Station id.
+        :raises ValueError: If latitude or longitude is missing or no station matches.
+        """
+        if latitude is None or longitude is None:
+            raise ValueError("Either station_id or latitude and longitude of the site are required.")
+
+        stations = DataWindStation.find_nearest_stations(latitude, longitude, 1, self.datetime_start,
+                                                         self.datetime_end)
+        if stations.empty:
+            raise ValueError(f"No active wind station with data from '{self.datetime_start}' to "
+                             f"'{self.datetime_end}' found for {self}.")
+        station = stations.iloc[0]
+        logger.info(f"Nearest wind station for {self}: '{station['station_id']}' ({station['station_name']}) "
+                    f"at {station['distance_km']:.1f} km.")
+        return station['station_id']
+
     @dec_runtime
     def get_measurement_version_by_filter(self, filter_dict: Dict[str, Any], method: str = "list_filter") \
             -> Optional[List[MeasurementVersion]]:
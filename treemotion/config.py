@@ -36,6 +36,34 @@ class Config(CoreConfig):
     class Data:
         data_wind_directory = "data_wind_station"
         wind_download_folder = f"{data_wind_directory}_download"
+        # Mirror of the DWD files in 'wind_download_folder', unchanged files and listings are not downloaded again
+        wind_dwd_mirror: bool = True
+        wind_dwd_mirror_folder = "dwd_mirror"
+        wind_dwd_listing_max_age: float = 60 * 60  # Seconds a cached listing is used without request
+        wind_dwd_timeout: float = 60  # Seconds
+        # Concurrent downloads of DataWindStation.create_from_stations, also the connection pool size
+        wind_dwd_max_workers: int = 8
+        wind_dwd_retries: int = 3  # Retries of failed requests with exponential backoff
+        wind_dwd_backoff_factor: float = 0.5  # Seconds, doubled with every retry
+        # Parse the DWD zip files while they are downloaded (or read from the mirror), without extracting them to
+        # 'wind_download_folder'. 'wind_dwd_keep_extracted' still writes the extracted data files for provenance.
+        wind_dwd_stream: bool = True
+        wind_dwd_keep_extracted: bool = False
+        # Combine the 'historical/' archives with the recent one when the data of a station is downloaded completely,
+        # refreshes of stored stations only append the rows of the recent archive (streamed download only). Only
+        # the archives with data from 'wind_dwd_historical_start' on are downloaded, None downloads all of them
+        wind_dwd_historical: bool = False
+        wind_dwd_historical_start: Optional[str] = None  # e.g. '2020-01-01'
+        wind_dwd_freq = "10min"  # Interval of the DWD data
+        # Virtual wind station of a site from several stations (Series.add_virtual_wind_station): 'idw' weights by
+        # inverse distance ** power, 'direction' also favours stations upwind of the site, downwind keep the floor
+        wind_interpolation_method: str = 'idw'
+        wind_interpolation_station_count: int = 3
+        wind_interpolation_power: float = 2
+        wind_interpolation_direction_floor: float = 0.2
+        # Parsed stations list in 'wind_download_folder' for lookups by id and nearest station queries
+        wind_station_catalog_filename = "station_catalog.feather"
+        wind_station_active_days: Optional[float] = 7  # Max days the data of a station may end before the latest
         data_tms_directory = 'data_tms'
         data_merge_directory = 'data_merge'
         data_ls3_directory = 'data_ls3'
@@ -55,9 +83,19 @@ class Config(CoreConfig):
 
         data_wind_columns_int = []  # , 'station_id', 'quality_level_wind_avg', 'quality_level_wind_extremes']
 
+        # DWD wind values have a resolution of 0.1 m/s and 1 degree, float32 is sufficient
+        data_wind_default_dtype = 'float32'
+        data_wind_default_int_dtype = 'int32'
+
         wind_resample_freq = "60s"
+        # Released wind frames kept in the process-wide cache of DataWindStation.acquire_data
+        data_wind_cache_max_idle: int = 8
 
+        # Precision policy for DataTMS and DataMerge frames in memory and on disk, 'float32' halves memory and
+        # disk usage. Regression and correlation always compute in float64, see utils/precision.py for the
+        # rounding error of float32 and BaseClassDataTMS.check_precision to check it on real data.
         data_tms_default_dtype = 'float64'
+        data_tms_resolution: float = 0.001  # Smallest step of the logged TMS values, float32 rounding must stay below
         data_tms_time_column = "Time"  # 'Time' is the index!
         data_tms_columns_and_dtypes = {
             'East-West-Inclination': data_tms_default_dtype,
@@ -73,6 +111,36 @@ class Config(CoreConfig):
 
         data_tms_columns = list(data_tms_columns_and_dtypes.keys())
 
+        # If False, 'Absolute-Inclination' and 'Inclination direction of the tree' (raw and drift compensated) are
+        # not stored but computed from the EW/NS axes on access, see BaseClassDataTMS.get_column and get_data
+        data_tms_store_derived_columns: bool = True
+
+        # Rows per chunk for the streaming CSV import, None or 0 reads the whole CSV at once
+        data_tms_csv_chunksize: Optional[int] = None
+
+        # 'feather' or 'parquet'. With 'parquet' a day partitioned Parquet dataset is written next to the feather
+        # data file of DataTMS/DataMerge whenever the data file is written, time cuts of data not in memory then
+        # read only the partitions and row groups in range
+        data_file_backend: str = 'feather'
+        data_parquet_row_group_size: int = 20 * 60 * 60  # One hour of 20 Hz data
+        # Memory map uncompressed feather data files when 'data' is read on first access (see
+        # classes/lazy_data_file.py) and by the column and wind frame caches, columns are read-only views on the
+        # file and only touched pages are read
+        data_file_memory_map: bool = False
+        # Read single columns of unchanged DataTMS/DataMerge data files on access (get_column, get_data) instead of
+        # using the whole frame, columns are released least recently used above the byte budget
+        data_lazy_loading: bool = False
+        data_column_cache_max_bytes: int = 2 * 1024 ** 3
+        # Codec and level of the feather data files written by treemotion, by CSV imports and on every save (see
+        # classes/lazy_data_file.py): None, 'lz4' or 'zstd', None level uses the codec default. Only uncompressed
+        # files are memory mapped without copying. Parquet datasets have their own codec and optional byte
+        # shuffle/delta pre-filters. See benchmarks/bench_data_file_codecs.py to choose.
+        data_file_compression: Optional[str] = None
+        data_file_compression_level: Optional[int] = None
+        data_parquet_compression: Optional[str] = 'zstd'
+        data_parquet_compression_level: Optional[int] = None
+        data_parquet_pre_filters: bool = False  # Disables dictionary encoding, often worse for logged values
+
         data_merge_columns = data_wind_columns + data_tms_columns
 
         main_wind_value = 'wind_speed_max_10min_moving_avg'
@@ -81,8 +149,22 @@ class Config(CoreConfig):
         time_rolling_max = '30min'  # pandas time format!
         merge_wind_value = 'wind_rolling_max_' + time_rolling_max
         merge_tms_value = 'tms_rolling_max_' + time_rolling_max
+        # Virtual DataMerge (MeasurementVersion.add_data_merge): only the shift and the rolling max window are stored,
+        # the merged data is computed from DataTMS and the wind station on access instead of stored as second copy
+        data_merge_virtual: bool = False
 
         max_shift_sec: float = 90 * 60  # Default 7200 sec or 2 hours
+        # Coarse to fine shift search of MeasurementVersion.calc_optimal_shift: the rolling maxima are first correlated
+        # in blocks of this many seconds, the best candidates refined down to full resolution. None searches all lags
+        # at full resolution.
+        shift_search_coarse_sec: Optional[float] = 10
+        shift_search_candidates: int = 3
+        # Per record shift of sync_wind_tms_data by the travel time of the wind front from the station to the site
+        # (Series.site_latitude/site_longitude), used by MeasurementVersion.add_data_merge if 'wind_front_shift'.
+        # Below 'wind_front_min_speed' (m/s, near calm) the front has no defined speed and the record is not shifted.
+        wind_front_shift: bool = False
+        wind_front_speed_factor: float = 1.0  # Speed of the wind front relative to the wind speed
+        wind_front_min_speed: float = 2.0
 
         tms_sample_rate_hz: int = 20
         tms_sample_rate_interval = pd.to_timedelta(1 / tms_sample_rate_hz, unit='s')
@@ -95,6 +177,7 @@ class Config(CoreConfig):
     class Series:
         default_data_class_name = "data_merge"
         cut_time_by_peaks_duration = 15 * 60  # Seconds
+        bulk_import_max_workers: Optional[int] = None  # Worker processes for load_all_from_csv, None uses all CPUs
 
     class CrownMotionSimilarity:
         # shifting
@@ -187,8 +187,8 @@ class CrownMotionSimilarity(BaseClass):
             ValueError: If trunk_a or trunk_b attributes are not set or None.
         """
         try:
-            df_a = self.trunk_a[0].data_merge.data.copy()
-            df_b = self.trunk_b[0].data_merge.data.copy()
+            df_a = self.trunk_a[0].data_merge.get_data().copy()
+            df_b = self.trunk_b[0].data_merge.get_data().copy()
             return df_a, df_b
         except AttributeError as e:
             logger.error(f"{self} has no attribute trunk_a and trunk_b or it's None. Exception: {e}")
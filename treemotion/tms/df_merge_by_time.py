@@ -1,30 +1,48 @@
 import numpy as np
 import pandas as pd
 from scipy.signal import correlate
-from typing import Tuple, Union
+from typing import Optional, Tuple, Union
 
 from kj_logger import get_logger
 from kj_core.utils.runtime_manager import dec_runtime
 
+from .time_join import TimeJoin
+
 logger = get_logger(__name__)
 
 
 def merge_dfs_by_time(df_high_freq: pd.DataFrame, df_low_freq: pd.DataFrame) -> pd.DataFrame:
     """
-    Merges two DataFrames based on their time index. The lower frequency DataFrame is reindexed to match
-    the higher frequency DataFrame's index.
+    Merges two DataFrames based on their time index. Every row of the higher frequency DataFrame gets the
+    nearest row of the lower frequency DataFrame, like `reindex(method='nearest')`, see TimeJoin.
 
     :param df_high_freq: The higher frequency DataFrame.
     :param df_low_freq: The lower frequency DataFrame.
     :return: A merged DataFrame.
     """
-    # Reindex the lower frequency DataFrame to match the higher frequency DataFrame's index
-    df_low_freq = df_low_freq.reindex(df_high_freq.index, method='nearest')
-    logger.debug("Reindexed df_low_freq to match df_high_freq.")
+    merged_data = TimeJoin(df_high_freq.index, df_low_freq.index).join(df_high_freq, df_low_freq)
+    logger.debug("Merged df_low_freq onto the index of df_high_freq.")
+    return merged_data
+
+
+def merge_dfs_by_shifted_time(df_high_freq: pd.DataFrame, df_low_freq: pd.DataFrame,
+                              shift_sec: Union[float, np.ndarray]) -> pd.DataFrame:
+    """
+    Merges two DataFrames like `merge_dfs_by_time`, with every row of the lower frequency DataFrame moved in time
+    by its own shift first. Each row of the higher frequency DataFrame gets the nearest shifted row (ties to the
+    later one like `reindex(method='nearest')`), found by binary search in the sorted shifted times, so per row
+    shifts cost about as much as a constant one.
 
-    # Perform an outer join between the two DataFrames
-    merged_data = df_high_freq.merge(df_low_freq, left_index=True, right_index=True, how='outer')
-    logger.debug("Merged dataframes using an outer join.")
+    :param df_high_freq: The higher frequency DataFrame with sorted DatetimeIndex.
+    :param df_low_freq: The lower frequency DataFrame.
+    :param shift_sec: Shift in seconds, a constant or one value per row of `df_low_freq`.
+    :return: A merged DataFrame with the index of `df_high_freq`.
+    """
+    shift_ns = np.round(np.broadcast_to(np.asarray(shift_sec, dtype='float64'), len(df_low_freq)) * 1e9)
+    shifted_index = pd.DatetimeIndex(df_low_freq.index.asi8 + shift_ns.astype('int64'))
+    # Different shifts can overtake each other, TimeJoin sorts them
+    merged_data = TimeJoin(df_high_freq.index, shifted_index).join(df_high_freq, df_low_freq)
+    logger.debug("Merged dataframes by nearest shifted time.")
     return merged_data
 
 
@@ -88,16 +106,27 @@ def align_series(series1: pd.Series, series2: pd.Series) -> Tuple[pd.Series, pd.
 
     return series1_aligned, series2_aligned
 
-def calc_optimal_shift(series1: pd.Series, series2: pd.Series, max_shift: int = None) -> Tuple[int, float, float]:
+def calc_optimal_shift(series1: pd.Series, series2: pd.Series, max_shift: int = None, coarse_factor: Optional[int] = None,
+                       candidates: int = 3, refine_ratio: int = 10) -> Tuple[int, float, float]:
     """
     Calculates the optimal get_shifted_trunk_data and correlations between two time series data to determine
     how aligned they are. This version first aligns the series based on their DateTimeIndex.
 
+    With `coarse_factor` the search is hierarchical instead of over all lags at full resolution: the series are
+    decimated by block means of `coarse_factor` samples and cross-correlated, the `candidates` highest peaks are
+    refined level by level (decimation divided by `refine_ratio`) in a small neighbourhood of each, the last
+    level at full resolution. For smooth series (e.g. rolling maxima) the result equals the full search, the
+    correlations are normalized exactly like it.
+
     Parameters:
     - series1 (pd.Series): Reference time series.
     - series2 (pd.Series): Time series to compare with the reference.
     - max_shift (int, optional): Maximum number of indices to get_shifted_trunk_data series2 for finding the best alignment.
                                  Defaults to half the length of series1 if None.
+    - coarse_factor (int, optional): Decimation of the coarse search in samples, None searches all lags at full
+                                     resolution.
+    - candidates (int): Number of peaks of the coarse search to refine.
+    - refine_ratio (int): Ratio of the decimation between two levels of the refinement.
 
     Returns:
     - Tuple[int, float, float]: A tuple containing the optimal get_shifted_trunk_data (int), correlation without get_shifted_trunk_data (float),
@@ -106,6 +135,9 @@ def calc_optimal_shift(series1: pd.Series, series2: pd.Series, max_shift: int =
     # Align the series based on their DateTimeIndex, ensure that differences in the DateTimeIndex are reflected
     series1, series2 = align_series(series1, series2)
 
+    # Correlation in float64, independent of the storage precision
+    series1, series2 = series1.astype(np.float64), series2.astype(np.float64)
+
     # Issue a warning if NaNs or infinities are present in the time series
     if series1.isna().any() or series2.isna().any():
         raise ValueError("One or both time series contain NaNs. This could impact the correlation calculation.")
@@ -116,6 +148,11 @@ def calc_optimal_shift(series1: pd.Series, series2: pd.Series, max_shift: int =
     # Determine the maximum get_shifted_trunk_data if not specified
     max_shift = max_shift or len(series1) // 2
 
+    if coarse_factor is not None and coarse_factor > 1 and len(series1) == len(series2) \
+            and len(series1) // coarse_factor > 2:
+        return _calc_optimal_shift_coarse_to_fine(series1.to_numpy(), series2.to_numpy(), max_shift, coarse_factor,
+                                                  candidates, refine_ratio)
+
     # Calculate cross-correlation using the FFT method for efficiency
     corr = correlate(series1 - series1.mean(), series2 - series2.mean(), mode='full', method='auto') # direct or fft
 
@@ -138,3 +175,69 @@ def calc_optimal_shift(series1: pd.Series, series2: pd.Series, max_shift: int =
     #              f"Correlation at optimal get_shifted_trunk_data: {correlation_optimal_shift:.4f}")
 
     return int(optimal_shift), float(correlation_no_shift), float(correlation_optimal_shift)
+
+
+def _lag_correlation(a: np.ndarray, b: np.ndarray, lag: int) -> float:
+    # Entry of correlate(a, b, mode='full') at the lag, a dot product over the overlap
+    if lag >= 0:
+        return float(np.dot(a[lag:], b[:len(b) - lag]))
+    return float(np.dot(a[:len(a) + lag], b[-lag:]))
+
+
+def _decimate(values: np.ndarray, factor: int) -> np.ndarray:
+    # Block means, the rows after the last whole block are left out
+    blocks = len(values) // factor
+    return values[:blocks * factor].reshape(blocks, factor).mean(axis=1)
+
+
+def _find_peaks(values: np.ndarray, count: int) -> np.ndarray:
+    # Positions of the `count` highest local maxima (including the borders)
+    left = np.concatenate([[-np.inf], values[:-1]])
+    right = np.concatenate([values[1:], [-np.inf]])
+    peaks = np.flatnonzero((values >= left) & (values >= right))
+    return peaks[np.argsort(values[peaks], kind='stable')[::-1][:count]]
+
+
+def _calc_optimal_shift_coarse_to_fine(values1: np.ndarray, values2: np.ndarray, max_shift: int, coarse_factor: int,
+                                       candidates: int, refine_ratio: int) -> Tuple[int, float, float]:
+    # Lags in samples at full resolution, like the full search: the entry of correlate(a, b) at mid_point + lag
+    a = values1 - values1.mean()
+    b = values2 - values2.mean()
+    norm = np.std(values1) * np.std(values2) * len(values1)
+
+    # Decimation of every level, each level is decimated from the next finer one if the factors allow
+    factors = [coarse_factor]
+    while factors[-1] > 1:
+        factors.append(max(1, factors[-1] // refine_ratio))
+    levels = {1: (a, b)}
+    for finer, factor in zip(factors[::-1], factors[-2::-1]):
+        source, step = (finer, factor // finer) if factor % finer == 0 else (1, factor)
+        levels[factor] = (_decimate(levels[source][0], step), _decimate(levels[source][1], step))
+
+    coarse_a, coarse_b = levels[coarse_factor]
+    coarse_corr = np.abs(correlate(coarse_a, coarse_b, mode='full', method='auto'))
+    coarse_mid = len(coarse_b) - 1
+    coarse_max_shift = min(max_shift // coarse_factor, coarse_mid)
+    valid = coarse_corr[coarse_mid - coarse_max_shift:coarse_mid + coarse_max_shift + 1]
+    lags = (_find_peaks(valid, candidates) - coarse_max_shift) * coarse_factor
+
+    for factor, next_factor in zip(factors, factors[1:]):
+        level_a, level_b = levels[next_factor]
+        # The peak of the finer level lies within one block of the coarser level (plus rounding)
+        radius = factor // next_factor + 1
+        best = {}
+        for lag in lags:
+            center = int(round(lag / next_factor))
+            neighbourhood = [level_lag for level_lag in range(center - radius, center + radius + 1)
+                             if abs(level_lag * next_factor) <= max_shift]
+            values = [abs(_lag_correlation(level_a, level_b, level_lag)) for level_lag in neighbourhood]
+            level_lag = neighbourhood[int(np.argmax(values))]
+            best[level_lag] = max(values)
+        # After the first refinement the candidates are ranked reliably, only the best one is refined further
+        lags = np.array(sorted(best, key=lambda level_lag: (-best[level_lag], level_lag))[:1]) * next_factor
+
+    optimal_shift = int(lags[0])
+    correlation_no_shift = _lag_correlation(a, b, 0) / norm
+    correlation_optimal_shift = _lag_correlation(a, b, optimal_shift) / norm
+    logger.debug(f"Coarse to fine search from decimation '{coarse_factor}', optimal shift '{optimal_shift}'.")
+    return optimal_shift, float(correlation_no_shift), float(correlation_optimal_shift)
@@ -0,0 +1,142 @@
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from kj_logger import get_logger
+
+logger = get_logger(__name__)
+
+WindowLike = Union[str, pd.Timedelta]
+
+
+def regular_step_ns(index: pd.Index) -> Optional[int]:
+    """
+    Returns the step of an index on a regular time grid (strictly increasing, without gaps) in nanoseconds.
+
+    :param index: Index to check.
+    :return: Step in nanoseconds, None if the index is not a regular DatetimeIndex.
+    """
+    if not isinstance(index, pd.DatetimeIndex) or len(index) < 2:
+        return None
+    steps = np.diff(index.asi8)
+    step = int(steps[0])
+    if step <= 0 or not (steps == step).all():
+        return None
+    return step
+
+
+def sliding_max(values: np.ndarray, length: int) -> np.ndarray:
+    """
+    Maximum of every window of `length` rows ending at each row (the first rows get the maximum of the rows so
+    far), by the van Herk/Gil-Werman block decomposition: O(n) independent of the window length.
+
+    The rows are split in blocks of `length`, within each block the running maximum from the left and from the
+    right are accumulated. A window ending at row `i` spans the end of one block and the start of the next, its
+    maximum is the maximum of both. NaN is skipped (np.fmax), a window of only NaN gives NaN.
+
+    :param values: 1d float array.
+    :param length: Window length in rows, at least 1.
+    :return: float64 array of the same length.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind != 'f':
+        values = values.astype('float64')
+    n = len(values)
+    if length <= 1 or n == 0:
+        return values.astype('float64')
+
+    # The maxima are values of the input, so float32 data is processed as float32 (less memory traffic)
+    blocks = -(-n // length)
+    padded = np.full(blocks * length, np.nan, dtype=values.dtype)
+    padded[:n] = values
+    padded = padded.reshape(blocks, length)
+    from_left = np.fmax.accumulate(padded, axis=1).ravel()
+    from_right = np.fmax.accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()
+
+    result = np.empty(n)
+    result[:length - 1] = from_left[:min(n, length - 1)]
+    if n >= length:
+        # Row i with the window start i - length + 1 in the previous block (or the same block at its start)
+        np.fmax(from_right[:n - length + 1], from_left[length - 1:n], out=result[length - 1:])
+    return result
+
+
+def _window_length(step_ns: int, window_ns: int) -> int:
+    # Rows i - m with m * step < window lie in the window (t - window, t]
+    return max(1, -(-window_ns // step_ns))
+
+
+def _sparse_table(values: np.ndarray) -> np.ndarray:
+    # Row j holds the maximum of values[r:r + 2 ** j], NaN beyond the end
+    levels = [values]
+    width = 1
+    while 2 * width <= len(values):
+        previous = levels[-1]
+        level = np.full(len(values), np.nan)
+        level[:len(values) - 2 * width + 1] = np.fmax(previous[:len(values) - 2 * width + 1],
+                                                        previous[width:len(values) - width + 1])
+        levels.append(level)
+        width *= 2
+    return np.stack(levels)
+
+
+def _range_max(table: np.ndarray, first: np.ndarray, last: np.ndarray) -> np.ndarray:
+    # Maximum of values[first:last + 1] for every pair, two overlapping lookups of the sparse table
+    level = np.frexp(last - first + 1)[1].astype(np.int64) - 1  # floor(log2) without rounding errors
+    return np.fmax(table[level, first], table[level, last - (1 << level) + 1])
+
+
+def piecewise_rolling_max(series: pd.Series, window: WindowLike) -> pd.Series:
+    """
+    Rolling maximum of a piecewise constant series like `series.rolling(window, closed='right').max()`, e.g. of
+    10 minute wind data joined onto 20 Hz TMS data, computed at the resolution of the pieces and broadcast.
+
+    Consecutive equal values (and NaN) are one piece. The maximum only changes at rows where a piece starts or
+    where a piece leaves the window, so it is computed at these rows (a lookup of the range of pieces in the
+    window in a sparse table) and repeated up to the next one. Apart from finding the pieces, the cost depends on
+    the number of pieces, not of rows. Works on any sorted index.
+
+    :param series: Series with sorted DatetimeIndex.
+    :param window: Time window, e.g. '30min'.
+    :return: float64 Series with the index of `series`, bit-identical to pandas.
+    """
+    values = series.to_numpy()
+    n = len(values)
+    if n == 0 or not isinstance(series.index, pd.DatetimeIndex) or not series.index.is_monotonic_increasing:
+        return series.rolling(window, closed='right').max()
+
+    nan = np.isnan(values)
+    changed = (values[1:] != values[:-1]) & ~(nan[1:] & nan[:-1])
+    piece_starts = np.concatenate([[0], np.flatnonzero(changed) + 1])
+
+    # The window (t - window, t] loses a piece at the first row with t >= time of its last row + window
+    times = series.index.asi8
+    window_ns = pd.Timedelta(window).value
+    piece_leaves = np.searchsorted(times, times[np.append(piece_starts[1:], n) - 1] + window_ns, side='left')
+    rows = np.union1d(piece_starts, piece_leaves[piece_leaves < n])
+
+    first_rows = np.searchsorted(times, times[rows] - window_ns, side='right')
+    table = _sparse_table(values[piece_starts].astype('float64'))
+    row_values = _range_max(table, np.searchsorted(piece_starts, first_rows, side='right') - 1,
+                            np.searchsorted(piece_starts, rows, side='right') - 1)
+    result = np.repeat(row_values, np.diff(np.append(rows, n)))
+    return pd.Series(result, index=series.index, name=series.name)
+
+
+def rolling_max(series: pd.Series, window: WindowLike) -> pd.Series:
+    """
+    Rolling maximum like `series.rolling(window, closed='right').max()` for data on a regular time grid, see
+    sliding_max. Other data falls back to pandas.
+
+    :param series: Series with DatetimeIndex.
+    :param window: Time window, e.g. '30min'.
+    :return: float64 Series with the index of `series`, bit-identical to pandas.
+    """
+    step_ns = regular_step_ns(series.index)
+    if step_ns is None:
+        logger.debug(f"Index of '{series.name}' is not on a regular grid, rolling max by pandas.")
+        return series.rolling(window, closed='right').max()
+
+    length = _window_length(step_ns, pd.Timedelta(window).value)
+    return pd.Series(sliding_max(series.to_numpy(), length), index=series.index, name=series.name)
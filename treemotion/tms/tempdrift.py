@@ -19,8 +19,12 @@ def temp_drift_comp_lin_reg(inclino: pd.Series, temperature: pd.Series) -> pd.Se
     temperature (pd.Series): Series of temperature values.
 
     Returns:
-    pd.Series: Corrected and centered inclination values.
+    pd.Series: Corrected and centered inclination values, always float64.
     """
+    # Regression in float64, independent of the storage precision
+    inclino = inclino.astype(np.float64)
+    temperature = temperature.astype(np.float64)
+
     # Centering the temperature around its median
     temperature_centered = temperature - temperature.median()
 
@@ -55,8 +59,12 @@ def temp_drift_comp_lin_reg_2(inclino: pd.Series, temperature: pd.Series) -> pd.
     temperature (pd.Series): Series of temperature values.
 
     Returns:
-    pd.Series: Corrected and centered inclination values.
+    pd.Series: Corrected and centered inclination values, always float64.
     """
+    # Regression in float64, independent of the storage precision
+    inclino = inclino.astype(np.float64)
+    temperature = temperature.astype(np.float64)
+
     # Centering the temperature around its median
     temperature_centered = temperature - temperature.median()
 
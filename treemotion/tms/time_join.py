@@ -0,0 +1,98 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from kj_logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def nearest_indexer(source: np.ndarray, target: np.ndarray) -> np.ndarray:
+    """
+    Finds for every target time the position of the nearest source time by binary search, like
+    `pd.Index.get_indexer(target, method='nearest')`: ties go to the later source time.
+
+    :param source: Sorted source times as int64 (e.g. `DatetimeIndex.asi8`), not empty.
+    :param target: Target times as int64.
+    :return: Positions in `source`.
+    """
+    right = np.searchsorted(source, target, side='left')
+    left = np.maximum(right - 1, 0)
+    right = np.minimum(right, len(source) - 1)
+    return np.where(target - source[left] < source[right] - target, left, right)
+
+
+class TimeJoin:
+    """
+    Join of a low frequency frame (e.g. 10 minutes wind data) onto the index of a high frequency frame (e.g. 20 Hz
+    TMS data), replacing `reindex(method='nearest')` followed by a merge.
+
+    The nearest source row of every target row is searched once, columns are gathered with `np.take` directly
+    into the result. A shift of the source by whole rows, like `DataFrame.shift(offset)` before the join, is an
+    offset on that lookup and needs no second search.
+    """
+
+    def __init__(self, target_index: pd.DatetimeIndex, source_index: pd.DatetimeIndex):
+        if len(source_index) == 0:
+            raise ValueError("The source index is empty.")
+        self.target_index = target_index
+        self.source_length = len(source_index)
+
+        source = source_index.asi8
+        if source_index.is_monotonic_increasing:
+            self.indexer = nearest_indexer(source, target_index.asi8)
+        else:
+            order = np.argsort(source, kind='stable')
+            self.indexer = order[nearest_indexer(source[order], target_index.asi8)]
+
+    def take(self, df_source: pd.DataFrame, columns: Optional[List[str]] = None, offset: int = 0,
+             offset_columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Gathers source columns for the target rows.
+
+        :param df_source: Frame with the source index of this join.
+        :param columns: Columns to gather, defaults to all.
+        :param offset: Shift of the source values by rows like `Series.shift(offset)`, rows shifted in from
+                       outside are NaN and integer columns become float64 like with `shift`.
+        :param offset_columns: Columns the offset applies to, defaults to all.
+        :return: Dict of column and array aligned with the target index.
+        """
+        columns = list(df_source.columns) if columns is None else columns
+        if offset == 0:
+            return {col: df_source[col].to_numpy()[self.indexer] for col in columns}
+
+        positions = self.indexer - offset
+        valid = (positions >= 0) & (positions < self.source_length)
+        positions = np.where(valid, positions, 0)
+        result = {}
+        for col in columns:
+            values = df_source[col].to_numpy()
+            if offset_columns is not None and col not in offset_columns:
+                result[col] = values[self.indexer]
+                continue
+            if values.dtype.kind in 'iub':
+                values = values.astype('float64')
+            values = values[positions]
+            if not valid.all():
+                values[~valid] = np.nan
+            result[col] = values
+        return result
+
+    def join(self, df_target: pd.DataFrame, df_source: pd.DataFrame, offset: int = 0,
+             offset_columns: Optional[List[str]] = None, suffixes=('_x', '_y')) -> pd.DataFrame:
+        """
+        Returns the target frame with the gathered source columns, see take. The target columns are not copied.
+
+        :param df_target: Frame with the target index of this join.
+        :param df_source: Frame with the source index of this join.
+        :param offset: Shift of the source values by rows.
+        :param offset_columns: Columns the offset applies to, defaults to all.
+        :param suffixes: Suffixes of columns in both frames, like `merge`.
+        :return: Joined DataFrame with the target index.
+        """
+        common = set(df_target.columns) & set(df_source.columns)
+        columns = {f"{col}{suffixes[0]}" if col in common else col: df_target[col] for col in df_target.columns}
+        for col, values in self.take(df_source, offset=offset, offset_columns=offset_columns).items():
+            columns[f"{col}{suffixes[1]}" if col in common else col] = values
+        return pd.DataFrame(columns, index=self.target_index, copy=False)
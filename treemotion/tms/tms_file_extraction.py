@@ -0,0 +1,233 @@
+import io
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Union
+
+import pandas as pd
+
+from kj_logger import get_logger
+
+from ..utils.data_file_io import write_feather_chunks, read_feather_file, get_dataset_directory, \
+    write_time_partitioned_dataset
+from ..utils.file_fingerprint import last_line_end_offset, prefix_checksum, quick_hash
+
+logger = get_logger(__name__)
+
+# Options shared by the eager and the chunked reader, so both paths produce identical DataFrames
+READ_CSV_OPTIONS = {
+    'sep': ";",
+    'decimal': ",",
+}
+
+
+def _usecols(time_column: str, usecols: Optional[List[str]]) -> Optional[List[str]]:
+    return None if usecols is None else [time_column] + list(usecols)
+
+
+class _ByteRangeReader(io.RawIOBase):
+    """
+    Raw reader of a binary file that stops at the byte offset `end`.
+    """
+
+    def __init__(self, file: BinaryIO, end: int):
+        self._file = file
+        self._remaining = max(0, end - file.tell())
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = self._file.readinto(memoryview(buffer)[:min(len(buffer), self._remaining)])
+        self._remaining -= size
+        return size
+
+
+@contextmanager
+def open_complete_lines(filepath: Union[str, Path], start: int = 0, end: Optional[int] = None) -> Iterator[BinaryIO]:
+    """
+    Opens a file for reading the bytes from `start` to `end`, by default up to the end of its last complete line.
+
+    A logger may still be writing the last line of a CSV file. It is not read, so it is not imported half
+    written, the next import reads it from the recorded offset of the last complete line.
+
+    :param filepath: Path of the file.
+    :param start: Byte offset to start reading at.
+    :param end: Byte offset to stop reading at, None for the end of the last complete line.
+    :return: Binary file object.
+    """
+    if end is None:
+        end = last_line_end_offset(filepath)
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        yield io.BufferedReader(_ByteRangeReader(f, end))
+
+
+def read_tms_csv(filepath: Union[str, Path], time_column: str, columns_and_dtypes: Dict[str, str],
+                 usecols: Optional[List[str]] = None, end: Optional[int] = None) -> pd.DataFrame:
+    """
+    Reads the complete lines of a TMS logger CSV file at once, see `open_complete_lines`.
+
+    :param filepath: Path to the CSV file.
+    :param time_column: Name of the time column, used as DatetimeIndex.
+    :param columns_and_dtypes: Expected data columns and their dtypes.
+    :param usecols: Data columns to read, all columns if None.
+    :param end: Byte offset to stop reading at, None for the end of the last complete line.
+    :return: DataFrame with the read data.
+    """
+    with open_complete_lines(filepath, end=end) as f:
+        return pd.read_csv(f, parse_dates=[time_column], index_col=time_column, dtype=columns_and_dtypes,
+                           usecols=_usecols(time_column, usecols), **READ_CSV_OPTIONS)
+
+
+def iter_tms_csv_chunks(filepath: Union[str, Path], time_column: str, columns_and_dtypes: Dict[str, str],
+                        chunksize: int, usecols: Optional[List[str]] = None,
+                        end: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """
+    Reads the complete lines of a TMS logger CSV file in chunks of `chunksize` rows.
+
+    Every chunk is parsed with the same options as `read_tms_csv` and validated before it is yielded,
+    so concatenating all chunks gives the same DataFrame as the eager reader.
+
+    :param filepath: Path to the CSV file.
+    :param time_column: Name of the time column, used as DatetimeIndex.
+    :param columns_and_dtypes: Expected data columns and their dtypes.
+    :param chunksize: Number of rows per chunk.
+    :param usecols: Data columns to read, all columns if None.
+    :param end: Byte offset to stop reading at, None for the end of the last complete line.
+    :return: Iterator over validated DataFrame chunks.
+    :raises ValueError: If a chunk misses columns or its time column could not be parsed.
+    """
+    if chunksize <= 0:
+        raise ValueError("chunksize must be greater than 0")
+
+    with open_complete_lines(filepath, end=end) as f, \
+            pd.read_csv(f, parse_dates=[time_column], index_col=time_column, dtype=columns_and_dtypes,
+                        chunksize=chunksize, usecols=_usecols(time_column, usecols), **READ_CSV_OPTIONS) as reader:
+        for chunk_number, chunk in enumerate(reader):
+            validate_tms_chunk(chunk, columns_and_dtypes, chunk_number)
+            yield chunk
+
+
+def validate_tms_chunk(chunk: pd.DataFrame, columns_and_dtypes: Dict[str, str], chunk_number: Optional[int] = None):
+    """
+    Validates a chunk of TMS data read from CSV.
+
+    :param chunk: DataFrame chunk to validate.
+    :param columns_and_dtypes: Expected data columns and their dtypes.
+    :param chunk_number: Position of the chunk in the file, only used for error messages.
+    :raises ValueError: If a chunk misses columns, has wrong dtypes or its index is not a DatetimeIndex.
+    """
+    missing_columns = [col for col in columns_and_dtypes if col not in chunk.columns]
+    if missing_columns:
+        raise ValueError(f"Chunk {chunk_number}: missing columns {missing_columns}")
+
+    wrong_dtypes = [col for col, dtype in columns_and_dtypes.items() if chunk[col].dtype != dtype]
+    if wrong_dtypes:
+        raise ValueError(f"Chunk {chunk_number}: unexpected dtypes in columns {wrong_dtypes}")
+
+    if not isinstance(chunk.index, pd.DatetimeIndex):
+        raise ValueError(f"Chunk {chunk_number}: time column could not be parsed to a DatetimeIndex")
+
+
+def import_tms_csv(filepath: Union[str, Path], data_filepath: Union[str, Path], time_column: str,
+                   columns_and_dtypes: Dict[str, str], chunksize: Optional[int] = None,
+                   usecols: Optional[List[str]] = None, compression: Optional[str] = None,
+                   compression_level: Optional[int] = None,
+                   dataset_options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Reads a TMS logger CSV file and writes it to a Feather data file and the time partitioned dataset next to it.
+
+    Takes the config values as arguments, so it can run in worker processes without package setup. Also returns
+    the import state of the CSV file, so the data file does not have to be read again to register the import.
+
+    :param filepath: Path to the CSV file.
+    :param data_filepath: Path of the Feather data file to write.
+    :param time_column: Name of the time column, used as DatetimeIndex.
+    :param columns_and_dtypes: Expected data columns and their dtypes.
+    :param chunksize: Rows per chunk, None or 0 reads the whole CSV at once.
+    :param usecols: Data columns to read, all columns if None.
+    :param compression: Codec of the Feather data file, see `write_feather_chunks`.
+    :param compression_level: Level of the codec, None for its default.
+    :param dataset_options: Options of the time partitioned dataset (see `write_time_partitioned_dataset`),
+                            None removes an existing dataset, it is stale after the import.
+    :return: Number of 'rows' written and the 'import_state' of the CSV file (see `get_csv_import_state`),
+             None if it has no rows.
+    """
+    # The lines appended while importing are left to the next import
+    end = last_line_end_offset(filepath)
+    if chunksize:
+        chunks = iter_tms_csv_chunks(filepath, time_column, columns_and_dtypes, chunksize, usecols, end)
+    else:
+        chunks = [read_tms_csv(filepath, time_column, columns_and_dtypes, usecols, end)]
+
+    last_times = []
+    rows = write_feather_chunks(_track_last_time(chunks, last_times), data_filepath, compression, compression_level)
+
+    directory = get_dataset_directory(data_filepath)
+    if dataset_options is not None and rows:
+        write_time_partitioned_dataset(read_feather_file(data_filepath, memory_map=True), directory,
+                                       source_filepath=data_filepath, **dataset_options)
+    elif directory.exists():
+        shutil.rmtree(directory)
+
+    import_state = get_csv_import_state(filepath, max(last_times), end) if last_times else None
+    return {'rows': rows, 'import_state': import_state}
+
+
+def _track_last_time(chunks: Iterable[pd.DataFrame], last_times: List[pd.Timestamp]) -> Iterator[pd.DataFrame]:
+    for chunk in chunks:
+        if not chunk.empty:
+            last_times.append(chunk.index.max())
+        yield chunk
+
+
+def get_csv_import_state(filepath: Union[str, Path], last_time, offset: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Returns the state of a CSV file imported up to `last_time`, keyed like the columns of DataTMS: the end of
+    the imported lines, the last timestamp and a checksum of the imported part of the file, and the
+    fingerprint (size, modification time and quick hash) of the file.
+
+    :param filepath: Path to the CSV file.
+    :param last_time: Last timestamp of the imported data.
+    :param offset: Byte offset up to which the file was imported, None for the end of its last complete line.
+    :return: Dict with 'csv_import_offset', 'csv_import_last_time', 'csv_import_checksum', 'csv_size',
+             'csv_mtime' and 'csv_hash'.
+    """
+    if offset is None:
+        offset = last_line_end_offset(filepath)
+    stat = Path(filepath).stat()
+    return {
+        'csv_import_offset': offset,
+        'csv_import_last_time': pd.Timestamp(last_time).to_pydatetime(),
+        'csv_import_checksum': prefix_checksum(filepath, offset),
+        'csv_size': stat.st_size,
+        'csv_mtime': stat.st_mtime,
+        'csv_hash': quick_hash(filepath),
+    }
+
+
+def read_tms_csv_tail(filepath: Union[str, Path], offset: int, time_column: str,
+                      columns_and_dtypes: Dict[str, str], usecols: Optional[List[str]] = None,
+                      end: Optional[int] = None) -> pd.DataFrame:
+    """
+    Reads the complete lines of a TMS logger CSV file starting at a byte offset, see `open_complete_lines`.
+
+    The column names are taken from the header line, so the result has the same columns as `read_tms_csv`.
+
+    :param filepath: Path to the CSV file.
+    :param offset: Byte offset of the first row to read, must be the start of a line after the header.
+    :param time_column: Name of the time column, used as DatetimeIndex.
+    :param columns_and_dtypes: Expected data columns and their dtypes.
+    :param usecols: Data columns to read, all columns if None.
+    :param end: Byte offset to stop reading at, None for the end of the last complete line.
+    :return: DataFrame with the rows after `offset`.
+    """
+    with open(filepath, 'rb') as f:
+        header = f.readline().decode('utf-8-sig').rstrip('\r\n')
+    names = header.split(READ_CSV_OPTIONS['sep'])
+    with open_complete_lines(filepath, offset, end) as f:
+        df = pd.read_csv(f, header=None, names=names, parse_dates=[time_column], index_col=time_column,
+                         dtype=columns_and_dtypes, usecols=_usecols(time_column, usecols), **READ_CSV_OPTIONS)
+    validate_tms_chunk(df, columns_and_dtypes)
+    return df
@@ -0,0 +1,88 @@
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Tuple, Union
+
+import pandas as pd
+
+from kj_logger import get_logger
+
+from .data_file_io import read_feather_file
+
+logger = get_logger(__name__)
+
+
+class ColumnCache:
+    """
+    Least recently used cache of single columns read from feather data files, limited by a byte budget.
+
+    Columns are read column-projected (and memory mapped if configured), so touching one column of a data
+    file never loads the others. Entries are keyed by file path, modification time and column, a rewritten
+    data file is read again. When the budget is exceeded the least recently used columns are released.
+    """
+
+    def __init__(self, max_bytes: int, memory_map: bool = False):
+        self.max_bytes = max_bytes
+        self.memory_map = memory_map
+        self._columns: 'OrderedDict[Tuple[str, int, str], pd.Series]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def get(self, filepath: Union[str, Path], columns: List[str]) -> pd.DataFrame:
+        """
+        Returns the columns of a data file, reading only the columns missing in the cache.
+
+        :param filepath: Path of the feather data file.
+        :param columns: Columns to return.
+        :return: DataFrame with the columns in the order of `columns`.
+        """
+        filepath = str(filepath)
+        mtime_ns = Path(filepath).stat().st_mtime_ns
+        with self._lock:
+            found = {}
+            for col in columns:
+                key = (filepath, mtime_ns, col)
+                if key in self._columns:
+                    self._columns.move_to_end(key)
+                    found[col] = self._columns[key]
+
+        missing = [col for col in columns if col not in found]
+        if missing:
+            df = read_feather_file(filepath, columns=missing, memory_map=self.memory_map)
+            logger.debug(f"Read columns {missing} from '{filepath}'.")
+            with self._lock:
+                for col in missing:
+                    found[col] = df[col]
+                    self._put((filepath, mtime_ns, col), df[col])
+                self._evict()
+        # Without copying, the frame shares the memory of the cached (and possibly memory mapped) columns
+        return pd.DataFrame({col: found[col] for col in columns}, copy=False)
+
+    def _put(self, key: Tuple[str, int, str], series: pd.Series):
+        if key in self._columns:
+            self._bytes -= _nbytes(self._columns.pop(key))
+        self._columns[key] = series
+        self._bytes += _nbytes(series)
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and len(self._columns) > 1:
+            key, series = self._columns.popitem(last=False)
+            self._bytes -= _nbytes(series)
+            logger.debug(f"Released column '{key[2]}' of '{key[0]}'.")
+
+    def release(self, filepath: Union[str, Path, None] = None):
+        """
+        Releases all columns of a data file, or all columns if `filepath` is None.
+        """
+        with self._lock:
+            for key in [key for key in self._columns if filepath is None or key[0] == str(filepath)]:
+                self._bytes -= _nbytes(self._columns.pop(key))
+
+
+def _nbytes(series: pd.Series) -> int:
+    # Counts the index for every column, columns read together share it, so the budget is conservative
+    return series.nbytes + series.index.nbytes
@@ -0,0 +1,389 @@
+import functools
+import json
+import operator
+import shutil
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from kj_logger import get_logger
+
+logger = get_logger(__name__)
+
+
+FEATHER_COMPRESSIONS = (None, 'lz4', 'zstd')
+
+
+def get_ipc_write_options(compression: Optional[str] = None,
+                          compression_level: Optional[int] = None) -> pa.ipc.IpcWriteOptions:
+    """
+    Returns the Arrow IPC write options for a codec of `FEATHER_COMPRESSIONS` and an optional level.
+
+    Only uncompressed files can be memory mapped without copying, see `read_feather_file`.
+
+    :raises ValueError: If the codec is not supported.
+    """
+    if compression not in FEATHER_COMPRESSIONS:
+        raise ValueError(f"Unsupported compression '{compression}', use one of {FEATHER_COMPRESSIONS}.")
+    if compression is None:
+        return pa.ipc.IpcWriteOptions()
+    return pa.ipc.IpcWriteOptions(compression=pa.Codec(compression, compression_level=compression_level))
+
+
+def _write_ipc_file(tables: Iterable[Union[pa.Table, pa.RecordBatch]], filepath: Path,
+                    options: pa.ipc.IpcWriteOptions, schema: Optional[pa.Schema] = None) -> int:
+    """
+    Writes tables or record batches into a temporary Arrow IPC file and replaces `filepath` with it when all
+    are written. The schema is taken from the first table if not given, every table must match it.
+    """
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    tmp_filepath = filepath.with_name(f"{filepath.name}.tmp")
+
+    writer: Optional[pa.ipc.RecordBatchFileWriter] = None
+    if schema is not None:
+        writer = pa.ipc.new_file(str(tmp_filepath), schema, options=options)
+    rows = 0
+    try:
+        for table in tables:
+            if writer is None:
+                schema = table.schema
+                writer = pa.ipc.new_file(str(tmp_filepath), schema, options=options)
+            elif not table.schema.equals(schema):
+                raise ValueError(f"Chunk schema does not match the schema of the first chunk:\n{table.schema}")
+            writer.write(table)
+            rows += table.num_rows
+
+        if writer is None:
+            raise ValueError("No chunks to write.")
+        writer.close()
+        writer = None
+        tmp_filepath.replace(filepath)
+    finally:
+        if writer is not None:
+            writer.close()
+        if tmp_filepath.exists():
+            tmp_filepath.unlink()
+    return rows
+
+
+def write_feather_chunks(chunks: Iterable[pd.DataFrame], filepath: Union[str, Path],
+                         compression: Optional[str] = None, compression_level: Optional[int] = None) -> int:
+    """
+    Writes DataFrame chunks one after another into a single Feather (Arrow IPC) file.
+
+    Only one chunk is held in memory at a time. The file is written to a temporary path first and
+    renamed when all chunks are written, so an interrupted ingest never leaves a truncated data file.
+    The index of the chunks is stored like `pd.DataFrame.to_feather` does, `pd.read_feather` restores it.
+
+    :param chunks: Iterable of DataFrames with identical columns and dtypes.
+    :param filepath: Path of the Feather file.
+    :param compression: Codec of `FEATHER_COMPRESSIONS`, None writes uncompressed.
+    :param compression_level: Level of the codec, None for its default.
+    :return: Number of rows written.
+    :raises ValueError: If `chunks` is empty or a chunk does not match the schema of the first chunk.
+    """
+    options = get_ipc_write_options(compression, compression_level)
+    filepath = Path(filepath)
+    tables = (pa.Table.from_pandas(chunk, preserve_index=True) for chunk in chunks)
+    rows = _write_ipc_file(tables, filepath, options)
+    logger.debug(f"Wrote {rows} rows to '{filepath}'.")
+    return rows
+
+
+def append_feather_chunks(chunks: Iterable[pd.DataFrame], filepath: Union[str, Path],
+                          compression: Optional[str] = None, compression_level: Optional[int] = None) -> int:
+    """
+    Appends DataFrame chunks to an existing Feather (Arrow IPC) file.
+
+    The footer of an IPC file lists all record batches, so the file is written again: the stored record
+    batches are copied from the memory mapped file without converting them to pandas, followed by the new
+    chunks. Like `write_feather_chunks` the file is replaced only when all chunks are written.
+
+    :param chunks: Iterable of DataFrames with the columns and dtypes of the stored data.
+    :param filepath: Path of the Feather file.
+    :param compression: Codec of `FEATHER_COMPRESSIONS`, None writes uncompressed.
+    :param compression_level: Level of the codec, None for its default.
+    :return: Number of rows appended.
+    :raises ValueError: If a chunk does not match the schema of the file.
+    """
+    options = get_ipc_write_options(compression, compression_level)
+    filepath = Path(filepath)
+    appended = []
+
+    def tables(reader: pa.ipc.RecordBatchFileReader):
+        for i in range(reader.num_record_batches):
+            yield reader.get_batch(i)
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=True)
+            if not table.schema.equals(reader.schema):
+                raise ValueError(f"Chunk schema does not match the schema of '{filepath}':\n{table.schema}")
+            # The pandas metadata of the stored data is kept
+            appended.append(table.num_rows)
+            yield table.replace_schema_metadata(reader.schema.metadata)
+
+    with pa.memory_map(str(filepath)) as source, pa.ipc.open_file(source) as reader:
+        _write_ipc_file(tables(reader), filepath, options, reader.schema)
+
+    rows = sum(appended)
+    logger.debug(f"Appended {rows} rows to '{filepath}'.")
+    return rows
+
+
+def read_feather_file(filepath: Union[str, Path], columns: Optional[List[str]] = None,
+                      memory_map: bool = False) -> pd.DataFrame:
+    """
+    Reads a Feather (Arrow IPC) data file into a DataFrame.
+
+    With `memory_map` the file is mapped instead of read. For uncompressed files the columns without nulls
+    are read-only numpy views on the mapping, pages are only read from disk for the rows actually touched.
+    Columns with nulls and compressed files are copied as usual.
+
+    :param filepath: Path of the Feather file.
+    :param columns: Columns to read, all columns if None. The stored index is always restored.
+    :param memory_map: If True, maps the file into memory instead of reading it.
+    :return: DataFrame with the read data.
+    """
+    if columns is None and not memory_map:
+        return pd.read_feather(filepath)
+
+    source = pa.memory_map(str(filepath)) if memory_map else str(filepath)
+    with pa.ipc.open_file(source) as reader:
+        table = reader.read_all()
+
+    if columns is not None:
+        # Keep the stored index columns, otherwise `to_pandas` cannot restore the index
+        pandas_metadata = table.schema.pandas_metadata or {}
+        index_columns = [col for col in pandas_metadata.get('index_columns', []) if isinstance(col, str)]
+        table = table.select([col for col in columns if col not in index_columns] + index_columns)
+
+    if memory_map:
+        # One block per column, otherwise pandas consolidates the columns into a new array
+        return table.to_pandas(split_blocks=True)
+    return table.to_pandas()
+
+
+def read_feather_columns(filepath: Union[str, Path]) -> List[str]:
+    """
+    Returns the data columns of a Feather (Arrow IPC) data file without the stored index, reads only the schema.
+    """
+    with pa.ipc.open_file(str(filepath)) as reader:
+        schema = reader.schema
+    index_columns = (schema.pandas_metadata or {}).get('index_columns', [])
+    return [name for name in schema.names if name not in index_columns]
+
+
+DATASET_SOURCE_FILENAME = "_source.json"  # Files starting with '_' are ignored by pyarrow.dataset
+
+
+def get_dataset_directory(data_filepath: Union[str, Path]) -> Path:
+    """
+    Returns the directory of the time partitioned Parquet dataset next to a data file.
+    """
+    return Path(data_filepath).with_suffix('.parquet')
+
+
+def _file_state(filepath: Union[str, Path]) -> dict:
+    stat = Path(filepath).stat()
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def get_parquet_column_encoding(table: pa.Table) -> Dict[str, str]:
+    """
+    Returns Parquet pre-filters for the columns of a table: BYTE_STREAM_SPLIT (byte shuffle) for float columns
+    and DELTA_BINARY_PACKED for timestamp and integer columns. Both make smooth series compress better.
+    """
+    encoding = {}
+    for field in table.schema:
+        if pa.types.is_floating(field.type):
+            encoding[field.name] = 'BYTE_STREAM_SPLIT'
+        elif pa.types.is_timestamp(field.type) or pa.types.is_integer(field.type):
+            encoding[field.name] = 'DELTA_BINARY_PACKED'
+    return encoding
+
+
+def write_parquet_file(df: pd.DataFrame, filepath: Union[str, Path], row_group_size: Optional[int] = None,
+                       compression: Optional[str] = 'zstd', compression_level: Optional[int] = None,
+                       pre_filters: bool = False):
+    """
+    Writes a DataFrame to a Parquet file with row group statistics.
+
+    :param df: DataFrame to write, the index is stored.
+    :param filepath: Path of the Parquet file.
+    :param row_group_size: Rows per row group, None for the pyarrow default.
+    :param compression: Parquet codec, e.g. 'zstd', 'lz4' or None.
+    :param compression_level: Level of the codec, None for its default.
+    :param pre_filters: If True, uses the encodings of `get_parquet_column_encoding`.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    column_encoding = get_parquet_column_encoding(table) if pre_filters else None
+    # Columns with an explicit encoding must not be dictionary encoded
+    use_dictionary = [name for name in table.column_names if name not in (column_encoding or {})]
+    pq.write_table(table, str(filepath), row_group_size=row_group_size, compression=compression,
+                   compression_level=compression_level, use_dictionary=use_dictionary if pre_filters else True,
+                   column_encoding=column_encoding, write_statistics=True)
+
+
+def write_time_partitioned_dataset(df: pd.DataFrame, directory: Union[str, Path], row_group_size: int,
+                                   source_filepath: Optional[Union[str, Path]] = None,
+                                   compression: Optional[str] = 'zstd', compression_level: Optional[int] = None,
+                                   pre_filters: bool = False) -> int:
+    """
+    Writes a DataFrame with DatetimeIndex as Parquet dataset with one partition per day ('date=YYYY-MM-DD').
+
+    Every partition is written with row group statistics, so readers skip partitions and row groups outside a
+    requested time range. The dataset is written to a temporary directory first and replaces an existing one.
+
+    :param df: DataFrame with a sorted DatetimeIndex.
+    :param directory: Directory of the dataset.
+    :param row_group_size: Rows per row group.
+    :param source_filepath: Data file the dataset is derived from, its size and modification time are recorded
+                            to detect a stale dataset, see `is_dataset_fresh`.
+    :param compression: Parquet codec, e.g. 'zstd', 'lz4' or None.
+    :param compression_level: Level of the codec, None for its default.
+    :param pre_filters: If True, uses byte shuffle and delta encodings, see `get_parquet_column_encoding`.
+    :return: Number of partitions written.
+    :raises ValueError: If the index of `df` is not a DatetimeIndex.
+    """
+    if not isinstance(df.index, pd.DatetimeIndex):
+        raise ValueError("A DatetimeIndex is required for a time partitioned dataset.")
+
+    directory = Path(directory)
+    tmp_directory = directory.with_name(f"{directory.name}.tmp")
+    if tmp_directory.exists():
+        shutil.rmtree(tmp_directory)
+
+    try:
+        days = df.index.normalize()
+        boundaries = np.flatnonzero(days[1:] != days[:-1]) + 1
+        starts = np.concatenate([[0], boundaries])
+        ends = np.append(boundaries, len(df))
+        for start, end in zip(starts, ends):
+            partition = tmp_directory / f"date={days[start]:%Y-%m-%d}"
+            partition.mkdir(parents=True, exist_ok=True)
+            write_parquet_file(df.iloc[start:end], partition / "part-0.parquet", row_group_size,
+                               compression, compression_level, pre_filters)
+
+        if source_filepath is not None:
+            with open(tmp_directory / DATASET_SOURCE_FILENAME, 'w') as f:
+                json.dump(_file_state(source_filepath), f)
+
+        if directory.exists():
+            shutil.rmtree(directory)
+        tmp_directory.replace(directory)
+    finally:
+        if tmp_directory.exists():
+            shutil.rmtree(tmp_directory)
+
+    logger.debug(f"Wrote {len(starts)} day partitions to '{directory}'.")
+    return len(starts)
+
+
+def append_time_partitioned_dataset(df: pd.DataFrame, directory: Union[str, Path], row_group_size: int,
+                                    source_filepath: Optional[Union[str, Path]] = None,
+                                    compression: Optional[str] = 'zstd', compression_level: Optional[int] = None,
+                                    pre_filters: bool = False) -> int:
+    """
+    Appends rows later than the stored ones to a dataset written by `write_time_partitioned_dataset`.
+
+    Only the day partitions of the new rows are written, a partition already stored (the last day of the
+    stored rows) is read and written again with the new rows. Every partition replaces the old one when it
+    is written completely.
+
+    :param df: DataFrame with a sorted DatetimeIndex, later than the rows of the dataset.
+    :param directory: Directory of the dataset.
+    :param row_group_size: Rows per row group.
+    :param source_filepath: Data file the dataset is derived from, its new state is recorded.
+    :param compression: Parquet codec, e.g. 'zstd', 'lz4' or None.
+    :param compression_level: Level of the codec, None for its default.
+    :param pre_filters: If True, uses byte shuffle and delta encodings, see `get_parquet_column_encoding`.
+    :return: Number of partitions written.
+    :raises ValueError: If the index of `df` is not a DatetimeIndex.
+    """
+    if not isinstance(df.index, pd.DatetimeIndex):
+        raise ValueError("A DatetimeIndex is required for a time partitioned dataset.")
+
+    directory = Path(directory)
+    days = df.index.normalize()
+    boundaries = np.flatnonzero(days[1:] != days[:-1]) + 1
+    starts = np.concatenate([[0], boundaries]) if len(df) else []
+    ends = np.append(boundaries, len(df))
+    for start, end in zip(starts, ends):
+        partition = directory / f"date={days[start]:%Y-%m-%d}"
+        partition.mkdir(parents=True, exist_ok=True)
+        filepath = partition / "part-0.parquet"
+        part = df.iloc[start:end]
+        if filepath.exists():
+            part = pd.concat([pq.read_table(str(filepath), partitioning=None).to_pandas(), part])
+        # Files starting with '.' are ignored by pyarrow.dataset
+        tmp_filepath = partition / ".part-0.parquet.tmp"
+        try:
+            write_parquet_file(part, tmp_filepath, row_group_size, compression, compression_level, pre_filters)
+            tmp_filepath.replace(filepath)
+        finally:
+            if tmp_filepath.exists():
+                tmp_filepath.unlink()
+
+    if source_filepath is not None:
+        with open(directory / DATASET_SOURCE_FILENAME, 'w') as f:
+            json.dump(_file_state(source_filepath), f)
+
+    logger.debug(f"Appended {len(df)} rows in {len(starts)} day partitions to '{directory}'.")
+    return len(starts)
+
+
+def is_dataset_fresh(directory: Union[str, Path], source_filepath: Union[str, Path]) -> bool:
+    """
+    Checks if a dataset was written from the current version of its source data file.
+    """
+    source_file = Path(directory) / DATASET_SOURCE_FILENAME
+    if not source_file.exists() or not Path(source_filepath).exists():
+        return False
+    with open(source_file) as f:
+        return json.load(f) == _file_state(source_filepath)
+
+
+def read_time_partitioned_dataset(directory: Union[str, Path], start_time=None, end_time=None,
+                                  columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Reads the rows between `start_time` and `end_time` (both included) from a time partitioned dataset.
+
+    Only the day partitions overlapping the range are opened, row groups outside the range are skipped by
+    their statistics.
+
+    :param directory: Directory of the dataset.
+    :param start_time: Start of the range, None for no limit.
+    :param end_time: End of the range, None for no limit.
+    :param columns: Columns to read, all columns if None. The stored index is always restored.
+    :return: DataFrame with the read data.
+    """
+    dataset = ds.dataset(str(directory), format='parquet',
+                         partitioning=ds.partitioning(pa.schema([('date', pa.string())]), flavor='hive'))
+    index_columns = [col for col in (dataset.schema.pandas_metadata or {}).get('index_columns', [])
+                     if isinstance(col, str)]
+    time_column = index_columns[0]
+    time_type = dataset.schema.field(time_column).type
+
+    conditions = []
+    if start_time is not None:
+        start_time = pd.Timestamp(start_time)
+        conditions += [ds.field('date') >= f"{start_time:%Y-%m-%d}",
+                       ds.field(time_column) >= pa.scalar(start_time.to_datetime64()).cast(time_type)]
+    if end_time is not None:
+        end_time = pd.Timestamp(end_time)
+        conditions += [ds.field('date') <= f"{end_time:%Y-%m-%d}",
+                       ds.field(time_column) <= pa.scalar(end_time.to_datetime64()).cast(time_type)]
+    expression = functools.reduce(operator.and_, conditions) if conditions else None
+
+    data_columns = [name for name in dataset.schema.names if name != 'date' and name not in index_columns]
+    if columns is not None:
+        data_columns = [col for col in data_columns if col in columns]
+    table = dataset.to_table(columns=data_columns + index_columns, filter=expression)
+    df = table.to_pandas()
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index()
+    return df
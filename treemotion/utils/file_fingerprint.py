@@ -0,0 +1,70 @@
+import hashlib
+from pathlib import Path
+from typing import Union
+
+BLOCK_SIZE = 1 << 20  # 1 MiB
+
+
+def prefix_checksum(filepath: Union[str, Path], size: int, block_size: int = BLOCK_SIZE) -> str:
+    """
+    Calculates a checksum of the first `size` bytes of a file.
+
+    :param filepath: Path of the file.
+    :param size: Number of bytes from the start of the file to include.
+    :param block_size: Number of bytes read at once.
+    :return: Hex digest of the prefix.
+    :raises ValueError: If the file is shorter than `size`.
+    """
+    checksum = hashlib.blake2b(digest_size=16)
+    remaining = size
+    with open(filepath, 'rb') as f:
+        while remaining > 0:
+            block = f.read(min(block_size, remaining))
+            if not block:
+                raise ValueError(f"File '{filepath}' is shorter than {size} bytes.")
+            checksum.update(block)
+            remaining -= len(block)
+    return checksum.hexdigest()
+
+
+def last_line_end_offset(filepath: Union[str, Path], block_size: int = 1 << 16) -> int:
+    """
+    Finds the byte offset directly after the last newline of a file, i.e. the end of the last complete line.
+
+    :param filepath: Path of the file.
+    :param block_size: Number of bytes read at once, backwards from the end of the file.
+    :return: Byte offset, 0 if the file has no complete line.
+    """
+    with open(filepath, 'rb') as f:
+        end = f.seek(0, 2)
+        while end > 0:
+            start = max(0, end - block_size)
+            f.seek(start)
+            position = f.read(end - start).rfind(b'\n')
+            if position >= 0:
+                return start + position + 1
+            end = start
+    return 0
+
+
+def quick_hash(filepath: Union[str, Path], sample_size: int = BLOCK_SIZE) -> str:
+    """
+    Calculates a fast hash of a file from its size and its first and last `sample_size` bytes.
+
+    Does not read the whole file, so it detects appended, truncated and replaced files, but not every
+    change in the middle of a large file. Use it together with size and modification time.
+
+    :param filepath: Path of the file.
+    :param sample_size: Number of bytes read from the start and from the end of the file.
+    :return: Hex digest.
+    """
+    checksum = hashlib.blake2b(digest_size=16)
+    with open(filepath, 'rb') as f:
+        size = f.seek(0, 2)
+        checksum.update(size.to_bytes(8, 'little'))
+        f.seek(0)
+        checksum.update(f.read(sample_size))
+        if size > sample_size:
+            f.seek(max(sample_size, size - sample_size))
+            checksum.update(f.read(sample_size))
+    return checksum.hexdigest()
@@ -0,0 +1,142 @@
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from kj_logger import get_logger
+
+from .data_file_io import read_feather_file
+
+logger = get_logger(__name__)
+
+
+class SharedFrame:
+    """
+    Read-only view on a frame of the SharedFrameCache, to be released after use (or used as context manager).
+    """
+
+    def __init__(self, data: pd.DataFrame, cache: Optional['SharedFrameCache'] = None, key: Optional[Tuple] = None):
+        self.data = data
+        self._cache = cache
+        self._key = key
+
+    def release(self):
+        if self._cache is not None:
+            self._cache._release(self._key)
+            self._cache = None
+        self.data = None
+
+    def __enter__(self) -> pd.DataFrame:
+        return self.data
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+class SharedFrameCache:
+    """
+    Process-wide cache of read-only frames of feather data files with reference counting.
+
+    Every data file is held once (memory mapped if configured), all consumers get views on it for their time
+    range (no copies), its arrays are not writeable. Entries are keyed by file path and modification time, a
+    rewritten data file is read again. A released entry without references is kept for reuse, above `max_idle`
+    of those the least recently used is dropped.
+    """
+
+    def __init__(self, max_idle: int = 8, memory_map: bool = False):
+        self.max_idle = max_idle
+        self.memory_map = memory_map
+        self._frames: Dict[Tuple[str, int], pd.DataFrame] = {}
+        self._refcounts: Dict[Tuple[str, int], int] = {}
+        self._idle: 'OrderedDict[Tuple[str, int], None]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(int(df.memory_usage(index=True).sum()) for df in self._frames.values())
+
+    def refcount(self, filepath: Union[str, Path]) -> int:
+        """
+        Returns the number of unreleased views on the data file.
+        """
+        return sum(count for (path, _), count in self._refcounts.items() if path == str(filepath))
+
+    def acquire(self, filepath: Union[str, Path], start_time=None, end_time=None) -> SharedFrame:
+        """
+        Returns a read-only view on the rows of a data file between `start_time` and `end_time` (both included),
+        reading the file only if it is not cached.
+
+        :param filepath: Path of the feather data file with sorted DatetimeIndex.
+        :param start_time: Start of the range, None for the first row.
+        :param end_time: End of the range, None for the last row.
+        :return: SharedFrame, call `release` (or use it as context manager) when done.
+        """
+        filepath = str(filepath)
+        key = (filepath, Path(filepath).stat().st_mtime_ns)
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is None:
+                frame = self._frames[key] = _read_only_frame(read_feather_file(filepath, memory_map=self.memory_map))
+                self._drop_outdated(key)
+                logger.debug(f"Cached '{filepath}', {len(frame)} rows.")
+            self._refcounts[key] = self._refcounts.get(key, 0) + 1
+            self._idle.pop(key, None)
+
+        start = 0 if start_time is None else frame.index.searchsorted(pd.Timestamp(start_time), side='left')
+        end = len(frame) if end_time is None else frame.index.searchsorted(pd.Timestamp(end_time), side='right')
+        return SharedFrame(frame.iloc[start:end], self, key)
+
+    def _release(self, key: Tuple[str, int]):
+        with self._lock:
+            self._refcounts[key] -= 1
+            if self._refcounts[key] == 0:
+                del self._refcounts[key]
+                self._idle[key] = None
+                while len(self._idle) > self.max_idle:
+                    dropped, _ = self._idle.popitem(last=False)
+                    del self._frames[dropped]
+
+    def _drop_outdated(self, key: Tuple[str, int]):
+        # Older versions of the data file without references
+        for outdated in [k for k in self._idle if k[0] == key[0] and k != key]:
+            del self._idle[outdated]
+            del self._frames[outdated]
+
+    def clear(self):
+        """
+        Drops all entries without references.
+        """
+        with self._lock:
+            for key in list(self._idle):
+                del self._frames[key]
+            self._idle.clear()
+
+
+def _read_only_frame(df: pd.DataFrame) -> pd.DataFrame:
+    # The frame was just read and is owned by the cache, its arrays are locked instead of copied
+    columns = {}
+    for col in list(df.columns):
+        values = df[col].to_numpy()
+        values.flags.writeable = False
+        columns[col] = values
+        del df[col]
+    # Without copying, every column keeps its read-only array
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+def read_only_view(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns a view on the columns of a DataFrame that cannot be written, `df` itself stays writeable.
+
+    Only the flags of the new views on the column arrays are cleared, the data is not copied.
+    """
+    columns = {}
+    for col in df.columns:
+        # A new array object, so the flag of the array of `df` is not changed
+        values = df[col].to_numpy().view()
+        values.flags.writeable = False
+        columns[col] = values
+    return pd.DataFrame(columns, index=df.index, copy=False)
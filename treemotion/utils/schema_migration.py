@@ -0,0 +1,74 @@
+import threading
+from typing import Iterable, List
+
+from sqlalchemy import Table, event, inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateColumn
+
+from kj_logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def add_missing_columns(connection: Connection, tables: Iterable[Table]) -> List[str]:
+    """
+    Adds the columns of the mapped tables that are missing in an existing database (ALTER TABLE ADD COLUMN).
+
+    Databases created with an older version of the package get the new columns as nullable columns without
+    values, which the classes treat like "not recorded yet". Tables missing in the database are left to
+    the creation of the schema.
+
+    :param connection: Connection to the database, the caller commits.
+    :param tables: Tables of the mapped classes.
+    :return: Added columns as 'table.column'.
+    """
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    for table in tables:
+        if table.name not in existing_tables:
+            continue
+        existing_columns = {col['name'] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            column_ddl = CreateColumn(column).compile(dialect=connection.dialect)
+            connection.execute(text(f"ALTER TABLE {connection.dialect.identifier_preparer.format_table(table)} "
+                                    f"ADD COLUMN {column_ddl}"))
+            added.append(f"{table.name}.{column.name}")
+    if added:
+        logger.info(f"Migrated database schema, added columns {added}.")
+    return added
+
+
+class SchemaMigration:
+    """
+    Runs `add_missing_columns` once for every engine, on its first connection.
+
+    The database is connected by the DatabaseManager, so the migration listens to the connections of all
+    engines instead of being called explicitly.
+    """
+
+    def __init__(self, tables: Iterable[Table]):
+        self.tables = list(tables)
+        self._migrated_engines = set()
+        self._lock = threading.Lock()
+
+    def register(self):
+        if not event.contains(Engine, 'engine_connect', self._on_engine_connect):
+            event.listen(Engine, 'engine_connect', self._on_engine_connect)
+
+    def remove(self):
+        if event.contains(Engine, 'engine_connect', self._on_engine_connect):
+            event.remove(Engine, 'engine_connect', self._on_engine_connect)
+
+    def _on_engine_connect(self, connection: Connection):
+        engine = connection.engine
+        with self._lock:
+            if engine.url in self._migrated_engines:
+                return
+            self._migrated_engines.add(engine.url)
+        # A separate connection, the transaction of the triggering connection belongs to its caller
+        with engine.connect() as migration_connection:
+            add_missing_columns(migration_connection, self.tables)
+            migration_connection.commit()
@@ -2,28 +2,48 @@ import numpy as np
 import pandas as pd
 
 
-def wind_station_to_site(df, distance, direction, front_speed_factor):
-    # Addiere auf die Windrichtung die Ausrichtung der Achse von Punkt A nach B. Werte beliebig zwischen 0 und 359
-
-    df['wind_direction_10min_avg'] = (df['wind_direction_10min_avg'] + direction) % 360
-    # Konvertiere den Winkel von Grad in Radiant
-    angle_radians = np.radians(df['wind_direction_10min_avg'])
-
-    # Anwenden des Kosinussatzes
-    df['distance'] = np.sqrt(2 * distance ** 2 * (1 - np.cos(angle_radians)))
-
-    df['front_speed'] = df['wind_speed_10min_avg'] * front_speed_factor
+def calc_wind_front_delay(wind_direction, wind_speed, distance: float, direction: float, front_speed_factor: float,
+                          max_delay_sec: float = None, min_wind_speed: float = None) -> np.ndarray:
+    """
+    Berechnet je Datensatz die Laufzeit der Windfront von der Station zum Standort in Sekunden, vektorisiert.
+
+    :param wind_direction: Windrichtung je Datensatz in Grad.
+    :param wind_speed: Windgeschwindigkeit je Datensatz in m/s.
+    :param distance: Abstand Station - Standort in m.
+    :param direction: Ausrichtung der Achse von der Station zum Standort in Grad.
+    :param front_speed_factor: Verhältnis der Geschwindigkeit der Windfront zur Windgeschwindigkeit.
+    :param max_delay_sec: Betrag der Laufzeit wird darauf begrenzt, None ohne Grenze.
+    :param min_wind_speed: Unter dieser Windgeschwindigkeit in m/s (nahezu Windstille) gibt es keine Windfront,
+                           die Laufzeit ist 0. None ohne Schwelle.
+    :return: Laufzeit in Sekunden, positiv wenn die Front den Standort nach der Station erreicht. 0 ohne Wind-Daten.
+    """
+    # Addiere auf die Windrichtung die Ausrichtung der Achse von Punkt A nach B
+    relative_direction = (np.asarray(wind_direction, dtype='float64') + direction) % 360
+
+    # Kosinussatz: Weg der Front im gleichschenkligen Dreieck
+    path = np.sqrt(2 * distance ** 2 * (1 - np.cos(np.radians(relative_direction))))
+    wind_speed = np.asarray(wind_speed, dtype='float64')
+    front_speed = wind_speed * front_speed_factor
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        delay = path / front_speed
+    # Negative Zeitverschiebung, wenn der Wind vom Standort zur Station weht
+    delay = np.where((relative_direction >= 270) | (relative_direction <= 90), delay, -delay)
+
+    if min_wind_speed is not None:
+        # Sonst ergibt Windstille riesige Laufzeiten, die nur an max_delay_sec abgeschnitten würden
+        delay = np.where(wind_speed < min_wind_speed, 0.0, delay)
+    if max_delay_sec is not None:
+        delay = np.clip(delay, -max_delay_sec, max_delay_sec)
+    return np.where(np.isnan(delay), 0.0, delay)
 
-    df['time_shift_s'] = df['distance'] / df['front_speed']
 
-    # Unterscheidung zwischen positiver und negativer Zeitverschiebung je nach Windrichtung
-    df.loc[(df['wind_direction_10min_avg'] >= 270) | (df['wind_direction_10min_avg'] <= 90), 'time_shift_s'] *= 1
-    df.loc[(df['wind_direction_10min_avg'] > 90) & (df['wind_direction_10min_avg'] < 270), 'time_shift_s'] *= -1
-
-    # Konvertiere die Zeitverschiebung zu einem Timedelta
-    df['time_shift'] = pd.to_timedelta(df['time_shift_s'], unit='s')
-
-    # Addiere die Verschiebung auf die Zeit
-    df['datetime'] = df['datetime'] + df['time_shift']
-
-    return df
+def wind_station_to_site(df, distance, direction, front_speed_factor):
+    """
+    Verschiebt die Zeit jedes Datensatzes um die Laufzeit der Windfront zum Standort, siehe calc_wind_front_delay.
+    Gibt eine Kopie mit 'time_shift_s', 'time_shift' und verschobener 'datetime' zurück, df bleibt unverändert.
+    """
+    time_shift_s = calc_wind_front_delay(df['wind_direction_10min_avg'], df['wind_speed_10min_avg'], distance,
+                                         direction, front_speed_factor)
+    time_shift = pd.to_timedelta(time_shift_s, unit='s')
+    return df.assign(time_shift_s=time_shift_s, time_shift=time_shift, datetime=df['datetime'] + time_shift)
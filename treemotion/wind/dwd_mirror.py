@@ -0,0 +1,181 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from kj_logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def create_dwd_session(pool_size: int = 10, retries: int = 3, backoff_factor: float = 0.5) -> requests.Session:
+    """
+    Creates a session with a connection pool for concurrent downloads and retries with exponential backoff
+    for connection errors and temporary server errors (429, 500, 502, 503, 504).
+
+    :param pool_size: Connections kept per host, should be at least the number of concurrent downloads.
+    :param retries: Number of retries per request.
+    :param backoff_factor: Backoff between retries is `backoff_factor * 2 ** (retry - 1)` seconds.
+    :return: Session to share between threads.
+    """
+    retry = Retry(total=retries, backoff_factor=backoff_factor, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=("GET", "HEAD"))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class DwdMirror:
+    """
+    On-disk mirror of files from the DWD open data server.
+
+    Every file is stored under `directory` with a metadata file holding its URL, ETag, Last-Modified and the
+    time of the last check. A file is requested again only with a conditional GET (If-None-Match,
+    If-Modified-Since), an unchanged file (304) is served from disk. Directory listings are cached as well
+    and only checked again after `listing_max_age` seconds. If the server is not reachable, mirrored files
+    are served with a warning. The mirror can be used from several threads, a file is fetched by one at a time.
+    """
+    META_DIRECTORY = ".meta"
+
+    def __init__(self, directory: Union[str, Path], session: Optional[requests.Session] = None,
+                 listing_max_age: float = 3600, timeout: float = 60):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / self.META_DIRECTORY).mkdir(exist_ok=True)
+        self.session = session or requests.Session()
+        self.listing_max_age = listing_max_age
+        self.timeout = timeout
+        self._listings: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+        self._url_locks: Dict[str, threading.Lock] = {}
+
+    def get_local_path(self, url: str) -> Path:
+        """
+        Returns the path of the mirrored file of a URL, directory listings are stored as '<hash>.listing.html'.
+        """
+        name = url.rstrip('/').split('/')[-1]
+        if url.endswith('/'):
+            name = f"{hashlib.sha1(url.encode()).hexdigest()[:16]}.listing.html"
+        return self.directory / name
+
+    def _get_meta_path(self, url: str) -> Path:
+        return self.directory / self.META_DIRECTORY / f"{hashlib.sha1(url.encode()).hexdigest()}.json"
+
+    def _read_meta(self, url: str) -> Optional[dict]:
+        meta_path = self._get_meta_path(url)
+        if not meta_path.exists() or not self.get_local_path(url).exists():
+            return None
+        with open(meta_path) as f:
+            return json.load(f)
+
+    def _write_meta(self, url: str, meta: dict):
+        meta_path = self._get_meta_path(url)
+        tmp_path = meta_path.with_name(f"{meta_path.name}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        tmp_path.replace(meta_path)
+
+    def _get_url_lock(self, url: str) -> threading.Lock:
+        with self._lock:
+            return self._url_locks.setdefault(url, threading.Lock())
+
+    def fetch(self, url: str, max_age: Optional[float] = None) -> Path:
+        """
+        Returns the local path of the mirrored file of `url`, downloading it only if it changed on the server.
+
+        :param url: URL of the file.
+        :param max_age: Seconds since the last check in which the mirrored file is served without request,
+                        None always checks with a conditional GET.
+        :return: Path of the mirrored file.
+        :raises requests.RequestException: If the file is not mirrored and the download fails.
+        """
+        with self._get_url_lock(url):
+            return self._fetch(url, max_age)
+
+    def _fetch(self, url: str, max_age: Optional[float]) -> Path:
+        local_path = self.get_local_path(url)
+        meta = self._read_meta(url)
+        if meta is not None and max_age is not None and time.time() - meta['checked'] < max_age:
+            logger.debug(f"Serving '{local_path.name}' from mirror without request.")
+            return local_path
+
+        headers = {}
+        if meta is not None:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        try:
+            with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+                if response.status_code == 304 and meta is not None:
+                    logger.debug(f"'{local_path.name}' not modified, serving from mirror.")
+                    meta['checked'] = time.time()
+                    self._write_meta(url, meta)
+                    return local_path
+                response.raise_for_status()
+
+                tmp_path = local_path.with_name(f"{local_path.name}.tmp")
+                with open(tmp_path, 'wb') as f:
+                    for block in response.iter_content(chunk_size=1 << 16):
+                        f.write(block)
+                tmp_path.replace(local_path)
+                self._write_meta(url, {'url': url, 'etag': response.headers.get('ETag'),
+                                       'last_modified': response.headers.get('Last-Modified'),
+                                       'checked': time.time()})
+                logger.debug(f"Downloaded '{url}' to mirror.")
+                return local_path
+        except requests.RequestException as e:
+            if meta is None:
+                raise
+            logger.warning(f"Request for '{url}' failed, serving mirrored file: {e}")
+            return local_path
+
+    def get_listing(self, url: str) -> List[str]:
+        """
+        Returns the links of a directory listing, cached in memory and on disk for `listing_max_age` seconds.
+        """
+        with self._get_url_lock(f"listing:{url}"):
+            meta = self._read_meta(url)
+            fresh = meta is not None and time.time() - meta['checked'] < self.listing_max_age
+            if url in self._listings and fresh:
+                return self._listings[url]
+
+            local_path = self.fetch(url, max_age=self.listing_max_age)
+            with open(local_path, 'r', encoding='utf-8', errors='replace') as f:
+                soup = BeautifulSoup(f.read(), 'html.parser')
+            self._listings[url] = [a['href'] for a in soup.find_all('a', href=True)]
+            return self._listings[url]
+
+    def find_station_file(self, url: str, stations_id: str) -> Optional[str]:
+        """
+        Returns the name of the recent ('_akt') zip file of a station in a directory listing, None if not found.
+        """
+        return next(iter(self.find_files(url, f"{stations_id}_akt.zip")), None)
+
+    def find_files(self, url: str, pattern: str) -> List[str]:
+        """
+        Returns the names of the files in a directory listing matching the regular expression `pattern`.
+        """
+        pattern = re.compile(pattern)
+        return [href for href in self.get_listing(url) if pattern.search(href)]
+
+    def fetch_station_zip(self, url: str, stations_id: str) -> Optional[Path]:
+        """
+        Returns the mirrored recent zip file of a station from the directory listing at `url`, None if not found.
+        """
+        href = self.find_station_file(url, stations_id)
+        if href is None:
+            logger.warning(f"No file found for station {stations_id} at {url}")
+            return None
+        return self.fetch(url + href)
@@ -0,0 +1,148 @@
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from kj_logger import get_logger
+
+from ..utils.data_file_io import read_feather_file
+
+logger = get_logger(__name__)
+
+EARTH_RADIUS_KM = 6371.0
+CATALOG_COLUMNS = ['station_id', 'datetime_start', 'datetime_end', 'station_height', 'station_latitude',
+                   'station_longitude', 'station_name', 'bundesland']
+
+
+def parse_station_list(filepath_stations_list: Union[str, Path]) -> pd.DataFrame:
+    """
+    Parses the whole DWD stations list file, with the same columns as `extract_station_metadata`.
+
+    :param filepath_stations_list: Path of the stations list file.
+    :return: DataFrame with one row per station, 'station_id' as string like in the file.
+    """
+    rows = []
+    with open(filepath_stations_list, 'r', encoding='latin1') as f:
+        next(f)  # Skip the header line
+        next(f)  # Skip the line with the separators
+        for line in f:
+            line_data = line.split()
+            if len(line_data) < 8:
+                continue
+            rows.append((line_data[0], line_data[1], line_data[2], int(line_data[3]), float(line_data[4]),
+                         float(line_data[5]), " ".join(line_data[6:-1]), line_data[-1]))
+
+    df = pd.DataFrame(rows, columns=CATALOG_COLUMNS)
+    df['datetime_start'] = pd.to_datetime(df['datetime_start'], format='%Y%m%d')
+    df['datetime_end'] = pd.to_datetime(df['datetime_end'], format='%Y%m%d')
+    return df
+
+
+def _unit_vectors(latitude, longitude) -> np.ndarray:
+    lat = np.radians(np.asarray(latitude, dtype='float64'))
+    lon = np.radians(np.asarray(longitude, dtype='float64'))
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+class StationCatalog:
+    """
+    Parsed DWD stations list with lookup by station id and a spatial index.
+
+    Stations are indexed as unit vectors on the sphere in a KD-tree, the chord distance of the tree is
+    monotonic in the great-circle distance, so nearest neighbours are exact.
+    """
+
+    def __init__(self, stations: pd.DataFrame):
+        self.stations = stations.reset_index(drop=True)
+        self._positions: Dict[str, int] = {station_id: i for i, station_id in enumerate(self.stations['station_id'])}
+        self._tree = cKDTree(_unit_vectors(self.stations['station_latitude'], self.stations['station_longitude']))
+
+    def __len__(self) -> int:
+        return len(self.stations)
+
+    def __contains__(self, station_id: str) -> bool:
+        return station_id in self._positions
+
+    @classmethod
+    def load(cls, filepath_stations_list: Union[str, Path],
+             cache_filepath: Union[str, Path, None] = None) -> 'StationCatalog':
+        """
+        Loads the catalog from the columnar cache file, parsing the stations list only if it is newer.
+
+        :param filepath_stations_list: Path of the DWD stations list file.
+        :param cache_filepath: Path of the feather cache, defaults to the stations list with suffix '.feather'.
+        :return: StationCatalog
+        """
+        filepath_stations_list = Path(filepath_stations_list)
+        cache_filepath = Path(cache_filepath) if cache_filepath else filepath_stations_list.with_suffix('.feather')
+        if cache_filepath.exists() and cache_filepath.stat().st_mtime_ns >= filepath_stations_list.stat().st_mtime_ns:
+            return cls(read_feather_file(cache_filepath))
+
+        stations = parse_station_list(filepath_stations_list)
+        tmp_filepath = cache_filepath.with_name(f"{cache_filepath.name}.tmp")
+        stations.to_feather(tmp_filepath)
+        tmp_filepath.replace(cache_filepath)
+        logger.debug(f"Parsed {len(stations)} stations from '{filepath_stations_list}' to '{cache_filepath}'.")
+        return cls(stations)
+
+    def get_metadata(self, station_id: str) -> dict:
+        """
+        Returns the metadata of a station like `extract_station_metadata`.
+
+        :raises ValueError: If the station is not in the catalog.
+        """
+        position = self._positions.get(station_id)
+        if position is None:
+            raise ValueError(f"No data found for station id {station_id}")
+        row = self.stations.iloc[position]
+        return {
+            "station_id": int(row['station_id']),
+            "datetime_start": row['datetime_start'].strftime('%Y%m%d'),
+            "datetime_end": row['datetime_end'].strftime('%Y%m%d'),
+            "station_height": int(row['station_height']),
+            "station_latitude": float(row['station_latitude']),
+            "station_longitude": float(row['station_longitude']),
+            "station_name": row['station_name'],
+            "bundesland": row['bundesland']
+        }
+
+    def nearest(self, latitude: float, longitude: float, k: int = 5, start_time=None, end_time=None,
+                active_days: Optional[float] = 7) -> pd.DataFrame:
+        """
+        Finds the k nearest stations to a site.
+
+        :param latitude: Latitude of the site in degrees.
+        :param longitude: Longitude of the site in degrees.
+        :param k: Number of stations.
+        :param start_time: If given, only stations with data since this time.
+        :param end_time: If given, only stations with data until this time.
+        :param active_days: If given, only stations whose data ends at most this many days before the latest
+                            station in the catalog, i.e. still reporting.
+        :return: Stations ordered by distance with the column 'distance_km', fewer than k if not enough match.
+        """
+        valid = np.ones(len(self.stations), dtype=bool)
+        if start_time is not None:
+            valid &= (self.stations['datetime_start'] <= pd.Timestamp(start_time)).to_numpy()
+        if end_time is not None:
+            # The list has dates only, data of the end day is included
+            valid &= (self.stations['datetime_end'] + pd.Timedelta(days=1) > pd.Timestamp(end_time)).to_numpy()
+        if active_days is not None:
+            latest = self.stations['datetime_end'].max()
+            valid &= (self.stations['datetime_end'] >= latest - pd.Timedelta(days=active_days)).to_numpy()
+
+        site = _unit_vectors(latitude, longitude)
+        n_query = min(len(self.stations), max(4 * k, 16))
+        while True:
+            chord, positions = self._tree.query(site, k=n_query)
+            chord, positions = np.atleast_1d(chord), np.atleast_1d(positions)
+            keep = valid[positions]
+            if keep.sum() >= k or n_query == len(self.stations):
+                break
+            n_query = min(len(self.stations), 4 * n_query)
+
+        chord, positions = chord[keep][:k], positions[keep][:k]
+        result = self.stations.iloc[positions].copy()
+        result['distance_km'] = 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chord / 2, 1.0))
+        return result.reset_index(drop=True)
@@ -1,28 +1,42 @@
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Union
+from typing import BinaryIO, Iterator, List, Optional, Tuple, Union
 
+import pandas as pd
 import requests
 from bs4 import BeautifulSoup
+import shutil
 import zipfile
 import re
 
 from kj_logger import get_logger
 from kj_core.utils.path_utils import get_directory
 
+from .dwd_mirror import DwdMirror
+from .zip_stream import open_zip_member
+
 logger = get_logger(__name__)
 
 LINK_WIND = "https://opendata.dwd.de/climate_environment/CDC/observations_germany/climate/10_minutes/wind/recent/"
 LINK_WIND_EXTREME = "https://opendata.dwd.de/climate_environment/CDC/observations_germany/climate/10_minutes/extreme_wind/recent/"
+LINK_WIND_HISTORICAL = "https://opendata.dwd.de/climate_environment/CDC/observations_germany/climate/10_minutes/wind/historical/"
+LINK_WIND_EXTREME_HISTORICAL = "https://opendata.dwd.de/climate_environment/CDC/observations_germany/climate/10_minutes/extreme_wind/historical/"
 LINK_STATIONS_LIST = "https://opendata.dwd.de/climate_environment/CDC/observations_germany/climate/10_minutes/wind/recent/zehn_min_ff_Beschreibung_Stationen.txt"
+# Data member of the DWD zip files, the other members are metadata
+PRODUCT_MEMBER_PATTERN = r"^produkt_.*\.txt$"
+# Historical zip files end with the covered period
+HISTORICAL_PERIOD_PATTERN = r"_(\d{8})_(\d{8})_hist\.zip$"
 
 
-def download_wind_file(stations_id: str, directory: Union[str, Path]) -> Optional[str]:
+def download_wind_file(stations_id: str, directory: Union[str, Path],
+                       mirror: Optional[DwdMirror] = None) -> Optional[str]:
     """
     Download and extract the wind data file from DWD for a specific station.
+    With a mirror, the listing and the zip file are only downloaded if they changed.
     """
     try:
         directory = get_directory(directory)
-        filename = download_and_extract_zip(LINK_WIND, stations_id, directory)
+        filename = download_and_extract_zip(LINK_WIND, stations_id, directory, mirror)
         if filename:
             logger.info(f"Wind file for station {stations_id} downloaded and extracted to {directory}")
         else:
@@ -33,13 +47,15 @@ def download_wind_file(stations_id: str, directory: Union[str, Path]) -> Optiona
         return None
 
 
-def download_wind_extreme_file(stations_id: str, directory: Union[str, Path]) -> Optional[str]:
+def download_wind_extreme_file(stations_id: str, directory: Union[str, Path],
+                               mirror: Optional[DwdMirror] = None) -> Optional[str]:
     """
     Download and extract the wind extreme data file from DWD for a specific station.
+    With a mirror, the listing and the zip file are only downloaded if they changed.
     """
     try:
         directory = get_directory(directory)
-        filename = download_and_extract_zip(LINK_WIND_EXTREME, stations_id, directory)
+        filename = download_and_extract_zip(LINK_WIND_EXTREME, stations_id, directory, mirror)
         if filename:
             logger.info(f"Wind extreme file for station {stations_id} downloaded and extracted to {directory}")
         else:
@@ -50,13 +66,19 @@ def download_wind_extreme_file(stations_id: str, directory: Union[str, Path]) ->
         return None
 
 
-def download_station_list_file(directory: Union[str, Path]) -> Optional[str]:
+def download_station_list_file(directory: Union[str, Path], mirror: Optional[DwdMirror] = None) -> Optional[str]:
     """
     Download the stations list file from DWD.
+    With a mirror, it is checked like a listing and only downloaded if it changed.
     """
     try:
         directory = get_directory(directory)
-        filename = download_text_file(LINK_STATIONS_LIST, directory)
+        if mirror:
+            mirrored_path = mirror.fetch(LINK_STATIONS_LIST, max_age=mirror.listing_max_age)
+            filename = mirrored_path.name
+            shutil.copyfile(mirrored_path, directory / filename)
+        else:
+            filename = download_text_file(LINK_STATIONS_LIST, directory)
         if filename:
             logger.info(f"Stations list file downloaded to {directory}")
         else:
@@ -67,11 +89,17 @@ def download_station_list_file(directory: Union[str, Path]) -> Optional[str]:
         return None
 
 
-def download_and_extract_zip(link: str, stations_id: str, directory: Path) -> Optional[str]:
+def download_and_extract_zip(link: str, stations_id: str, directory: Path,
+                             mirror: Optional[DwdMirror] = None) -> Optional[str]:
     """
     Download a ZIP file from a given URL, extract it, and return the name of the extracted file.
+    With a mirror, the cached listing and mirrored zip file are used and the zip file is kept in the mirror.
     """
     try:
+        if mirror:
+            zip_path = mirror.fetch_station_zip(link, stations_id)
+            return extract_zip_file(zip_path, directory) if zip_path else None
+
         response = requests.get(link)
         soup = BeautifulSoup(response.text, 'html.parser')
         file = soup.find('a', href=re.compile(f"{stations_id}_akt.zip"))
@@ -87,6 +115,108 @@ def download_and_extract_zip(link: str, stations_id: str, directory: Path) -> Op
         return None
 
 
+def get_historical_period(filename: str) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """
+    Returns the period covered by a historical zip file from its name ('..._YYYYMMDD_YYYYMMDD_hist.zip').
+
+    :return: Start of the first day and end of the last day.
+    :raises ValueError: If the name does not end with a period.
+    """
+    match = re.search(HISTORICAL_PERIOD_PATTERN, filename)
+    if match is None:
+        raise ValueError(f"No period in the name of '{filename}'.")
+    start, end = (pd.Timestamp(date) for date in match.groups())
+    return start, end + pd.Timedelta(days=1) - pd.Timedelta(1)
+
+
+def find_historical_zip_urls(link: str, stations_id: str, mirror: Optional[DwdMirror] = None,
+                             session: Optional[requests.Session] = None, start_time=None,
+                             end_time=None) -> List[str]:
+    """
+    Returns the URLs of the historical zip files ('_hist') of a station in chronological order.
+
+    :param link: URL of the historical directory listing.
+    :param stations_id: DWD station id.
+    :param mirror: Optional DwdMirror for the listing.
+    :param session: Session for the request without mirror.
+    :param start_time: Only files with data from start_time on, None for no limit.
+    :param end_time: Only files with data until end_time, None for no limit.
+    :return: URLs, empty if the station has no historical data in the range.
+    """
+    pattern = rf"_{stations_id}_\d{{8}}_\d{{8}}_hist\.zip$"
+    if mirror:
+        hrefs = mirror.find_files(link, pattern)
+    else:
+        soup = BeautifulSoup((session or requests.Session()).get(link).text, 'html.parser')
+        hrefs = [a['href'] for a in soup.find_all('a', href=re.compile(pattern))]
+
+    if start_time is not None or end_time is not None:
+        periods = {href: get_historical_period(href) for href in hrefs}
+        hrefs = [href for href, (first, last) in periods.items()
+                 if (start_time is None or last >= pd.Timestamp(start_time))
+                 and (end_time is None or first <= pd.Timestamp(end_time))]
+    # The names end with the covered period, sorting them sorts by time
+    return [link + href for href in sorted(hrefs)]
+
+
+@contextmanager
+def open_zip_url_member(url: str, mirror: Optional[DwdMirror] = None, session: Optional[requests.Session] = None,
+                        keep_directory: Union[str, Path, None] = None) -> Iterator[BinaryIO]:
+    """
+    Opens the data member of a DWD zip file as a stream for the wind parser.
+
+    Without a mirror the HTTP response is decompressed while it is read, no zip or extracted file is written and
+    the archive is never held in memory as a whole. With a mirror the mirrored zip file is read the same way.
+
+    :param url: URL of the zip file.
+    :param mirror: Optional DwdMirror for the zip file.
+    :param session: Session for the request without mirror.
+    :param keep_directory: If given, the extracted data file is also written there for provenance.
+    :return: Context manager yielding the binary stream of the data file.
+    """
+    if mirror:
+        with open(mirror.fetch(url), 'rb') as raw, \
+                open_zip_member(raw, PRODUCT_MEMBER_PATTERN, keep_directory) as member:
+            yield member
+        return
+
+    with (session or requests.Session()).get(url, stream=True) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        with open_zip_member(response.raw, PRODUCT_MEMBER_PATTERN, keep_directory) as member:
+            yield member
+
+
+@contextmanager
+def open_station_zip_member(link: str, stations_id: str, mirror: Optional[DwdMirror] = None,
+                            session: Optional[requests.Session] = None,
+                            keep_directory: Union[str, Path, None] = None) -> Iterator[BinaryIO]:
+    """
+    Opens the data member of the recent zip file of a station as a stream for the wind parser,
+    see open_zip_url_member.
+
+    :param link: URL of the directory listing.
+    :param stations_id: DWD station id.
+    :param mirror: Optional DwdMirror for the listing and the zip file.
+    :param session: Session for the requests without mirror.
+    :param keep_directory: If given, the extracted data file is also written there for provenance.
+    :return: Context manager yielding the binary stream of the data file.
+    :raises FileNotFoundError: If no zip file of the station is found.
+    """
+    if mirror:
+        href = mirror.find_station_file(link, stations_id)
+    else:
+        session = session or requests.Session()
+        soup = BeautifulSoup(session.get(link).text, 'html.parser')
+        file = soup.find('a', href=re.compile(f"{stations_id}_akt.zip"))
+        href = file['href'] if file else None
+    if not href:
+        raise FileNotFoundError(f"No file found for station {stations_id} at {link}")
+
+    with open_zip_url_member(link + href, mirror, session, keep_directory) as member:
+        yield member
+
+
 def download_zip_file(url: str, folder_path: Path, stations_id: str) -> str:
     """
     Download a zip file from a given URL, extract it, and delete the zip file.
@@ -104,6 +234,15 @@ def download_zip_file(url: str, folder_path: Path, stations_id: str) -> str:
     return filename
 
 
+def extract_zip_file(zip_path: Path, folder_path: Path) -> str:
+    """
+    Extract a zip file and return the name of the extracted file, the zip file is kept.
+    """
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        zip_ref.extractall(folder_path)
+        return zip_ref.namelist()[0]
+
+
 def download_text_file(url: str, folder_path: Path) -> str:
     """
     Download a text file from a given URL and save it.
@@ -2,7 +2,7 @@ from pathlib import Path
 import numpy as np
 import pandas as pd
 
-from typing import Union
+from typing import BinaryIO, List, Union
 
 from kj_logger import get_logger
 
@@ -21,44 +21,138 @@ RENAME_DICT = {
     'DX_10': 'wind_direction_max_wind_speed'
 }
 
-def extract_wind_df(filepath_wind: Path, filepath_wind_extreme: Path):
+# Columns of the DWD wind ('ff') and extreme wind ('fx') files by kind, 'eor' is not read
+WIND_FILE_COLUMNS = {'STATIONS_ID': 'int', 'QN': 'int', 'FF_10': 'float', 'DD_10': 'int'}
+WIND_EXTREME_FILE_COLUMNS = {'STATIONS_ID': 'int', 'QN': 'int', 'FX_10': 'float', 'FNX_10': 'float',
+                             'FMX_10': 'float', 'DX_10': 'int'}
+NA_SENTINEL = -999
+# The DWD 10 minutes data is given in MEZ (UTC+1) until the end of 1999, in UTC since 2000
+DWD_UTC_SINCE = pd.Timestamp("2000-01-01")
+DWD_MEZ_OFFSET = pd.Timedelta(hours=1)
+
+
+def parse_mess_datum(values: np.ndarray) -> pd.DatetimeIndex:
     """
-    Loads and prepares the dataframes from the provided txt files.
+    Converts DWD timestamps given as integers YYYYMMDDHHMM to a DatetimeIndex with integer arithmetic.
 
-    :param filepath_wind: Name of the first txt file.
-    :param filepath_wind_extreme: Name of the second txt file.
-    :return: Merged DataFrame with prepared data.
+    :param values: Array of integer timestamps.
+    :return: DatetimeIndex named 'datetime'.
+    :raises ValueError: If a timestamp is not a valid date and time.
     """
-    # Read each file into a DataFrame
-    df1 = pd.read_csv(filepath_wind, sep=';', index_col=False, skipinitialspace=True)
-    df2 = pd.read_csv(filepath_wind_extreme, sep=';', index_col=False, skipinitialspace=True)
+    values = np.asarray(values, dtype=np.int64)
+    minute = values % 100
+    hour = values // 100 % 100
+    day = values // 10 ** 4 % 100
+    month = values // 10 ** 6 % 100
+    year = values // 10 ** 8
+
+    valid = (month >= 1) & (month <= 12) & (day >= 1) & (hour <= 23) & (minute <= 59)
+    days = _days_from_civil(year, month, day)
+    days_in_month = _days_from_civil(year + month // 12, month % 12 + 1, 1) - _days_from_civil(year, month, 1)
+    valid &= day <= days_in_month
+    if not valid.all():
+        raise ValueError(f"Invalid MESS_DATUM '{values[~valid][0]}', expected YYYYMMDDHHMM.")
 
-    # Ensure 'MESS_DATUM' is in the correct date format
-    df1['MESS_DATUM'] = pd.to_datetime(df1['MESS_DATUM'], format='%Y%m%d%H%M')
-    df2['MESS_DATUM'] = pd.to_datetime(df2['MESS_DATUM'], format='%Y%m%d%H%M')
+    ns = ((days * 24 + hour) * 60 + minute) * 60 * 10 ** 9
+    return pd.DatetimeIndex(ns.view('datetime64[ns]'), name='datetime')
 
-    # Merge the two DataFrames based on the 'STATIONS_ID' and 'MESS_DATUM' columns
-    merged_df = pd.merge(df1, df2, on=['STATIONS_ID', 'MESS_DATUM'], suffixes=('_file1', '_file2'))
 
-    # Remove the 'eor' columns
-    merged_df = merged_df.drop(['eor_file1', 'eor_file2'], axis=1)
+def dwd_time_to_utc(index: pd.DatetimeIndex) -> pd.DatetimeIndex:
+    """
+    Converts DWD timestamps to UTC, the timestamps before 2000 are given in MEZ and moved back one hour.
+    The last MEZ timestamp 1999-12-31 23:50 becomes 22:50 UTC, so the converted data leaves a gap of one hour.
+    """
+    mez = index < DWD_UTC_SINCE
+    if not mez.any():
+        return index
+    values = index.asi8.copy()
+    values[mez] -= DWD_MEZ_OFFSET.value
+    return pd.DatetimeIndex(values.view('datetime64[ns]'), name=index.name)
+
 
-    merged_df.rename(columns=RENAME_DICT, inplace=True)
+def _days_from_civil(year: np.ndarray, month: np.ndarray, day) -> np.ndarray:
+    """
+    Days since 1970-01-01 of proleptic Gregorian dates (H. Hinnant, 'chrono-Compatible Low-Level Date Algorithms').
+    """
+    year = year - (month <= 2)
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * ((month + 9) % 12) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+def _read_dwd_file(filepath: Union[Path, BinaryIO], columns: dict, float_dtype: str, int_dtype: str) -> pd.DataFrame:
+    """
+    Reads a DWD 10 minutes file in one pass with explicit dtypes and '-999' as NA in the float columns. In the
+    integer columns '-999' is replaced by the last valid value. The index is in UTC, see dwd_time_to_utc.
+    """
+    dtypes = {col: float_dtype if kind == 'float' else int_dtype for col, kind in columns.items()}
+    df = pd.read_csv(filepath, sep=';', skipinitialspace=True, usecols=['MESS_DATUM', *columns],
+                     dtype={'MESS_DATUM': 'int64', **dtypes}, keep_default_na=False,
+                     na_values={col: [NA_SENTINEL] for col, kind in columns.items() if kind == 'float'})
+    df.index = dwd_time_to_utc(parse_mess_datum(df.pop('MESS_DATUM').to_numpy()))
+
+    for col, kind in columns.items():
+        if kind == 'int' and (df[col].to_numpy() == NA_SENTINEL).any():
+            df[col] = df[col].where(df[col] != NA_SENTINEL).ffill().astype(int_dtype)
+    return df[list(columns)]
+
+
+def read_wind_file(filepath: Union[Path, BinaryIO], float_dtype: str = "float32",
+                   int_dtype: str = "int32") -> pd.DataFrame:
+    """
+    Reads a DWD 10 minutes wind file ('produkt_zehn_min_ff_*').
+    """
+    return _read_dwd_file(filepath, WIND_FILE_COLUMNS, float_dtype, int_dtype)
 
-    merged_df.set_index('datetime', inplace=True)
 
-    for col in merged_df.columns:
-        if merged_df[col].dtype == 'float64':
-            # Ersetze -999 durch NaN in float64 Spalten
-            merged_df[col] = merged_df[col].replace(-999, np.nan).astype("float32") # TODO: float64 ?
-        elif merged_df[col].dtype == 'int64':
-            # Temporär auf float konvertieren für NaN Unterstützung
-            temp_col = merged_df[col].astype('float64')
-            # Ersetze -999 durch den letzten gültigen Wert
-            temp_col.replace(-999, np.nan, inplace=True)
-            temp_col.ffill(inplace=True)
-            # Zurück zu int64 konvertieren
-            merged_df[col] = temp_col.astype('int32') # TODO: int64 ?
+def read_wind_extreme_file(filepath: Union[Path, BinaryIO], float_dtype: str = "float32",
+                           int_dtype: str = "int32") -> pd.DataFrame:
+    """
+    Reads a DWD 10 minutes extreme wind file ('produkt_zehn_min_fx_*').
+    """
+    return _read_dwd_file(filepath, WIND_EXTREME_FILE_COLUMNS, float_dtype, int_dtype)
+
+
+def combine_archives(dfs: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Combines the data of several archives of a station (e.g. historical and recent) on the 10 minutes index.
+
+    :param dfs: DataFrames of the same file kind, ordered by priority. Of duplicate timestamps the row of the
+                first DataFrame is kept.
+    :return: DataFrame with a unique, sorted index.
+    """
+    df = pd.concat(dfs) if len(dfs) > 1 else dfs[0]
+    if not df.index.is_unique:
+        df = df[~df.index.duplicated(keep='first')]
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index(kind='stable')
+    return df
+
+
+def join_wind_dfs(df_wind: pd.DataFrame, df_wind_extreme: pd.DataFrame) -> pd.DataFrame:
+    """
+    Joins the wind and extreme wind data of a station on the timestamps present in both.
+    """
+    merged_df = df_wind.join(df_wind_extreme.drop(columns='STATIONS_ID'), how='inner', lsuffix='_file1',
+                             rsuffix='_file2')
+    return merged_df.rename(columns=RENAME_DICT)
+
+
+def extract_wind_df(filepath_wind: Union[Path, BinaryIO], filepath_wind_extreme: Union[Path, BinaryIO],
+                    float_dtype: str = "float32", int_dtype: str = "int32"):
+    """
+    Loads and prepares the dataframes from the provided txt files.
+
+    :param filepath_wind: Name of the first txt file, or a binary stream of it (see open_station_zip_member).
+    :param filepath_wind_extreme: Name of the second txt file, or a binary stream of it.
+    :param float_dtype: Dtype of the float columns, see 'data_wind_default_dtype' in config.
+    :param int_dtype: Dtype of the integer columns, see 'data_wind_default_int_dtype' in config.
+    :return: Merged DataFrame with prepared data.
+    """
+    merged_df = join_wind_dfs(read_wind_file(filepath_wind, float_dtype, int_dtype),
+                              read_wind_extreme_file(filepath_wind_extreme, float_dtype, int_dtype))
 
     logger.debug(f"Loaded wind and extreme wind data from {filepath_wind} and {filepath_wind_extreme}!")
     return merged_df
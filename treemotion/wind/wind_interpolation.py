@@ -0,0 +1,123 @@
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from kj_logger import get_logger
+
+from .station_catalog import EARTH_RADIUS_KM
+
+logger = get_logger(__name__)
+
+DIRECTION_COLUMNS = ['wind_direction_10min_avg', 'wind_direction_max_wind_speed']
+INTERPOLATION_METHODS = ('idw', 'direction')
+
+
+def distance_and_bearing(latitude: float, longitude: float, station_latitudes: Sequence[float],
+                         station_longitudes: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Great-circle distance and initial bearing from a site to stations.
+
+    :return: Tuple of distances in km and bearings in degrees (0 north, 90 east).
+    """
+    lat1, lon1 = np.radians(latitude), np.radians(longitude)
+    lat2, lon2 = np.radians(np.asarray(station_latitudes, dtype='float64')), \
+        np.radians(np.asarray(station_longitudes, dtype='float64'))
+    d_lon = lon2 - lon1
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(d_lon / 2) ** 2
+    distance = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+    bearing = np.degrees(np.arctan2(np.sin(d_lon) * np.cos(lat2),
+                                    np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(d_lon))) % 360
+    return distance, bearing
+
+
+def stack_on_grid(dfs: List[pd.DataFrame], columns: List[str], freq: str = "10min") \
+        -> Tuple[pd.DatetimeIndex, np.ndarray]:
+    """
+    Aligns the data of several stations on a shared regular grid spanning all of them.
+
+    :param dfs: DataFrames with DatetimeIndex on the grid of `freq`.
+    :param columns: Columns to stack.
+    :param freq: Interval of the grid.
+    :return: Tuple of the grid and an array of shape (stations, times, columns), NaN where a station has no data.
+    """
+    start = min(df.index.min() for df in dfs).floor(freq)
+    end = max(df.index.max() for df in dfs).ceil(freq)
+    grid = pd.date_range(start, end, freq=freq, name=dfs[0].index.name)
+
+    values = np.full((len(dfs), len(grid), len(columns)), np.nan)
+    for i, df in enumerate(dfs):
+        positions = grid.get_indexer(df.index)
+        on_grid = positions >= 0
+        if not on_grid.all():
+            logger.warning(f"{(~on_grid).sum()} rows of station {i} are off the {freq} grid and ignored.")
+        values[i, positions[on_grid]] = df[columns].to_numpy(dtype='float64')[on_grid]
+    return grid, values
+
+
+def _weighted_mean(values: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    # values and weights (stations, times), stations without value are left out and the weights renormalized
+    valid = ~np.isnan(values)
+    weights = np.where(valid, weights, 0.0)
+    total = weights.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(total > 0, (weights * np.where(valid, values, 0.0)).sum(axis=0) / total, np.nan)
+
+
+def _weighted_direction(directions: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    # Directions are averaged as unit vectors, e.g. 350° and 10° give 0°
+    radians = np.radians(directions)
+    east = _weighted_mean(np.sin(radians), weights)
+    north = _weighted_mean(np.cos(radians), weights)
+    return np.degrees(np.arctan2(east, north)) % 360
+
+
+def interpolate_wind(dfs: List[pd.DataFrame], distances_km: Sequence[float], bearings_deg: Sequence[float],
+                     method: str = 'idw', power: float = 2.0, direction_floor: float = 0.2,
+                     freq: str = "10min", dtype: str = "float32",
+                     columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Combines the wind data of several stations onto a site, vectorized over stations and times.
+
+    With 'idw' every station is weighted by 1 / distance ** power. With 'direction' the inverse distance weight is
+    also scaled per record by how far the station lies upwind of the site: `floor + (1 - floor) * (1 + cos(a)) / 2`
+    with `a` the angle between the bearing to the station and the direction the wind comes from (the inverse
+    distance weighted mean direction). Speeds are weighted means, directions weighted means of unit vectors.
+    Stations without value at a time are left out.
+
+    :param dfs: Wind data of the stations, see DataWindStation.data.
+    :param distances_km: Distance of each station to the site.
+    :param bearings_deg: Bearing from the site to each station.
+    :param method: 'idw' or 'direction'.
+    :param power: Power of the inverse distance.
+    :param direction_floor: Minimum direction factor of a station downwind of the site, 'direction' only.
+    :param freq: Interval of the shared grid.
+    :param dtype: Dtype of the value columns.
+    :param columns: Columns to combine, defaults to all value columns of the first station except 'station_id'.
+    :return: DataFrame on the shared grid.
+    :raises ValueError: If the method is unknown or the number of stations, distances and bearings differ.
+    """
+    if method not in INTERPOLATION_METHODS:
+        raise ValueError(f"Unknown method '{method}', expected one of {INTERPOLATION_METHODS}.")
+    if not len(dfs) == len(distances_km) == len(bearings_deg) or not dfs:
+        raise ValueError("One distance and bearing per station is required.")
+
+    columns = columns or [col for col in dfs[0].columns if col != 'station_id']
+    grid, values = stack_on_grid(dfs, columns, freq)
+
+    # Minimum distance of 10 m keeps a station at the site from taking all weight by division by zero
+    weights = 1.0 / np.maximum(np.asarray(distances_km, dtype='float64'), 0.01) ** power
+    weights = np.broadcast_to(weights[:, None], values.shape[:2])
+
+    if method == 'direction':
+        wind_from = _weighted_direction(values[:, :, columns.index(DIRECTION_COLUMNS[0])], weights)
+        angle = np.radians(wind_from[None, :] - np.asarray(bearings_deg, dtype='float64')[:, None])
+        factor = direction_floor + (1 - direction_floor) * (1 + np.cos(angle)) / 2
+        # Without direction at a time all stations keep the inverse distance weight
+        weights = weights * np.where(np.isnan(factor), 1.0, factor)
+
+    result = {}
+    for i, col in enumerate(columns):
+        combine = _weighted_direction if col in DIRECTION_COLUMNS else _weighted_mean
+        result[col] = combine(values[:, :, i], weights).astype(dtype)
+    return pd.DataFrame(result, index=grid)
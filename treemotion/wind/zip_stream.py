@@ -0,0 +1,186 @@
+import io
+import re
+import struct
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Optional, Union
+
+from kj_logger import get_logger
+
+logger = get_logger(__name__)
+
+LOCAL_FILE_HEADER = b"PK\x03\x04"
+DATA_DESCRIPTOR = b"PK\x07\x08"
+# signature, version, flags, method, time, date, crc32, compressed size, uncompressed size, name length, extra length
+_LOCAL_HEADER = struct.Struct("<4sHHHHHIIIHH")
+
+FLAG_DATA_DESCRIPTOR = 0x08
+FLAG_UTF8 = 0x800
+METHOD_STORED = 0
+METHOD_DEFLATED = 8
+CHUNK_SIZE = 1 << 16
+
+
+class _StreamSource:
+    """
+    Reads from a non-seekable stream with a pushback buffer for bytes read beyond a member.
+    """
+
+    def __init__(self, raw: BinaryIO):
+        self.raw = raw
+        self.buffer = b""
+
+    def read(self, n: int) -> bytes:
+        if self.buffer:
+            data, self.buffer = self.buffer[:n], self.buffer[n:]
+            return data
+        return self.raw.read(n)
+
+    def read_up_to(self, n: int) -> bytes:
+        """
+        Reads `n` bytes, fewer only at the end of the stream.
+        """
+        parts = []
+        while n > 0:
+            data = self.read(n)
+            if not data:
+                break
+            parts.append(data)
+            n -= len(data)
+        return b"".join(parts)
+
+    def read_exact(self, n: int) -> bytes:
+        data = self.read_up_to(n)
+        if len(data) < n:
+            raise ValueError("Unexpected end of zip stream.")
+        return data
+
+    def unread(self, data: bytes):
+        self.buffer = data + self.buffer
+
+
+class ZipMemberReader(io.RawIOBase):
+    """
+    Reads one member of a zip archive from the stream positioned behind its local file header, decompressing
+    it chunk by chunk. The CRC and size are checked at the end of the member, optionally the decompressed
+    bytes are written to `keep_path`.
+    """
+
+    def __init__(self, source: _StreamSource, name: str, flags: int, method: int, crc: int,
+                 compressed_size: int, size: int, keep_path: Optional[Path] = None):
+        super().__init__()
+        if method not in (METHOD_STORED, METHOD_DEFLATED):
+            raise ValueError(f"Zip member '{name}' has unsupported compression method {method}.")
+        if method == METHOD_STORED and flags & FLAG_DATA_DESCRIPTOR:
+            raise ValueError(f"Stored zip member '{name}' without size can not be streamed.")
+
+        self.name = name
+        self._source = source
+        self._flags = flags
+        self._method = method
+        self._expected_crc = crc
+        self._expected_size = size
+        self._remaining = compressed_size
+        self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS) if method == METHOD_DEFLATED else None
+        self._pending = b""
+        self._crc = 0
+        self._size = 0
+        self._eof = False
+
+        self._keep_path = keep_path
+        self._keep_file = None
+        if keep_path is not None:
+            self._keep_file = open(keep_path.with_name(f"{keep_path.name}.tmp"), 'wb')
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._pending and not self._eof:
+            self._pending = self._read_chunk()
+        data, self._pending = self._pending[:len(b)], self._pending[len(b):]
+        b[:len(data)] = data
+        return len(data)
+
+    def _read_chunk(self) -> bytes:
+        if self._method == METHOD_STORED:
+            data = self._source.read_exact(min(CHUNK_SIZE, self._remaining)) if self._remaining else b""
+            self._remaining -= len(data)
+            done = self._remaining == 0
+        else:
+            compressed = self._source.read(CHUNK_SIZE)
+            if not compressed:
+                raise ValueError(f"Unexpected end of zip stream in member '{self.name}'.")
+            data = self._decompressor.decompress(compressed)
+            done = self._decompressor.eof
+            if done:
+                self._source.unread(self._decompressor.unused_data)
+
+        self._crc = zlib.crc32(data, self._crc)
+        self._size += len(data)
+        if self._keep_file is not None:
+            self._keep_file.write(data)
+        if done:
+            self._finish()
+        return data
+
+    def _finish(self):
+        self._eof = True
+        if self._flags & FLAG_DATA_DESCRIPTOR:
+            descriptor = self._source.read_exact(12)
+            if descriptor[:4] == DATA_DESCRIPTOR:
+                descriptor = descriptor[4:] + self._source.read_exact(4)
+            self._expected_crc, _, self._expected_size = struct.unpack("<III", descriptor)
+
+        if self._crc != self._expected_crc or self._size & 0xFFFFFFFF != self._expected_size:
+            raise ValueError(f"Zip member '{self.name}' is corrupt, CRC or size does not match.")
+
+        if self._keep_file is not None:
+            self._keep_file.close()
+            self._keep_file = None
+            self._keep_path.with_name(f"{self._keep_path.name}.tmp").replace(self._keep_path)
+            logger.debug(f"Kept extracted '{self.name}' at '{self._keep_path}'.")
+
+    def close(self):
+        if self._keep_file is not None:
+            # Incomplete member, no provenance file
+            self._keep_file.close()
+            self._keep_file = None
+            self._keep_path.with_name(f"{self._keep_path.name}.tmp").unlink(missing_ok=True)
+        super().close()
+
+
+def open_zip_member(raw: BinaryIO, member_pattern: str,
+                    keep_directory: Union[str, Path, None] = None) -> io.BufferedReader:
+    """
+    Opens the first member of a zip archive matching `member_pattern` from a non-seekable stream, e.g. the raw
+    HTTP response, without writing the archive to disk or holding it in memory. Members before it are
+    decompressed and discarded, the stream is not read beyond the member.
+
+    :param raw: Binary stream positioned at the start of the zip archive.
+    :param member_pattern: Regular expression searched in the member names.
+    :param keep_directory: If given, the decompressed member is also written there under its name.
+    :return: Buffered binary reader of the decompressed member.
+    :raises ValueError: If no member matches or the archive is corrupt or unsupported.
+    """
+    source = _StreamSource(raw)
+    pattern = re.compile(member_pattern)
+    while True:
+        header = source.read_up_to(_LOCAL_HEADER.size)
+        if len(header) < _LOCAL_HEADER.size or header[:4] != LOCAL_FILE_HEADER:
+            # Central directory or end of stream, no more members
+            raise ValueError(f"No zip member matching '{member_pattern}'.")
+
+        _, _, flags, method, _, _, crc, compressed_size, size, name_length, extra_length = \
+            _LOCAL_HEADER.unpack(header)
+        name = source.read_exact(name_length).decode('utf-8' if flags & FLAG_UTF8 else 'cp437')
+        source.read_exact(extra_length)
+
+        if pattern.search(name):
+            keep_path = Path(keep_directory) / Path(name).name if keep_directory is not None else None
+            reader = ZipMemberReader(source, name, flags, method, crc, compressed_size, size, keep_path)
+            return io.BufferedReader(reader, buffer_size=CHUNK_SIZE)
+
+        skipped = ZipMemberReader(source, name, flags, method, crc, compressed_size, size)
+        while skipped.read(CHUNK_SIZE):
+            pass